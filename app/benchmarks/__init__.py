@@ -0,0 +1,48 @@
+"""Benchmarks for the recipe app API
+
+Run a benchmark from the app folder, e.g.:
+
+    python -m benchmarks.renderers
+"""
+import os
+import statistics
+import time
+from contextlib import contextmanager
+
+import django
+
+
+def setup():
+    """Configures Django for a standalone benchmark run"""
+    os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'recipe_app.settings')
+    django.setup()
+
+
+def measure(func, repeat=5, number=1):
+    """Returns the median seconds taken by `number` calls of func"""
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        for _ in range(number):
+            func()
+        timings.append((time.perf_counter() - start) / number)
+
+    return statistics.median(timings)
+
+
+@contextmanager
+def test_database(verbosity=0):
+    """Runs the block against a freshly created test database"""
+    from django.db import connection
+    from django.test.utils import (
+        setup_test_environment, teardown_test_environment
+    )
+
+    old_name = connection.settings_dict['NAME']
+    setup_test_environment()
+    connection.creation.create_test_db(verbosity=verbosity)
+    try:
+        yield connection
+    finally:
+        connection.creation.destroy_test_db(old_name, verbosity=verbosity)
+        teardown_test_environment()
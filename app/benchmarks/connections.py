@@ -0,0 +1,61 @@
+"""Measures recipe list latency with and without persistent connections
+
+Needs a server database such as PostgreSQL, e.g.:
+
+    DJANGO_SETTINGS_MODULE=recipe_app.settings_production \
+        python -m benchmarks.connections
+"""
+import argparse
+import statistics
+import time
+
+from benchmarks import setup, test_database
+
+
+def run(client, url, requests):
+    """Returns per request latencies, closing connections like Django does"""
+    from django.db import close_old_connections
+
+    latencies = []
+    for _ in range(requests):
+        start = time.perf_counter()
+        client.get(url)
+        close_old_connections()
+        latencies.append(time.perf_counter() - start)
+
+    return latencies
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--requests', type=int, default=500)
+    parser.add_argument('--recipes', type=int, default=20)
+    args = parser.parse_args()
+
+    setup()
+    from django.db import connection
+    if connection.vendor == 'sqlite':
+        parser.error('run against a server database, not SQLite')
+
+    with test_database():
+        from django.urls import reverse
+        from rest_framework.test import APIClient
+        from benchmarks.serializers import seed
+
+        client = APIClient()
+        client.force_authenticate(seed(args.recipes))
+        url = reverse('recipes:recipe-list')
+        for max_age in (0, 600):
+            connection.close()
+            connection.settings_dict['CONN_MAX_AGE'] = max_age
+            latencies = sorted(run(client, url, args.requests))
+            p99 = latencies[int(len(latencies) * 0.99) - 1]
+            print(
+                f'CONN_MAX_AGE={max_age:<4} '
+                f'p50 {statistics.median(latencies) * 1000:7.2f} ms  '
+                f'p99 {p99 * 1000:7.2f} ms'
+            )
+
+
+if __name__ == '__main__':
+    main()
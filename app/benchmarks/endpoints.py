@@ -0,0 +1,354 @@
+"""Measures throughput and latency of every API endpoint on a live server
+
+Fill the database and start a server with its rate limits disabled,
+e.g.:
+
+    python manage.py generate_data --users 10 --recipes 1000
+    THROTTLE_LOGIN_IP= THROTTLE_LOGIN_EMAIL= THROTTLE_USER= \\
+        APP_SERVER=gunicorn python manage.py serve
+
+then benchmark it with one of the generated users:
+
+    python -m benchmarks.endpoints --email user0.<run>@example.com \\
+        --output before.json
+    python -m benchmarks.endpoints --email user0.<run>@example.com \\
+        --compare before.json
+
+Reports are JSON documents holding the measured commit, so that runs on
+different commits can be compared. Runs stop as soon as an endpoint is
+throttled, since its latencies would measure rejections.
+"""
+import argparse
+import datetime
+import http.client
+import io
+import json
+import statistics
+import subprocess
+import sys
+import threading
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from urllib.parse import urlsplit
+
+from PIL import Image
+
+
+class Client:
+    """HTTP client keeping one connection open per thread"""
+
+    def __init__(self, url, token=None):
+        parts = urlsplit(url)
+        self.host = parts.hostname
+        self.port = parts.port or 80
+        self.token = token
+        self.local = threading.local()
+
+    def get_connection(self):
+        if not hasattr(self.local, 'connection'):
+            self.local.connection = http.client.HTTPConnection(
+                self.host, self.port, timeout=30
+            )
+        return self.local.connection
+
+    def request(self, method, path, data=None, files=None):
+        """Sends a request, returning its status and decoded JSON body"""
+        headers = {}
+        body = None
+        if self.token:
+            headers['Authorization'] = f'Token {self.token}'
+        if files:
+            boundary = uuid.uuid4().hex
+            headers['Content-Type'] = (
+                f'multipart/form-data; boundary={boundary}'
+            )
+            body = encode_multipart(boundary, files)
+        elif data is not None:
+            headers['Content-Type'] = 'application/json'
+            body = json.dumps(data)
+
+        connection = self.get_connection()
+        try:
+            connection.request(method, path, body, headers)
+            response = connection.getresponse()
+            content = response.read()
+        except (http.client.HTTPException, OSError):
+            connection.close()
+            raise
+        if response.getheader('Content-Type', '').startswith(
+            'application/json'
+        ) and content:
+            return response.status, json.loads(content)
+
+        return response.status, None
+
+
+def encode_multipart(boundary, files):
+    """Encodes {field: (file name, content)} as a multipart body"""
+    parts = []
+    for field, (file_name, content) in files.items():
+        parts.append(
+            f'--{boundary}\r\nContent-Disposition: form-data; '
+            f'name="{field}"; filename="{file_name}"\r\n'
+            'Content-Type: application/octet-stream\r\n\r\n'.encode()
+            + content + b'\r\n'
+        )
+    parts.append(f'--{boundary}--\r\n'.encode())
+
+    return b''.join(parts)
+
+
+def get_image():
+    content = io.BytesIO()
+    Image.new('RGB', (64, 64), (200, 120, 40)).save(content, 'JPEG')
+    return content.getvalue()
+
+
+def get_commit():
+    """Returns the current git commit and whether the tree has changes"""
+    try:
+        commit = subprocess.check_output(
+            ['git', 'rev-parse', 'HEAD'], text=True,
+            stderr=subprocess.DEVNULL
+        ).strip()
+        dirty = bool(subprocess.check_output(
+            ['git', 'status', '--porcelain', '--untracked-files=no'],
+            text=True
+        ).strip())
+    except (OSError, subprocess.CalledProcessError):
+        return None, None
+
+    return commit, dirty
+
+
+def get_endpoints(client, args):
+    """Returns (name, request function, request count, setup) per endpoint
+
+    Request functions take the request index. Setup functions, or None,
+    run untimed before the requests of their endpoint: the endpoints
+    updating and deleting recipes share recipes created by theirs.
+    """
+    run = uuid.uuid4().hex[:8]
+    status, recipes = client.request('GET', '/api/recipes/recipes/')
+    if status != 200 or not recipes:
+        sys.exit(f'No recipes for {args.email}, run generate_data first.')
+    recipe_ids = [recipe['id'] for recipe in recipes]
+    _, tags = client.request('GET', '/api/recipes/tags/')
+    _, ingredients = client.request('GET', '/api/recipes/ingredients/')
+    target_ids = []
+    image = get_image()
+
+    def cycle(items):
+        return lambda index: items[index % len(items)]
+
+    recipe_id = cycle(recipe_ids)
+    recipe_payload = {
+        'title': 'Benchmark recipe',
+        'time_minutes': 10,
+        'price': '5.50',
+        'tags': [tag['id'] for tag in tags[:3]],
+        'ingredients': [ingredient['id'] for ingredient in ingredients[:8]],
+    }
+
+    requests = args.requests
+
+    def create_targets():
+        """Creates the recipes to update and delete, once per run"""
+        if target_ids:
+            return
+        for _ in range(requests):
+            status, recipe = client.request(
+                'POST', '/api/recipes/recipes/', recipe_payload
+            )
+            if status != 201:
+                sys.exit(f'Could not create a recipe: {status} {recipe}')
+            target_ids.append(recipe['id'])
+
+    # Logins hash the password and are much slower than other requests
+    logins = max(1, requests // 10)
+
+    return [
+        ('users:create', lambda index: client.request(
+            'POST', '/api/users/', {
+                'email': f'bench{index}.{run}@example.com',
+                'password': 'password',
+                'name': 'Benchmark',
+            }
+        ), logins, None),
+        # Logins replace the token of their device, so they must not use
+        # the device of the benchmark session
+        ('users:auth', lambda index: client.request(
+            'POST', '/api/users/auth/', {
+                'email': args.email,
+                'password': args.password,
+                'device': 'benchmark-login',
+            }
+        ), logins, None),
+        ('users:me', lambda index: client.request(
+            'GET', '/api/users/me/'
+        ), requests, None),
+        ('users:me PATCH', lambda index: client.request(
+            'PATCH', '/api/users/me/', {'name': f'User {index}'}
+        ), requests, None),
+        ('recipes:tag-list', lambda index: client.request(
+            'GET', '/api/recipes/tags/'
+        ), requests, None),
+        ('recipes:tag-list assigned_only', lambda index: client.request(
+            'GET', '/api/recipes/tags/?assigned_only=true'
+        ), requests, None),
+        ('recipes:tag-list POST', lambda index: client.request(
+            'POST', '/api/recipes/tags/', {'name': f'Tag {run} {index}'}
+        ), requests, None),
+        ('recipes:ingredient-list', lambda index: client.request(
+            'GET', '/api/recipes/ingredients/'
+        ), requests, None),
+        ('recipes:ingredient-list POST', lambda index: client.request(
+            'POST', '/api/recipes/ingredients/',
+            {'name': f'Ingredient {run} {index}'}
+        ), requests, None),
+        ('recipes:recipe-list', lambda index: client.request(
+            'GET', '/api/recipes/recipes/'
+        ), requests, None),
+        ('recipes:recipe-list filtered', lambda index: client.request(
+            'GET', '/api/recipes/recipes/?tags={}&max_price=50'
+            '&ordering=-price'.format(recipe_payload['tags'][0])
+        ), requests, None),
+        ('recipes:recipe-detail', lambda index: client.request(
+            'GET', f'/api/recipes/recipes/{recipe_id(index)}/'
+        ), requests, None),
+        ('recipes:recipe-list POST', lambda index: client.request(
+            'POST', '/api/recipes/recipes/', recipe_payload
+        ), requests, None),
+        ('recipes:recipe-detail PATCH', lambda index: client.request(
+            'PATCH', f'/api/recipes/recipes/{target_ids[index]}/',
+            {'title': f'Benchmark recipe {index}'}
+        ), requests, create_targets),
+        ('recipes:recipe-upload-image', lambda index: client.request(
+            'POST',
+            f'/api/recipes/recipes/{target_ids[index]}/upload-image/',
+            files={'image': ('image.jpg', image)}
+        ), requests, create_targets),
+        ('recipes:recipe-detail DELETE', lambda index: client.request(
+            'DELETE', f'/api/recipes/recipes/{target_ids[index]}/'
+        ), requests, create_targets),
+    ]
+
+
+def percentile(values, fraction):
+    """Returns the nearest rank percentile of sorted values"""
+    return values[max(0, int(round(len(values) * fraction)) - 1)]
+
+
+def run(func, count, concurrency):
+    """Runs func(index) for each index, returning latencies and errors"""
+    latencies = [None] * count
+    errors = []
+
+    def timed(index):
+        start = time.perf_counter()
+        try:
+            status, _ = func(index)
+        except Exception as error:
+            status = type(error).__name__
+        latencies[index] = time.perf_counter() - start
+        if not isinstance(status, int) or status >= 400:
+            errors.append(status)
+
+    start = time.perf_counter()
+    with ThreadPoolExecutor(concurrency) as executor:
+        list(executor.map(timed, range(count)))
+    elapsed = time.perf_counter() - start
+
+    latencies.sort()
+    return {
+        'requests': count,
+        'errors': len(errors),
+        'throughput': round(count / elapsed, 2),
+        'mean_ms': round(statistics.mean(latencies) * 1000, 3),
+        'p50_ms': round(percentile(latencies, 0.5) * 1000, 3),
+        'p99_ms': round(percentile(latencies, 0.99) * 1000, 3),
+        'throttled': errors.count(429),
+    }
+
+
+def print_report(report, baseline=None):
+    previous = baseline['endpoints'] if baseline else {}
+    header = f'{"endpoint":<34}{"req/s":>10}{"p50 ms":>10}{"p99 ms":>10}'
+    if baseline:
+        header += f'  vs {(baseline.get("commit") or "?")[:10]}'
+    print(header)
+    for name, result in report['endpoints'].items():
+        line = (
+            f'{name:<34}{result["throughput"]:>10.1f}'
+            f'{result["p50_ms"]:>10.2f}{result["p99_ms"]:>10.2f}'
+        )
+        if name in previous:
+            change = result['p50_ms'] / previous[name]['p50_ms'] - 1
+            line += f'  p50 {change:+.1%}'
+        if result['errors']:
+            line += f'  {result["errors"]} errors'
+        print(line)
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description=__doc__.splitlines()[0]
+    )
+    parser.add_argument('--url', default='http://127.0.0.1:8000')
+    parser.add_argument('--email', required=True)
+    parser.add_argument('--password', default='password')
+    parser.add_argument('--requests', type=int, default=200,
+                        help='Requests per endpoint.')
+    parser.add_argument('--concurrency', type=int, default=4)
+    parser.add_argument('--only', action='append',
+                        help='Only run endpoints containing this text.')
+    parser.add_argument('--output', help='Write the JSON report here.')
+    parser.add_argument('--compare', help='Report to compare against.')
+    args = parser.parse_args()
+
+    client = Client(args.url)
+    status, body = client.request('POST', '/api/users/auth/', {
+        'email': args.email,
+        'password': args.password,
+        'device': 'benchmark',
+    })
+    if status != 200:
+        sys.exit(f'Could not log in as {args.email}: {body}')
+    client.token = body['token']
+
+    commit, dirty = get_commit()
+    report = {
+        'commit': commit,
+        'dirty': dirty,
+        'date': datetime.datetime.now(datetime.timezone.utc).isoformat(),
+        'url': args.url,
+        'concurrency': args.concurrency,
+        'endpoints': {},
+    }
+    for name, func, count, setup in get_endpoints(client, args):
+        if args.only and not any(text in name for text in args.only):
+            continue
+        if setup:
+            setup()
+        result = report['endpoints'][name] = run(
+            func, count, args.concurrency
+        )
+        if result['throttled']:
+            sys.exit(
+                f'{name} was throttled, restart the server with empty '
+                'THROTTLE_LOGIN_IP, THROTTLE_LOGIN_EMAIL and THROTTLE_USER.'
+            )
+
+    baseline = None
+    if args.compare:
+        with open(args.compare) as report_file:
+            baseline = json.load(report_file)
+    print_report(report, baseline)
+    if args.output:
+        with open(args.output, 'w') as report_file:
+            json.dump(report, report_file, indent=2)
+
+
+if __name__ == '__main__':
+    main()
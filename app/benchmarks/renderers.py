@@ -0,0 +1,68 @@
+"""Compares the fast JSON renderer and parser against DRF's defaults"""
+import argparse
+import io
+from decimal import Decimal
+
+from benchmarks import measure, setup
+
+
+def get_recipe_list_data(count):
+    """Returns RecipeSerializer list output for unsaved sample recipes"""
+    from core.models import Ingredient, Recipe, Tag
+    from recipes.serializers import RecipeSerializer
+
+    recipes = []
+    for index in range(1, count + 1):
+        recipe = Recipe(
+            id=index,
+            title=f'Sample recipe number {index}',
+            time_minutes=index % 120,
+            price=Decimal(index % 1000) / 10,
+            link=f'https://example.com/recipes/{index}',
+            image=f'uploads/recipes/{index}.jpg',
+        )
+        # Fill the prefetch cache so relations render without the database
+        recipe._prefetched_objects_cache = {
+            'ingredients': [Ingredient(id=i) for i in range(index, index + 8)],
+            'tags': [Tag(id=i) for i in range(index, index + 3)],
+        }
+        recipes.append(recipe)
+
+    return RecipeSerializer(recipes, many=True).data
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--recipes', type=int, default=1000)
+    parser.add_argument('--repeat', type=int, default=20)
+    args = parser.parse_args()
+
+    setup()
+    from rest_framework.parsers import JSONParser
+    from rest_framework.renderers import JSONRenderer
+    from core.parsers import FastJSONParser
+    from core.renderers import FastJSONRenderer, orjson
+
+    data = get_recipe_list_data(args.recipes)
+    body = JSONRenderer().render(data)
+    size = len(body) / 1024 / 1024
+    print(f'{args.recipes} recipes, {size:.2f} MiB, orjson: {bool(orjson)}')
+
+    pairs = (
+        ('render', JSONRenderer(), FastJSONRenderer(),
+         lambda renderer: renderer.render(data)),
+        ('parse', JSONParser(), FastJSONParser(),
+         lambda parser: parser.parse(io.BytesIO(body))),
+    )
+    for name, default, fast, operation in pairs:
+        default_time = measure(lambda: operation(default), args.repeat)
+        fast_time = measure(lambda: operation(fast), args.repeat)
+        print(
+            f'{name}: default {size / default_time:8.1f} MiB/s, '
+            f'fast {size / fast_time:8.1f} MiB/s, '
+            f'speedup {default_time / fast_time:.1f}x'
+        )
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,94 @@
+"""Compares RecipeSerializer and FastRecipeListSerializer on recipe lists"""
+import argparse
+import random
+
+from benchmarks import measure, setup, test_database
+
+
+def seed(recipes, tags_per_recipe=3, ingredients_per_recipe=8):
+    """Creates a user owning the given number of linked recipes"""
+    from django.contrib.auth import get_user_model
+    from core.models import Tag, Ingredient, Recipe
+
+    user = get_user_model().objects.create_user('bench@test.com', 'bench')
+    Tag.objects.bulk_create(
+        Tag(user=user, name=f'Tag {index}') for index in range(50)
+    )
+    Ingredient.objects.bulk_create(
+        Ingredient(user=user, name=f'Ingredient {index}')
+        for index in range(200)
+    )
+    Recipe.objects.bulk_create(
+        Recipe(
+            user=user,
+            title=f'Recipe {index}',
+            time_minutes=random.randint(1, 180),
+            price=random.randint(100, 99999) / 100,
+            link=f'https://example.com/recipes/{index}',
+            image=f'uploads/recipes/{index}.jpg' if index % 2 else None,
+        )
+        for index in range(recipes)
+    )
+
+    recipe_ids = Recipe.objects.values_list('id', flat=True)
+    tag_ids = list(Tag.objects.values_list('id', flat=True))
+    ingredient_ids = list(Ingredient.objects.values_list('id', flat=True))
+    TagLink = Recipe.tags.through
+    IngredientLink = Recipe.ingredients.through
+    TagLink.objects.bulk_create(
+        TagLink(recipe_id=recipe_id, tag_id=tag_id)
+        for recipe_id in recipe_ids
+        for tag_id in random.sample(tag_ids, tags_per_recipe)
+    )
+    IngredientLink.objects.bulk_create(
+        IngredientLink(recipe_id=recipe_id, ingredient_id=ingredient_id)
+        for recipe_id in recipe_ids
+        for ingredient_id in random.sample(
+            ingredient_ids, ingredients_per_recipe
+        )
+    )
+
+    return user
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--recipes', type=int, default=10000)
+    parser.add_argument('--repeat', type=int, default=5)
+    args = parser.parse_args()
+
+    setup()
+    with test_database():
+        from django.db.models import Prefetch
+        from core.models import Tag, Ingredient, Recipe
+        from recipes.serializers import (
+            RecipeSerializer, FastRecipeListSerializer
+        )
+
+        user = seed(args.recipes)
+        queryset = Recipe.objects.filter(user=user).order_by('-id')
+        prefetched = queryset.prefetch_related(
+            Prefetch('tags', queryset=Tag.objects.only('id').order_by('id')),
+            Prefetch(
+                'ingredients',
+                queryset=Ingredient.objects.only('id').order_by('id')
+            ),
+        )
+
+        def model_serializer():
+            return RecipeSerializer(prefetched.all(), many=True).data
+
+        def fast_serializer():
+            return FastRecipeListSerializer(queryset.all()).data
+
+        assert model_serializer() == fast_serializer()
+        model_time = measure(model_serializer, args.repeat)
+        fast_time = measure(fast_serializer, args.repeat)
+        print(f'{args.recipes} recipes')
+        print(f'RecipeSerializer:         {model_time * 1000:8.1f} ms')
+        print(f'FastRecipeListSerializer: {fast_time * 1000:8.1f} ms')
+        print(f'speedup {model_time / fast_time:.1f}x')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,125 @@
+"""Load-tests concurrent recipe image uploads against running servers
+
+Start the WSGI and ASGI servers, then compare them, e.g.:
+
+    gunicorn recipe_app.wsgi:application -b :8000 &
+    uvicorn recipe_app.asgi:application --port 8001 &
+    python -m benchmarks.uploads http://localhost:8000 http://localhost:8001
+"""
+import argparse
+import io
+import json
+import statistics
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from urllib.error import HTTPError
+from urllib.request import Request, urlopen
+
+
+def request(url, data=None, token=None, content_type='application/json'):
+    """Sends a request and returns the decoded JSON response"""
+    headers = {'Content-Type': content_type}
+    if token:
+        headers['Authorization'] = f'Token {token}'
+    if isinstance(data, dict):
+        data = json.dumps(data).encode()
+    with urlopen(Request(url, data=data, headers=headers)) as response:
+        return json.loads(response.read() or b'null')
+
+
+def get_image(size):
+    """Returns a JPEG image of size x size pixels"""
+    from PIL import Image
+
+    buffer = io.BytesIO()
+    Image.new('RGB', (size, size), (200, 120, 40)).save(buffer, 'JPEG')
+
+    return buffer.getvalue()
+
+
+def get_multipart(image):
+    """Encodes the image as a multipart form, returning type and body"""
+    boundary = uuid.uuid4().hex
+    body = (
+        f'--{boundary}\r\n'
+        'Content-Disposition: form-data; name="image"; filename="a.jpg"\r\n'
+        'Content-Type: image/jpeg\r\n\r\n'
+    ).encode() + image + f'\r\n--{boundary}--\r\n'.encode()
+
+    return f'multipart/form-data; boundary={boundary}', body
+
+
+def run(base_url, uploads, concurrency, image):
+    """Uploads images concurrently, returning throughput and latencies
+
+    The statuses of failed uploads are returned as well. Every upload
+    targets its own recipe, since concurrent uploads to one recipe are
+    rejected with a 412 by all but the first writer.
+    """
+    email = f'{uuid.uuid4().hex}@bench.com'
+    request(
+        f'{base_url}/api/users/',
+        {'email': email, 'password': 'bench', 'name': 'Bench'}
+    )
+    token = request(
+        f'{base_url}/api/users/auth/', {'email': email, 'password': 'bench'}
+    )['token']
+
+    def create_recipe(_):
+        return request(
+            f'{base_url}/api/recipes/recipes/',
+            {'title': 'Bench', 'time_minutes': 1, 'price': '1.00',
+             'tags': [], 'ingredients': []},
+            token=token
+        )['id']
+
+    with ThreadPoolExecutor(max_workers=concurrency) as executor:
+        recipe_ids = list(executor.map(create_recipe, range(uploads)))
+    content_type, body = get_multipart(image)
+
+    def upload(recipe_id):
+        url = f'{base_url}/api/recipes/recipes/{recipe_id}/upload-image/'
+        start = time.perf_counter()
+        try:
+            request(url, body, token=token, content_type=content_type)
+            error = None
+        except HTTPError as exc:
+            error = exc.code
+        return time.perf_counter() - start, error
+
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as executor:
+        results = list(executor.map(upload, recipe_ids))
+    elapsed = time.perf_counter() - start
+
+    latencies = sorted(latency for latency, _ in results)
+    errors = [error for _, error in results if error is not None]
+
+    return uploads / elapsed, latencies, errors
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('urls', nargs='+')
+    parser.add_argument('--uploads', type=int, default=200)
+    parser.add_argument('--concurrency', type=int, default=32)
+    parser.add_argument('--image-size', type=int, default=800)
+    args = parser.parse_args()
+
+    image = get_image(args.image_size)
+    for base_url in args.urls:
+        throughput, latencies, errors = run(
+            base_url.rstrip('/'), args.uploads, args.concurrency, image
+        )
+        p99 = latencies[int(len(latencies) * 0.99) - 1]
+        print(
+            f'{base_url}: {throughput:7.1f} uploads/s  '
+            f'p50 {statistics.median(latencies) * 1000:7.1f} ms  '
+            f'p99 {p99 * 1000:7.1f} ms  '
+            f'{len(errors)} errors {sorted(set(errors))}'
+        )
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,169 @@
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.contrib.auth.backends import ModelBackend
+from django.core import signing
+from django.core.cache import caches
+from django.db.models import F
+from django.utils import timezone
+from django.utils.translation import ugettext_lazy as _
+
+from rest_framework import exceptions
+from rest_framework.authentication import (
+    BaseAuthentication, TokenAuthentication, get_authorization_header
+)
+
+from core.hashers import hash_password, verify_password
+from core.metrics import registry
+from core.models import AuthToken
+
+
+ACCESS_TOKEN_SALT = 'core.authentication.access-token'
+
+
+class ExpiringTokenAuthentication(TokenAuthentication):
+    """Authenticates requests with expiring per-device tokens
+
+    Using a token slides its expiry, which is written at most once per
+    AUTH_TOKEN_REFRESH_INTERVAL rather than on every request.
+    """
+    model = AuthToken
+
+    def authenticate_credentials(self, key):
+        try:
+            token = AuthToken.objects.select_related('user').get(key=key)
+        except AuthToken.DoesNotExist:
+            raise exceptions.AuthenticationFailed(_('Invalid token.'))
+
+        if not token.user.is_active:
+            raise exceptions.AuthenticationFailed(
+                _('User inactive or deleted.')
+            )
+
+        now = timezone.now()
+        if token.expires <= now:
+            raise exceptions.AuthenticationFailed(_('Token has expired.'))
+        if now - token.last_used >= settings.AUTH_TOKEN_REFRESH_INTERVAL:
+            token.last_used = now
+            token.expires = now + settings.AUTH_TOKEN_TTL
+            AuthToken.objects.filter(key=key).update(
+                last_used=token.last_used, expires=token.expires
+            )
+
+        return (token.user, token)
+
+
+def create_access_token(user):
+    """Returns a signed access token for the user and its expiry"""
+    token = signing.dumps(
+        [user.pk, user.token_version], salt=ACCESS_TOKEN_SALT
+    )
+
+    return token, timezone.now() + settings.ACCESS_TOKEN_TTL
+
+
+def get_version_cache_key(user_id):
+    return f'access-token-version:{user_id}'
+
+
+def get_token_version(user_id):
+    """Returns the user's token version, None for inactive users"""
+    cache = caches[settings.ACCESS_TOKEN_CACHE]
+    key = get_version_cache_key(user_id)
+    version = cache.get(key, -1)
+    if version == -1:
+        version = get_user_model().objects.filter(
+            pk=user_id, is_active=True
+        ).values_list('token_version', flat=True).first()
+        cache.set(key, version, settings.ACCESS_TOKEN_VERSION_CACHE_SECONDS)
+
+    return version
+
+
+def revoke_access_tokens(user):
+    """Invalidates every signed access token issued to the user"""
+    get_user_model().objects.filter(pk=user.pk).update(
+        token_version=F('token_version') + 1
+    )
+    caches[settings.ACCESS_TOKEN_CACHE].delete(
+        get_version_cache_key(user.pk)
+    )
+
+
+def get_deferred_user(user_id, token_version):
+    """Returns the user with every field but the token version deferred"""
+    UserModel = get_user_model()
+    pk_name = UserModel._meta.pk.attname
+
+    return UserModel.from_db(
+        UserModel.objects.db, [pk_name, 'token_version'],
+        [user_id, token_version]
+    )
+
+
+class SignedAccessTokenAuthentication(BaseAuthentication):
+    """Authenticates requests with short lived signed access tokens
+
+    Clients send "Authorization: Bearer <token>". Tokens are verified in
+    memory and checked against the user's cached token version, so most
+    requests don't query the database. The authenticated user comes with
+    its primary key and token version, its other fields are deferred and
+    loaded from the database when first read. Saving it only writes the
+    loaded fields.
+    """
+    keyword = 'Bearer'
+
+    def authenticate(self, request):
+        auth = get_authorization_header(request).split()
+        if not auth or auth[0].lower() != self.keyword.lower().encode():
+            return None
+        if len(auth) != 2:
+            raise exceptions.AuthenticationFailed(_('Invalid token header.'))
+
+        try:
+            user_id, version = signing.loads(
+                auth[1].decode(),
+                salt=ACCESS_TOKEN_SALT,
+                max_age=settings.ACCESS_TOKEN_TTL.total_seconds()
+            )
+        except signing.SignatureExpired:
+            raise exceptions.AuthenticationFailed(_('Token has expired.'))
+        except (signing.BadSignature, UnicodeError, TypeError, ValueError):
+            raise exceptions.AuthenticationFailed(_('Invalid token.'))
+
+        if get_token_version(user_id) != version:
+            raise exceptions.AuthenticationFailed(_('Token was revoked.'))
+
+        return (get_deferred_user(user_id, version), None)
+
+    def authenticate_header(self, request):
+        return self.keyword
+
+
+class HashingSlotsModelBackend(ModelBackend):
+    """Model backend hashing passwords in the bounded hashing slots
+
+    Outdated password hashes are replaced when their users log in. Raises
+    core.hashers.HashingBusy when no hashing slot is available, which the
+    login view and core.middleware.HashingBusyMiddleware turn into a 503.
+    """
+
+    def authenticate(self, request, username=None, password=None, **kwargs):
+        UserModel = get_user_model()
+        if username is None:
+            username = kwargs.get(UserModel.USERNAME_FIELD)
+        try:
+            user = UserModel._default_manager.get_by_natural_key(username)
+        except UserModel.DoesNotExist:
+            # Hash anyway so unknown users take as long as wrong passwords
+            hash_password(password)
+            return None
+
+        is_correct, must_update = verify_password(password, user.password)
+        if not (is_correct and self.user_can_authenticate(user)):
+            return None
+        if must_update:
+            user.password = hash_password(password)
+            user.save(update_fields=['password'])
+            registry.inc('password_rehashes_total')
+
+        return user
@@ -0,0 +1,75 @@
+import threading
+from collections import deque
+
+from django.db.utils import OperationalError
+
+
+class PoolTimeout(OperationalError):
+    """Raised when no pooled connection becomes available in time"""
+
+
+class ConnectionPool:
+    """Thread safe pool of open DB-API connections
+
+    At most `max_size` connections are checked out at once; callers
+    block up to `timeout` seconds for one to be returned. Idle
+    connections are reused most recently returned first, after passing
+    `check(connection)` when given; those failing it are closed.
+    """
+
+    def __init__(self, connect, max_size, timeout=30, check=None):
+        self._connect = connect
+        self._check = check
+        self._idle = deque()
+        self._slots = threading.BoundedSemaphore(max_size)
+        self._lock = threading.Lock()
+        self.max_size = max_size
+        self.timeout = timeout
+
+    def get(self):
+        """Checks out an idle connection, opening one if none is idle"""
+        if not self._slots.acquire(timeout=self.timeout):
+            raise PoolTimeout(
+                f'No connection available within {self.timeout} seconds.'
+            )
+        connection = self._get_idle()
+        if connection is None:
+            try:
+                connection = self._connect()
+            except Exception:
+                self._slots.release()
+                raise
+
+        return connection
+
+    def _get_idle(self):
+        """Returns a working idle connection, None if there is none"""
+        while True:
+            with self._lock:
+                connection = self._idle.pop() if self._idle else None
+            if (
+                connection is None or self._check is None
+                or self._check(connection)
+            ):
+                return connection
+            try:
+                connection.close()
+            except Exception:
+                pass
+
+    def put(self, connection, discard=False):
+        """Returns a checked out connection, closing it if discarded"""
+        try:
+            if discard:
+                connection.close()
+            else:
+                with self._lock:
+                    self._idle.append(connection)
+        finally:
+            self._slots.release()
+
+    def close(self):
+        """Closes every idle connection"""
+        with self._lock:
+            while self._idle:
+                self._idle.pop().close()
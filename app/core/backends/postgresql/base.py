@@ -0,0 +1,135 @@
+"""PostgreSQL backend with connection health checks and optional pooling
+
+Extra keys read from the database settings:
+
+    CONN_HEALTH_CHECKS: check persistent connections still work before
+        their first use in each request, reconnecting when they don't.
+    POOL: {'MAX_SIZE': int, 'TIMEOUT': seconds} to share a per-process
+        pool of connections between threads instead of opening one per
+        thread. Closing a connection returns it to the pool. With health
+        checks enabled, idle connections are checked when checked out.
+"""
+import os
+import threading
+
+from django.db.backends.postgresql import base
+from psycopg2 import extensions
+
+from core.backends.pool import ConnectionPool
+
+
+_pools = {}
+_pools_lock = threading.Lock()
+
+
+def get_pool(alias, options, connect, check=None):
+    """Returns the pool for a database alias in the current process"""
+    key = (os.getpid(), alias)
+    with _pools_lock:
+        if key not in _pools:
+            _pools[key] = ConnectionPool(
+                connect,
+                max_size=options.get('MAX_SIZE', 10),
+                timeout=options.get('TIMEOUT', 30),
+                check=check,
+            )
+
+        return _pools[key]
+
+
+def is_connection_usable(connection):
+    """Returns whether an idle DB-API connection still works"""
+    if connection.closed:
+        return False
+    try:
+        with connection.cursor() as cursor:
+            cursor.execute('SELECT 1')
+        if not connection.autocommit:
+            connection.rollback()
+    except base.Database.Error:
+        return False
+
+    return True
+
+
+class DatabaseWrapper(base.DatabaseWrapper):
+    health_check_done = False
+
+    @property
+    def health_check_enabled(self):
+        return self.settings_dict.get('CONN_HEALTH_CHECKS', False)
+
+    @property
+    def pool(self):
+        options = self.settings_dict.get('POOL')
+        if not options:
+            return None
+
+        return get_pool(
+            self.alias, options, self._connect_for_pool,
+            is_connection_usable if self.health_check_enabled else None
+        )
+
+    def _connect_for_pool(self):
+        return base.Database.connect(**self.get_connection_params())
+
+    def get_new_connection(self, conn_params):
+        """Opens a connection, checking it out of the pool when enabled"""
+        pool = self.pool
+        if pool is None:
+            return super().get_new_connection(conn_params)
+
+        connection = pool.get()
+        options = self.settings_dict['OPTIONS']
+        try:
+            self.isolation_level = options['isolation_level']
+        except KeyError:
+            self.isolation_level = connection.isolation_level
+        else:
+            if self.isolation_level != connection.isolation_level:
+                connection.set_session(isolation_level=self.isolation_level)
+
+        return connection
+
+    def connect(self):
+        super().connect()
+        self.health_check_done = True
+
+    def _close(self):
+        pool = self.pool
+        if pool is None or self.connection is None:
+            return super()._close()
+
+        connection = self.connection
+        status = connection.get_transaction_status()
+        discard = (
+            connection.closed
+            or status == extensions.TRANSACTION_STATUS_UNKNOWN
+        )
+        with self.wrap_database_errors:
+            if not discard and status != extensions.TRANSACTION_STATUS_IDLE:
+                connection.rollback()
+            pool.put(connection, discard=discard)
+
+    def close_if_unusable_or_obsolete(self):
+        """Runs at request boundaries; re-arms the health check"""
+        super().close_if_unusable_or_obsolete()
+        self.health_check_done = False
+
+    def close_if_health_check_failed(self):
+        """Closes a reused connection that no longer works"""
+        if (
+            self.connection is None
+            or not self.health_check_enabled
+            or self.health_check_done
+            or self.in_atomic_block
+        ):
+            return
+        if not self.is_usable():
+            self.close()
+        self.health_check_done = True
+
+    def _cursor(self, name=None):
+        self.close_if_health_check_failed()
+
+        return super()._cursor(name)
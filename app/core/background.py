@@ -0,0 +1,66 @@
+"""
+Side effects run after the response on a pool of background threads.
+
+Meant for slow work the client doesn't need to wait for, such as
+deleting files. Tasks still queued when the process exits are lost, so
+they must be safe to skip or have another way to be resumed.
+"""
+import logging
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+from django.conf import settings
+from django.db import connections, transaction
+
+
+logger = logging.getLogger(__name__)
+
+_executor = None
+_executor_lock = threading.Lock()
+
+
+def get_executor():
+    """Returns the process' executor, created on first use"""
+    global _executor
+
+    with _executor_lock:
+        if _executor is None:
+            _executor = ThreadPoolExecutor(
+                max_workers=settings.BACKGROUND_WORKERS,
+                thread_name_prefix='background'
+            )
+
+    return _executor
+
+
+def run_task(func, *args):
+    """Runs a task, logging its errors instead of raising them"""
+    try:
+        func(*args)
+    except Exception:
+        logger.exception('Background task %s failed', func.__qualname__)
+
+
+def _run_in_thread(func, *args):
+    try:
+        run_task(func, *args)
+    finally:
+        # Worker threads outlive requests, which close their connections
+        connections.close_all()
+
+
+def submit(func, *args):
+    """Runs func(*args) in the background
+
+    With BACKGROUND_TASKS_EAGER the task runs right away in the calling
+    thread instead.
+    """
+    if settings.BACKGROUND_TASKS_EAGER:
+        run_task(func, *args)
+    else:
+        get_executor().submit(_run_in_thread, func, *args)
+
+
+def submit_on_commit(func, *args):
+    """Runs func(*args) in the background once the transaction commits"""
+    transaction.on_commit(lambda: submit(func, *args))
@@ -0,0 +1,27 @@
+from django.conf import settings
+from django.core.checks import Warning, register
+
+
+PROCESS_LOCAL_CACHES = (
+    'django.core.cache.backends.locmem.LocMemCache',
+    'django.core.cache.backends.dummy.DummyCache',
+)
+
+
+@register()
+def check_replica_pin_cache(app_configs, **kwargs):
+    """Warns when replicas are used without a cache shared by processes"""
+    if not settings.DATABASE_REPLICAS:
+        return []
+    cache = settings.CACHES.get(settings.REPLICA_PIN_CACHE, {})
+    backend = cache.get('BACKEND')
+    if backend not in PROCESS_LOCAL_CACHES:
+        return []
+
+    return [Warning(
+        f'REPLICA_PIN_CACHE "{settings.REPLICA_PIN_CACHE}" is not shared '
+        'between processes, users may not read their own writes from '
+        'other worker processes.',
+        hint='Point REPLICA_PIN_CACHE to a database or memcached cache.',
+        id='core.W001',
+    )]
@@ -0,0 +1,21 @@
+"""
+Helpers deleting large amounts of rows without long running statements.
+"""
+import time
+
+
+def delete_in_batches(queryset, batch_size=1000, pause=0):
+    """Deletes the rows of `queryset` by primary key, a batch at a time
+
+    Each batch is a separate statement, so locks are held briefly. Sleeps
+    `pause` seconds between batches. Returns the number of deleted rows.
+    """
+    model = queryset.model
+    deleted = 0
+    while True:
+        pks = list(queryset.values_list('pk', flat=True)[:batch_size])
+        if not pks:
+            return deleted
+        deleted += model._base_manager.filter(pk__in=pks).delete()[0]
+        if pause:
+            time.sleep(pause)
@@ -0,0 +1,133 @@
+"""Routes safe reads of recipe data to read replicas
+
+Reads only go to replicas inside `read_from_replicas()` (or between
+`set_replica_reads(True)` and `set_replica_reads(False)`), outside of
+transactions and for users that did not write recently, so clients
+always read their own writes. Recent writers are remembered in the
+REPLICA_PIN_CACHE cache, which has to be shared by all worker processes.
+"""
+import random
+import threading
+import time
+from contextlib import contextmanager
+
+from django.conf import settings
+from django.core.cache import caches
+from django.db import DEFAULT_DB_ALIAS, DatabaseError, connections
+
+
+_state = threading.local()
+_replica_status = {}
+
+
+def set_replica_reads(enabled):
+    """Allows or forbids replica reads for the current thread"""
+    _state.replica_reads = enabled
+    if enabled:
+        _state.used_replicas = set()
+
+
+@contextmanager
+def read_from_replicas():
+    """Allows replica reads for the current thread within the block"""
+    previous = getattr(_state, 'replica_reads', False)
+    set_replica_reads(True)
+    try:
+        yield
+    finally:
+        set_replica_reads(previous)
+
+
+def _pin_key(user_id):
+    return f'replica-pin:{user_id}'
+
+
+def pin_to_primary(user_id):
+    """Sends the user's reads to the primary for a short while"""
+    caches[settings.REPLICA_PIN_CACHE].set(
+        _pin_key(user_id), True, settings.REPLICA_PIN_SECONDS
+    )
+
+
+def is_pinned(user_id):
+    """Returns whether the user recently wrote to the primary"""
+    return bool(caches[settings.REPLICA_PIN_CACHE].get(_pin_key(user_id)))
+
+
+def replica_is_available(alias):
+    """Returns whether a replica accepts connections, caching the result"""
+    available, checked_at = _replica_status.get(alias, (True, None))
+    now = time.monotonic()
+    retry_after = settings.REPLICA_RETRY_SECONDS
+    if checked_at is None or now - checked_at >= retry_after:
+        try:
+            connections[alias].ensure_connection()
+            available = True
+        except DatabaseError:
+            connections[alias].close()
+            available = False
+        _replica_status[alias] = (available, now)
+
+    return available
+
+
+def fail_over():
+    """Stops replica reads after a failed query
+
+    Replicas read from by the current thread are closed and marked
+    unavailable for REPLICA_RETRY_SECONDS. Returns whether there were
+    any, in which case the reads can be retried on the primary.
+    """
+    if not getattr(_state, 'replica_reads', False):
+        return False
+    used = _state.used_replicas
+    now = time.monotonic()
+    for alias in used:
+        try:
+            connections[alias].close()
+        except DatabaseError:
+            pass
+        _replica_status[alias] = (False, now)
+    set_replica_reads(False)
+
+    return bool(used)
+
+
+class ReplicaRouter:
+    """Database router sending safe recipe reads to available replicas"""
+    replicated_models = {
+        'recipe', 'tag', 'ingredient', 'recipe_tags', 'recipe_ingredients'
+    }
+
+    def db_for_read(self, model, **hints):
+        if (
+            not getattr(_state, 'replica_reads', False)
+            or model._meta.app_label != 'core'
+            or model._meta.model_name not in self.replicated_models
+            or connections[DEFAULT_DB_ALIAS].in_atomic_block
+        ):
+            return DEFAULT_DB_ALIAS
+
+        replicas = [
+            alias for alias in settings.DATABASE_REPLICAS
+            if replica_is_available(alias)
+        ]
+
+        if not replicas:
+            return DEFAULT_DB_ALIAS
+        alias = random.choice(replicas)
+        _state.used_replicas.add(alias)
+
+        return alias
+
+    def db_for_write(self, model, **hints):
+        return DEFAULT_DB_ALIAS
+
+    def allow_relation(self, obj1, obj2, **hints):
+        return True
+
+    def allow_migrate(self, db, app_label, model_name=None, **hints):
+        if db in settings.DATABASE_REPLICAS:
+            return False
+
+        return None
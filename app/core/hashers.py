@@ -0,0 +1,106 @@
+"""
+Password hashing tuned from the settings.
+
+PASSWORD_HASH_ITERATIONS sets the PBKDF2 work factor. Stored hashes made
+with other parameters are upgraded when their users next log in. Hashing
+runs in a bounded number of slots per process, so that bursts of logins
+can't take every CPU core from the other requests.
+"""
+import threading
+import time
+
+from django.conf import settings
+from django.contrib.auth.hashers import (
+    PBKDF2PasswordHasher, get_hasher, identify_hasher, is_password_usable,
+    make_password
+)
+
+from core.metrics import registry
+
+
+class ConfigurablePBKDF2PasswordHasher(PBKDF2PasswordHasher):
+    """PBKDF2 hasher taking its iterations from PASSWORD_HASH_ITERATIONS
+
+    Keeps Django's algorithm name so existing hashes stay valid, and
+    reports hashes with other iterations as needing an update.
+    """
+
+    @property
+    def iterations(self):
+        return settings.PASSWORD_HASH_ITERATIONS
+
+
+class HashingBusy(Exception):
+    """No hashing slot was freed in time"""
+
+
+class HashingSlots:
+    """Limits the number of passwords hashed at the same time
+
+    Callers hash on their own thread once they get a slot, waiting at
+    most `timeout` seconds for one. PBKDF2 releases the GIL, so other
+    requests keep running while the slots are busy.
+    """
+
+    def __init__(self, size, timeout):
+        self.semaphore = threading.BoundedSemaphore(size)
+        self.timeout = timeout
+
+    def run(self, func, *args):
+        start = time.perf_counter()
+        if not self.semaphore.acquire(timeout=self.timeout):
+            raise HashingBusy
+        registry.observe(
+            'password_hash_wait_seconds', time.perf_counter() - start
+        )
+        try:
+            return func(*args)
+        finally:
+            self.semaphore.release()
+
+
+_slots = None
+_slots_lock = threading.Lock()
+
+
+def get_slots():
+    global _slots
+
+    with _slots_lock:
+        if _slots is None:
+            _slots = HashingSlots(
+                settings.PASSWORD_HASH_CONCURRENCY,
+                settings.PASSWORD_HASH_TIMEOUT
+            )
+
+    return _slots
+
+
+def verify_password(password, encoded):
+    """Checks a password against a stored hash in a hashing slot
+
+    Returns whether the password is correct and whether the hash was made
+    with other hasher parameters than the current ones.
+    """
+    if password is None or not is_password_usable(encoded):
+        return False, False
+
+    def verify():
+        try:
+            hasher = identify_hasher(encoded)
+        except ValueError:
+            # Malformed hash or unknown algorithm, as in check_password()
+            return False, False
+        preferred = get_hasher('default')
+        must_update = (
+            hasher.algorithm != preferred.algorithm
+            or preferred.must_update(encoded)
+        )
+        return hasher.verify(password, encoded), must_update
+
+    return get_slots().run(verify)
+
+
+def hash_password(password):
+    """Hashes a password with the current hasher in a hashing slot"""
+    return get_slots().run(make_password, password)
@@ -0,0 +1,142 @@
+"""
+Idempotency-Key support for POST requests.
+
+Clients retrying a create with the same Idempotency-Key header get the
+response of the first request instead of creating a duplicate. Keys are
+scoped to the user, or to the client address for anonymous requests, and
+kept for IDEMPOTENCY_KEY_TTL. While the first request is processed its key
+is only held for IDEMPOTENCY_KEY_LEASE, so that a key left behind by a
+killed worker can be retried.
+"""
+import json
+import zlib
+
+from django.conf import settings
+from django.db import IntegrityError, transaction
+from django.utils import timezone
+from django.utils.crypto import salted_hmac
+from django.utils.translation import ugettext_lazy as _
+
+from rest_framework.exceptions import ValidationError
+from rest_framework.response import Response
+from rest_framework.throttling import BaseThrottle
+from rest_framework.utils.encoders import JSONEncoder
+
+from core.exceptions import Conflict, UnprocessableEntity
+from core.models import IdempotencyRecord
+
+
+HEADER = 'HTTP_IDEMPOTENCY_KEY'
+# Response headers stored along with the response data
+REPLAYED_HEADERS = ('ETag', 'Location')
+MAX_KEY_LENGTH = IdempotencyRecord._meta.get_field('key').max_length
+
+
+def get_scope(request):
+    if request.user.is_authenticated:
+        return f'user:{request.user.pk}'
+
+    return f'anon:{BaseThrottle().get_ident(request)}'
+
+
+def get_fingerprint(request):
+    """Returns a digest of the request method, path and data
+
+    The digest is keyed with SECRET_KEY, so stored fingerprints can't be
+    used to guess the data, passwords included.
+    """
+    data = request.data
+    if hasattr(data, 'lists'):
+        data = dict(data.lists())
+    content = json.dumps(
+        [request.method, request.path, data],
+        cls=JSONEncoder, sort_keys=True, default=str
+    )
+
+    return salted_hmac('core.idempotency', content).hexdigest()
+
+
+class IdempotencyMixin:
+    """Replays the response of creates repeated with an Idempotency-Key
+
+    Only successful responses are kept, a failed request can be retried
+    with the same key. A key reused with different data is rejected.
+    """
+
+    def create(self, request, *args, **kwargs):
+        key = request.META.get(HEADER)
+        if key is None:
+            return super().create(request, *args, **kwargs)
+        if not key or len(key) > MAX_KEY_LENGTH:
+            raise ValidationError(_('Invalid Idempotency-Key header.'))
+
+        scope = get_scope(request)
+        fingerprint = get_fingerprint(request)
+        now = timezone.now()
+        records = IdempotencyRecord.objects.filter(scope=scope, key=key)
+        records.filter(expires__lte=now).delete()
+        try:
+            with transaction.atomic():
+                record = IdempotencyRecord.objects.create(
+                    scope=scope,
+                    key=key,
+                    fingerprint=fingerprint,
+                    expires=now + settings.IDEMPOTENCY_KEY_LEASE,
+                )
+        except IntegrityError:
+            return self.replay(records.get(), fingerprint)
+
+        try:
+            response = super().create(request, *args, **kwargs)
+        except Exception:
+            record.delete()
+            raise
+
+        if response.status_code >= 300:
+            record.delete()
+            return response
+
+        # Stored once the view has set all of the response headers
+        self.idempotency_record = record
+
+        return response
+
+    def finalize_response(self, request, response, *args, **kwargs):
+        response = super().finalize_response(
+            request, response, *args, **kwargs
+        )
+        record = getattr(self, 'idempotency_record', None)
+        if record is not None:
+            self.idempotency_record = None
+            headers = {
+                name: response[name] for name in REPLAYED_HEADERS
+                if response.has_header(name)
+            }
+            # Updates nothing if the lease expired and another request
+            # took the key over
+            IdempotencyRecord.objects.filter(pk=record.pk).update(
+                status_code=response.status_code,
+                body=zlib.compress(
+                    json.dumps(response.data, cls=JSONEncoder).encode()
+                ),
+                headers=json.dumps(headers),
+                expires=timezone.now() + settings.IDEMPOTENCY_KEY_TTL,
+            )
+
+        return response
+
+    def replay(self, record, fingerprint):
+        """Returns the stored response of an earlier request"""
+        if record.fingerprint != fingerprint:
+            raise UnprocessableEntity(_(
+                'Idempotency-Key was already used with other request data.'
+            ))
+        if record.status_code is None:
+            raise Conflict(_(
+                'A request with this Idempotency-Key is in progress.'
+            ))
+
+        data = json.loads(zlib.decompress(bytes(record.body)))
+        headers = json.loads(record.headers)
+        headers['Idempotent-Replayed'] = 'true'
+        return Response(data, status=record.status_code, headers=headers)
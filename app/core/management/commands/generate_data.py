@@ -0,0 +1,212 @@
+import io
+import random
+import uuid
+
+from PIL import Image
+
+from django.contrib.auth import get_user_model
+from django.contrib.auth.hashers import make_password
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from django.core.management.base import BaseCommand
+from django.db import connection, transaction
+
+from core.models import Tag, Ingredient, Recipe, recipe_image_file_path
+
+
+class Command(BaseCommand):
+    """Django command to fill the database with synthetic data"""
+
+    help = (
+        'Creates users owning tags, ingredients and recipes linked to '
+        'them, using bulk inserts.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--users', type=int, default=10,
+            help='Number of users to create.'
+        )
+        parser.add_argument(
+            '--recipes', type=int, default=100,
+            help='Recipes per user.'
+        )
+        parser.add_argument(
+            '--tags', type=int, default=20,
+            help='Tags per user.'
+        )
+        parser.add_argument(
+            '--ingredients', type=int, default=100,
+            help='Ingredients per user.'
+        )
+        parser.add_argument(
+            '--tags-per-recipe', type=int, default=3,
+            help='Tags linked to each recipe.'
+        )
+        parser.add_argument(
+            '--ingredients-per-recipe', type=int, default=8,
+            help='Ingredients linked to each recipe.'
+        )
+        parser.add_argument(
+            '--images', type=float, default=0.5,
+            help='Fraction of recipes with an image file.'
+        )
+        parser.add_argument(
+            '--password', default='password',
+            help='Password of the created users.'
+        )
+        parser.add_argument(
+            '--batch-size', type=int, default=1000,
+            help='Rows per INSERT statement.'
+        )
+        parser.add_argument(
+            '--seed', type=int,
+            help='Random seed, for reproducible data sets.'
+        )
+
+    def handle(self, *args, **options):
+        """Handle the command"""
+        self.random = random.Random(options['seed'])
+        self.batch_size = options['batch_size']
+        self.image = self.get_image() if options['images'] else None
+        # Hashing is slow on purpose, every user shares the same hash
+        password = make_password(options['password'])
+        run = uuid.uuid4().hex[:8]
+
+        # Each transaction creates about batch size recipes
+        users_per_batch = max(
+            1, self.batch_size // max(1, options['recipes'])
+        )
+        created = 0
+        for start in range(0, options['users'], users_per_batch):
+            count = min(users_per_batch, options['users'] - start)
+            with transaction.atomic():
+                self.create_users(run, start, count, password, options)
+            created += count
+            self.stdout.write(f'Created {created}/{options["users"]} users')
+
+        self.stdout.write(self.style.SUCCESS(
+            f'Created {created} users with password '
+            f'"{options["password"]}", e.g. user0.{run}@example.com'
+        ))
+
+    def get_image(self):
+        """Returns the content of a small JPEG image"""
+        content = io.BytesIO()
+        Image.new('RGB', (64, 64), (200, 120, 40)).save(content, 'JPEG')
+        return content.getvalue()
+
+    def create_users(self, run, start, count, password, options):
+        """Creates `count` users and their data"""
+        User = get_user_model()
+        emails = [
+            f'user{index}.{run}@example.com'
+            for index in range(start, start + count)
+        ]
+        self.bulk_create(
+            User,
+            (
+                User(email=email, name=f'User {email}', password=password)
+                for email in emails
+            )
+        )
+        user_ids = list(
+            User.objects.filter(email__in=emails).values_list('id', flat=True)
+        )
+
+        tag_ids = self.create_names(Tag, user_ids, options['tags'])
+        ingredient_ids = self.create_names(
+            Ingredient, user_ids, options['ingredients']
+        )
+        recipes = self.create_recipes(user_ids, options)
+        self.link(
+            Recipe.tags.through, 'tag_id', recipes, tag_ids,
+            options['tags_per_recipe']
+        )
+        self.link(
+            Recipe.ingredients.through, 'ingredient_id', recipes,
+            ingredient_ids, options['ingredients_per_recipe']
+        )
+
+    def create_names(self, model, user_ids, count):
+        """Creates `count` named objects per user
+
+        Returns the created ids grouped by user id.
+        """
+        name = model.__name__
+        self.bulk_create(
+            model,
+            (
+                model(user_id=user_id, name=f'{name} {index}')
+                for user_id in user_ids
+                for index in range(count)
+            )
+        )
+
+        return self.group_by_user(model, user_ids)
+
+    def create_recipes(self, user_ids, options):
+        """Creates recipes per user, returning their ids grouped by user"""
+        self.bulk_create(
+            Recipe,
+            (
+                Recipe(
+                    user_id=user_id,
+                    title=f'Recipe {index}',
+                    time_minutes=self.random.randint(1, 180),
+                    price=self.random.randint(100, 9999) / 100,
+                    link=f'https://example.com/recipes/{index}',
+                    image=self.save_image(options['images']),
+                )
+                for user_id in user_ids
+                for index in range(options['recipes'])
+            )
+        )
+
+        return self.group_by_user(Recipe, user_ids)
+
+    def save_image(self, fraction):
+        """Writes an image file to the media root with given probability"""
+        if self.image is None or self.random.random() >= fraction:
+            return None
+
+        return default_storage.save(
+            recipe_image_file_path(None, 'image.jpg'), ContentFile(self.image)
+        )
+
+    def bulk_create(self, model, objs):
+        """Inserts objects in batches the database backend supports"""
+        objs = list(objs)
+        fields = [
+            field for field in model._meta.concrete_fields
+            if not field.primary_key
+        ]
+        batch_size = connection.ops.bulk_batch_size(fields, objs)
+        model.objects.bulk_create(
+            objs, batch_size=max(1, min(self.batch_size, batch_size))
+        )
+
+    def group_by_user(self, model, user_ids):
+        """Returns ids of the users' objects, grouped by user id"""
+        groups = {user_id: [] for user_id in user_ids}
+        rows = model.objects.filter(
+            user_id__in=user_ids
+        ).values_list('user_id', 'id')
+        for user_id, object_id in rows:
+            groups[user_id].append(object_id)
+
+        return groups
+
+    def link(self, through, target_field, recipes, targets, per_recipe):
+        """Links each recipe to random objects of the same user"""
+        self.bulk_create(
+            through,
+            (
+                through(recipe_id=recipe_id, **{target_field: target_id})
+                for user_id, recipe_ids in recipes.items()
+                for recipe_id in recipe_ids
+                for target_id in self.random.sample(
+                    targets[user_id], min(per_recipe, len(targets[user_id]))
+                )
+            )
+        )
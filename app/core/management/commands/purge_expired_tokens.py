@@ -0,0 +1,31 @@
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+
+from core.cleanup import delete_in_batches
+from core.models import AuthToken
+
+
+class Command(BaseCommand):
+    """Django command to delete expired auth tokens"""
+
+    help = 'Deletes expired auth tokens in batches, meant to run periodically.'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--batch-size', type=int, default=1000,
+            help='Tokens deleted per statement.'
+        )
+        parser.add_argument(
+            '--pause', type=float, default=0,
+            help='Seconds to sleep between batches.'
+        )
+
+    def handle(self, *args, **options):
+        """Handle the command"""
+        deleted = delete_in_batches(
+            AuthToken.objects.filter(expires__lte=timezone.now()),
+            options['batch_size'],
+            options['pause']
+        )
+
+        self.stdout.write(f'Deleted {deleted} expired tokens.')
@@ -0,0 +1,34 @@
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+
+from core.cleanup import delete_in_batches
+from core.models import IdempotencyRecord
+
+
+class Command(BaseCommand):
+    """Django command to delete expired idempotency records"""
+
+    help = (
+        'Deletes stored responses of expired Idempotency-Key headers in '
+        'batches, meant to run periodically.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--batch-size', type=int, default=1000,
+            help='Records deleted per statement.'
+        )
+        parser.add_argument(
+            '--pause', type=float, default=0,
+            help='Seconds to sleep between batches.'
+        )
+
+    def handle(self, *args, **options):
+        """Handle the command"""
+        deleted = delete_in_batches(
+            IdempotencyRecord.objects.filter(expires__lte=timezone.now()),
+            options['batch_size'],
+            options['pause']
+        )
+
+        self.stdout.write(f'Deleted {deleted} expired idempotency records.')
@@ -0,0 +1,29 @@
+import os
+
+from django.conf import settings
+from django.core.management import call_command
+from django.core.management.base import BaseCommand, CommandError
+
+from recipe_app import server
+
+
+class Command(BaseCommand):
+    """Django command to run the application server chosen by APP_SERVER"""
+
+    def handle(self, *args, **options):
+        """Handle the command"""
+        try:
+            name = server.get_server()
+        except ValueError as exc:
+            raise CommandError(str(exc))
+
+        if name == 'runserver':
+            port = os.environ.get('PORT', 8000)
+            call_command('runserver', f'0.0.0.0:{port}')
+            return
+
+        config = os.path.join(settings.BASE_DIR, 'gunicorn.conf.py')
+        self.stdout.write(f'Starting {name}...')
+        os.execvp('gunicorn', [
+            'gunicorn', '--config', config, server.APPLICATIONS[name]
+        ])
@@ -0,0 +1,240 @@
+"""Prometheus style metrics aggregated per process
+
+Each thread records into its own shard, so recording never takes a
+lock; shards are merged when metrics are collected. With METRICS_DIR
+set, every process periodically dumps its totals there and collection
+merges the files of all processes, so any worker can serve /metrics.
+Dumps are named after the process id and a random token, so a reused
+pid never takes over the file of a dead process. The dumps of exited
+processes are folded into a single archive file by the server.
+"""
+import bisect
+import glob
+import json
+import os
+import threading
+import time
+import uuid
+
+from django.conf import settings
+
+
+DURATION_BUCKETS = (
+    0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10
+)
+SIZE_BUCKETS = (100, 1000, 10000, 100000, 1000000, 10000000)
+QUERY_COUNT_BUCKETS = (0, 1, 2, 5, 10, 20, 50, 100)
+ARCHIVE_NAME = 'metrics-archive.json'
+
+
+class Registry:
+    """Thread sharded store of counters and histograms"""
+
+    def __init__(self):
+        self._local = threading.local()
+        self._shards = []
+        self._lock = threading.Lock()
+        self._metrics = {}
+        self._flushed_at = 0
+        self._dump_pid = None
+        self._dump_token = None
+
+    def counter(self, name, documentation):
+        """Declares a counter"""
+        self._metrics[name] = ('counter', documentation, None)
+
+    def histogram(self, name, documentation, buckets=DURATION_BUCKETS):
+        """Declares a histogram with the given upper bounds"""
+        self._metrics[name] = ('histogram', documentation, tuple(buckets))
+
+    def _get_shard(self):
+        shard = getattr(self._local, 'shard', None)
+        if shard is None:
+            shard = self._local.shard = {}
+            with self._lock:
+                self._shards.append(shard)
+
+        return shard
+
+    def inc(self, name, labels=None, value=1):
+        """Increments a counter"""
+        key = (name, tuple(sorted((labels or {}).items())))
+        shard = self._get_shard()
+        shard[key] = shard.get(key, 0) + value
+
+    def observe(self, name, value, labels=None):
+        """Records a value in a histogram"""
+        buckets = self._metrics[name][2]
+        key = (name, tuple(sorted((labels or {}).items())))
+        shard = self._get_shard()
+        sample = shard.get(key)
+        if sample is None:
+            sample = shard[key] = [0] * (len(buckets) + 3)
+        sample[bisect.bisect_left(buckets, value)] += 1
+        sample[-2] += value
+        sample[-1] += 1
+
+    def collect(self):
+        """Returns the totals of every thread in this process"""
+        with self._lock:
+            shards = list(self._shards)
+        totals = {}
+        for shard in shards:
+            _merge(totals, list(shard.items()))
+
+        return totals
+
+    def collect_all(self):
+        """Returns the totals of every process sharing METRICS_DIR"""
+        directory = settings.METRICS_DIR
+        totals = self.collect()
+        if not directory:
+            return totals
+
+        self.flush()
+        own_file = self._get_dump_path(directory)
+        for path in glob.glob(os.path.join(directory, 'metrics-*.json')):
+            if path != own_file:
+                _merge(totals, _read_dump(path))
+
+        return totals
+
+    def flush(self, interval=0):
+        """Dumps this process' totals to METRICS_DIR, at most per interval"""
+        directory = settings.METRICS_DIR
+        now = time.monotonic()
+        if not directory or now - self._flushed_at < interval:
+            return
+        self._flushed_at = now
+
+        _write_dump(self._get_dump_path(directory), self.collect())
+
+    def _get_dump_path(self, directory):
+        pid = os.getpid()
+        if self._dump_pid != pid:
+            self._dump_pid, self._dump_token = pid, uuid.uuid4().hex
+
+        name = f'metrics-{pid}-{self._dump_token}.json'
+
+        return os.path.join(directory, name)
+
+    def render(self):
+        """Renders all metrics in the Prometheus text exposition format"""
+        samples = {}
+        for (name, labels), value in self.collect_all().items():
+            samples.setdefault(name, []).append((labels, value))
+
+        lines = []
+        for name, (kind, documentation, buckets) in self._metrics.items():
+            lines.append(f'# HELP {name} {documentation}')
+            lines.append(f'# TYPE {name} {kind}')
+            for labels, value in sorted(samples.get(name, [])):
+                if kind == 'counter':
+                    lines.append(f'{name}{_format_labels(labels)} {value}')
+                    continue
+                cumulative = 0
+                for bound, count in zip(buckets + ('+Inf', ), value):
+                    cumulative += count
+                    bucket_labels = _format_labels(labels + (('le', bound), ))
+                    lines.append(f'{name}_bucket{bucket_labels} {cumulative}')
+                lines.append(f'{name}_sum{_format_labels(labels)} {value[-2]}')
+                lines.append(
+                    f'{name}_count{_format_labels(labels)} {value[-1]}'
+                )
+
+        return '\n'.join(lines) + '\n'
+
+
+def _merge(totals, samples):
+    for key, value in samples:
+        if isinstance(value, list):
+            current = totals.setdefault(key, [0] * len(value))
+            for index, item in enumerate(value):
+                current[index] += item
+        else:
+            totals[key] = totals.get(key, 0) + value
+
+
+def archive_dumps(pid=None):
+    """Folds the dumps of an exited process, or of all, into the archive"""
+    directory = settings.METRICS_DIR
+    if not directory:
+        return
+    pattern = f'metrics-{pid or "*"}-*.json'
+    paths = glob.glob(os.path.join(directory, pattern))
+    if not paths:
+        return
+
+    archive = os.path.join(directory, ARCHIVE_NAME)
+    totals = {}
+    for path in [archive] + paths:
+        _merge(totals, _read_dump(path))
+    _write_dump(archive, totals)
+    for path in paths:
+        os.remove(path)
+
+
+def _read_dump(path):
+    try:
+        with open(path) as dump:
+            samples = json.load(dump)
+    except (OSError, ValueError):
+        return []
+
+    return [
+        ((name, tuple(map(tuple, labels))), value)
+        for name, labels, value in samples
+    ]
+
+
+def _write_dump(path, totals):
+    samples = [
+        [name, labels, value] for (name, labels), value in totals.items()
+    ]
+    with open(f'{path}.tmp', 'w') as dump:
+        json.dump(samples, dump)
+    os.replace(f'{path}.tmp', path)
+
+
+def _format_labels(labels):
+    if not labels:
+        return ''
+    pairs = ','.join(
+        '{}="{}"'.format(
+            name,
+            str(value).replace('\\', '\\\\').replace('"', '\\"')
+            .replace('\n', '\\n')
+        )
+        for name, value in labels
+    )
+
+    return f'{{{pairs}}}'
+
+
+registry = Registry()
+registry.counter(
+    'http_requests_total', 'Requests by route, method and status.'
+)
+registry.histogram(
+    'http_request_duration_seconds', 'Request latency by route.'
+)
+registry.histogram(
+    'http_response_size_bytes', 'Response body size by route.', SIZE_BUCKETS
+)
+registry.histogram(
+    'http_request_db_queries', 'Database queries per request by route.',
+    QUERY_COUNT_BUCKETS
+)
+registry.histogram(
+    'http_request_db_duration_seconds',
+    'Time spent in database queries per request by route.'
+)
+registry.histogram(
+    'login_duration_seconds', 'Token login latency by outcome.'
+)
+registry.histogram(
+    'password_hash_wait_seconds', 'Time spent waiting for a hashing slot.'
+)
+registry.counter(
+    'password_rehashes_total', 'Stored password hashes upgraded on login.'
+)
@@ -0,0 +1,255 @@
+import heapq
+import json
+import logging
+import os
+import sys
+import time
+from contextlib import ExitStack
+
+from django.conf import settings
+from django.core.exceptions import MiddlewareNotUsed
+from django.db import connections
+from django.http import HttpResponse
+
+from rest_framework import status
+
+from core.hashers import HashingBusy
+from core.metrics import registry
+
+
+logger = logging.getLogger('core.performance')
+
+
+class QueryStats:
+    """Database execute wrapper counting and timing queries"""
+
+    def __init__(self):
+        self.count = 0
+        self.duration = 0
+
+    def __call__(self, execute, sql, params, many, context):
+        start = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.duration += time.perf_counter() - start
+            self.count += 1
+
+
+class QueryRecorder:
+    """Database execute wrapper keeping the slowest queries of a request
+
+    Queries slower than `slow_query_ms` are logged as they complete. Kept
+    queries only hold the code objects and line numbers of their stack,
+    which are resolved into a call site when the request is logged.
+    """
+
+    def __init__(self, keep, slow_query_ms=None):
+        self.keep = keep
+        self.slow_query_ms = slow_query_ms
+        self.count = 0
+        self.duration = 0
+        self.slowest = []
+
+    def __call__(self, execute, sql, params, many, context):
+        start = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            duration = time.perf_counter() - start
+            self.count += 1
+            self.duration += duration
+            self.record(sql, params, many, duration)
+
+    def record(self, sql, params, many, duration):
+        """Keeps the query if it is among the slowest and logs slow ones"""
+        is_kept = len(self.slowest) < self.keep or (
+            self.keep and duration > self.slowest[0][0]
+        )
+        is_slow = (
+            self.slow_query_ms is not None
+            and duration * 1000 >= self.slow_query_ms
+        )
+        if not (is_kept or is_slow):
+            return
+
+        stack = capture_stack()
+        query = {
+            'sql': sql,
+            'params': redact_params(params, many),
+            'duration_ms': round(duration * 1000, 2),
+        }
+        if is_kept:
+            item = (duration, self.count, query, stack)
+            if len(self.slowest) < self.keep:
+                heapq.heappush(self.slowest, item)
+            else:
+                heapq.heapreplace(self.slowest, item)
+        if is_slow:
+            logger.warning(json.dumps(dict(
+                query, call_site=get_call_site(stack), event='slow_query'
+            )))
+
+    def get_slowest(self):
+        """Returns the kept queries with their call sites, slowest first"""
+        return [
+            dict(query, call_site=get_call_site(stack))
+            for _, _, query, stack in sorted(self.slowest, reverse=True)
+        ]
+
+
+def redact_params(params, many=False):
+    """Replaces query parameters with their type names"""
+    if many:
+        return f'{len(params)} parameter sets'
+    if isinstance(params, dict):
+        return {name: type(value).__name__ for name, value in params.items()}
+
+    return [type(value).__name__ for value in params or ()]
+
+
+def capture_stack():
+    """Returns the code and line number of each caller, innermost first"""
+    stack = []
+    frame = sys._getframe(1)
+    while frame is not None:
+        stack.append((frame.f_code, frame.f_lineno))
+        frame = frame.f_back
+
+    return stack
+
+
+def get_call_site(stack):
+    """Returns the innermost project code frame of a captured stack"""
+    for code, lineno in stack:
+        filename = code.co_filename
+        if (
+            filename.startswith(settings.BASE_DIR)
+            and filename != __file__
+            and 'site-packages' not in filename
+        ):
+            path = os.path.relpath(filename, settings.BASE_DIR)
+            return f'{path}:{lineno} in {code.co_name}'
+
+    return None
+
+
+def get_route(request):
+    """Returns the URL name of the view that handled the request"""
+    match = getattr(request, 'resolver_match', None)
+    if match is None:
+        return '<unmatched>'
+
+    return match.view_name or match._func_path
+
+
+class MetricsMiddleware:
+    """Records latency, response size and DB usage of each request"""
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        stats = QueryStats()
+        start = time.perf_counter()
+        with ExitStack() as stack:
+            for connection in connections.all():
+                stack.enter_context(connection.execute_wrapper(stats))
+            response = self.get_response(request)
+        duration = time.perf_counter() - start
+
+        route = get_route(request)
+        if response.streaming:
+            size = int(response.get('Content-Length', 0))
+        else:
+            size = len(response.content)
+        labels = {'route': route}
+        registry.inc('http_requests_total', {
+            'route': route,
+            'method': request.method,
+            'status': str(response.status_code),
+        })
+        registry.observe('http_request_duration_seconds', duration, labels)
+        registry.observe('http_response_size_bytes', size, labels)
+        registry.observe('http_request_db_queries', stats.count, labels)
+        registry.observe(
+            'http_request_db_duration_seconds', stats.duration, labels
+        )
+        registry.flush(settings.METRICS_FLUSH_INTERVAL)
+
+        return response
+
+
+class SlowRequestLoggingMiddleware:
+    """Logs slow requests and queries as JSON records
+
+    Requests over SLOW_REQUEST_THRESHOLD_MS are logged with their view,
+    user, query count and the slowest SQL statements with redacted
+    parameters and the code that issued them. Queries over
+    SLOW_QUERY_THRESHOLD_MS are logged on their own.
+    """
+
+    def __init__(self, get_response):
+        if (
+            settings.SLOW_REQUEST_THRESHOLD_MS is None
+            and settings.SLOW_QUERY_THRESHOLD_MS is None
+        ):
+            raise MiddlewareNotUsed
+        self.get_response = get_response
+
+    def __call__(self, request):
+        recorder = QueryRecorder(
+            settings.SLOW_REQUEST_LOGGED_QUERIES,
+            settings.SLOW_QUERY_THRESHOLD_MS
+        )
+        start = time.perf_counter()
+        with ExitStack() as stack:
+            for connection in connections.all():
+                stack.enter_context(connection.execute_wrapper(recorder))
+            response = self.get_response(request)
+        duration_ms = (time.perf_counter() - start) * 1000
+
+        threshold = settings.SLOW_REQUEST_THRESHOLD_MS
+        if threshold is not None and duration_ms >= threshold:
+            user = getattr(request, 'user', None)
+            logger.warning(json.dumps({
+                'event': 'slow_request',
+                'method': request.method,
+                'path': request.path,
+                'view': get_route(request),
+                'status': response.status_code,
+                'duration_ms': round(duration_ms, 2),
+                'user_id': user.pk if user and user.is_authenticated else None,
+                'query_count': recorder.count,
+                'query_duration_ms': round(recorder.duration * 1000, 2),
+                'slowest_queries': recorder.get_slowest(),
+            }))
+
+        return response
+
+
+class HashingBusyMiddleware:
+    """Answers with a 503 when no password hashing slot frees up in time
+
+    Covers the views hashing passwords outside of the API, like the admin
+    login, which would otherwise fail with a 500.
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        return self.get_response(request)
+
+    def process_exception(self, request, exception):
+        if not isinstance(exception, HashingBusy):
+            return None
+
+        response = HttpResponse(
+            'Service temporarily unavailable, try again later.',
+            status=status.HTTP_503_SERVICE_UNAVAILABLE,
+            content_type='text/plain'
+        )
+        response['Retry-After'] = '1'
+
+        return response
@@ -0,0 +1,18 @@
+# Generated by Django 2.1.15 on 2026-10-19 11:19
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0011_user_deletion_requested_at'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='idempotencyrecord',
+            name='headers',
+            field=models.TextField(default='{}'),
+        ),
+    ]
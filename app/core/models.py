@@ -1,7 +1,9 @@
+import binascii
 import uuid
 import os
 from django.db import models
 from django.conf import settings
+from django.utils import timezone
 from django.contrib.auth.models import AbstractBaseUser, BaseUserManager, PermissionsMixin
 
 
@@ -45,12 +47,74 @@ class User(AbstractBaseUser, PermissionsMixin):
     name = models.CharField(max_length=255)
     is_active = models.BooleanField(default=True)
     is_staff = models.BooleanField(default=False)
+    # Incremented to revoke the user's signed access tokens
+    token_version = models.PositiveIntegerField(default=0)
+    # Set when the user deleted their account, until its data is purged
+    deletion_requested_at = models.DateTimeField(null=True, db_index=True)
 
     objects = UserManager()
 
     USERNAME_FIELD = 'email'
 
 
+class AuthTokenManager(models.Manager):
+
+    def create_token(self, user, device=''):
+        """Creates a token for the user's device, revoking its old ones"""
+        self.filter(user=user, device=device).delete()
+        now = timezone.now()
+
+        return self.create(
+            key=binascii.hexlify(os.urandom(20)).decode(),
+            user=user,
+            device=device,
+            last_used=now,
+            expires=now + settings.AUTH_TOKEN_TTL,
+        )
+
+
+class AuthToken(models.Model):
+    """Expiring API token of one of a user's devices"""
+    key = models.CharField(max_length=40, primary_key=True)
+    user = models.ForeignKey(
+        settings.AUTH_USER_MODEL,
+        related_name='auth_tokens',
+        on_delete=models.CASCADE
+    )
+    device = models.CharField(max_length=255, blank=True)
+    created = models.DateTimeField(auto_now_add=True)
+    last_used = models.DateTimeField()
+    expires = models.DateTimeField(db_index=True)
+
+    objects = AuthTokenManager()
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['user', 'device']),
+        ]
+
+    def __str__(self):
+        return f'{self.user} {self.device}'.strip()
+
+
+class IdempotencyRecord(models.Model):
+    """Outcome of a request sent with an Idempotency-Key header
+
+    Records without a status are for requests still being processed.
+    """
+    scope = models.CharField(max_length=64)
+    key = models.CharField(max_length=255)
+    fingerprint = models.CharField(max_length=64)
+    status_code = models.PositiveSmallIntegerField(null=True)
+    body = models.BinaryField(null=True)
+    # JSON object of the response headers sent again on replays
+    headers = models.TextField(default='{}')
+    expires = models.DateTimeField(db_index=True)
+
+    class Meta:
+        unique_together = ('scope', 'key')
+
+
 class Tag(models.Model):
     """Tag model to be used for recipe"""
     name = models.CharField(max_length=255)
@@ -75,6 +139,36 @@ class Ingredient(models.Model):
         return self.name
 
 
+class RecipeManager(models.Manager):
+
+    def compare_and_set(self, recipe, fields):
+        """Writes the recipe's fields unless its row changed since it was read
+
+        The version check and the write are a single UPDATE statement.
+        Returns whether the row was written, incrementing the version.
+        Files saved to the storage for a rejected write are deleted.
+        """
+        new_files = [
+            getattr(recipe, name) for name in fields
+            if isinstance(self.model._meta.get_field(name), models.FileField)
+            and not getattr(recipe, name)._committed
+        ]
+        values = {
+            name: self.model._meta.get_field(name).pre_save(recipe, False)
+            for name in fields
+        }
+        updated = self.filter(pk=recipe.pk, version=recipe.version).update(
+            version=models.F('version') + 1, **values
+        )
+        if updated:
+            recipe.version += 1
+        else:
+            for file in new_files:
+                file.delete(save=False)
+
+        return bool(updated)
+
+
 class Recipe(models.Model):
     """Recipe model"""
     title = models.CharField(max_length=255)
@@ -88,6 +182,17 @@ class Recipe(models.Model):
         settings.AUTH_USER_MODEL,
         on_delete=models.CASCADE
     )
+    # Incremented by every update, clients send it back in If-Match
+    version = models.PositiveIntegerField(default=1)
+
+    objects = RecipeManager()
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['user', 'price', 'id']),
+            models.Index(fields=['user', 'time_minutes', 'id']),
+            models.Index(fields=['user', 'title', 'id']),
+        ]
 
     def __str__(self):
         return self.title
\ No newline at end of file
@@ -0,0 +1,162 @@
+"""
+Sampling profiler for single requests.
+
+A background thread periodically captures the stack of the thread serving
+a request and counts identical stacks. Profiles are written in the
+collapsed stack format understood by flamegraph.pl, speedscope and
+similar tools: one `frame;frame;frame count` line per distinct stack,
+outermost frame first.
+"""
+import os
+import random
+import re
+import sys
+import threading
+import time
+import uuid
+from collections import Counter
+
+from django.conf import settings
+
+from core.middleware import get_route
+
+
+class StackSampler:
+    """Samples the call stack of a thread at a fixed interval"""
+
+    def __init__(self, thread_id=None, interval=0.005):
+        self.thread_id = thread_id or threading.get_ident()
+        self.interval = interval
+        self.stacks = Counter()
+        self._stopped = threading.Event()
+        self._thread = threading.Thread(
+            target=self._run, name='stack-sampler', daemon=True
+        )
+
+    def start(self):
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self._stopped.set()
+        self._thread.join()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc_info):
+        self.stop()
+
+    def _run(self):
+        while not self._stopped.wait(self.interval):
+            frame = sys._current_frames().get(self.thread_id)
+            if frame is not None:
+                self.stacks[collapse_stack(frame)] += 1
+
+    @property
+    def sample_count(self):
+        return sum(self.stacks.values())
+
+    def write(self, path):
+        """Writes the samples to `path` in collapsed stack format"""
+        with open(path, 'w') as profile:
+            for stack, count in self.stacks.most_common():
+                profile.write(f'{stack} {count}\n')
+
+
+def collapse_stack(frame):
+    """Returns the stack ending at `frame` as `outer;...;inner` string"""
+    names = []
+    while frame is not None:
+        code = frame.f_code
+        names.append(
+            f'{code.co_name} ({format_filename(code.co_filename)}'
+            f':{code.co_firstlineno})'
+        )
+        frame = frame.f_back
+
+    return ';'.join(reversed(names))
+
+
+def format_filename(filename):
+    """Shortens project and library paths to their importable part"""
+    filename = os.path.abspath(filename)
+    if filename.startswith(settings.BASE_DIR):
+        return os.path.relpath(filename, settings.BASE_DIR)
+    _, separator, path = filename.rpartition('site-packages' + os.sep)
+    if separator:
+        return path
+
+    return os.path.basename(filename)
+
+
+class ProfilingMixin:
+    """Profiles single requests of staff users with a stack sampler
+
+    Requests sending the X-Profile header or picked with probability
+    PROFILING_SAMPLE_RATE are sampled from before their authentication,
+    so that authentication, throttling and permission checks show up in
+    the profile. Sampling stops as soon as the request turns out not to
+    come from a staff user. The profile is written to PROFILING_DIR and
+    its file name returned in the X-Profile-Id response header. A process
+    profiles at most one request at a time.
+    """
+    profiling_lock = threading.Lock()
+
+    def should_profile(self, request):
+        if not settings.PROFILING_ENABLED:
+            return False
+
+        return (
+            'HTTP_X_PROFILE' in request.META
+            or random.random() < settings.PROFILING_SAMPLE_RATE
+        )
+
+    def initial(self, request, *args, **kwargs):
+        if (
+            self.should_profile(request)
+            and self.profiling_lock.acquire(blocking=False)
+        ):
+            self.sampler = StackSampler(
+                interval=settings.PROFILING_INTERVAL
+            ).start()
+        super().initial(request, *args, **kwargs)
+        if getattr(self, 'sampler', None) and not request.user.is_staff:
+            self.stop_profiling()
+
+    def handle_exception(self, exc):
+        try:
+            return super().handle_exception(exc)
+        except Exception:
+            self.stop_profiling()
+            raise
+
+    def finalize_response(self, request, response, *args, **kwargs):
+        response = super().finalize_response(
+            request, response, *args, **kwargs
+        )
+        sampler = self.stop_profiling()
+        if sampler is not None and request.user.is_staff:
+            profile_id = '{}-{}-{}-{}.folded'.format(
+                time.strftime('%Y%m%d%H%M%S'),
+                re.sub(r'[^\w.-]', '-', get_route(request)),
+                os.getpid(),
+                uuid.uuid4().hex[:12],
+            )
+            os.makedirs(settings.PROFILING_DIR, exist_ok=True)
+            sampler.write(os.path.join(settings.PROFILING_DIR, profile_id))
+            response['X-Profile-Id'] = profile_id
+
+        return response
+
+    def stop_profiling(self):
+        """Stops the running profile, if any, and returns its sampler"""
+        sampler = getattr(self, 'sampler', None)
+        if sampler is not None:
+            self.sampler = None
+            try:
+                sampler.stop()
+            finally:
+                self.profiling_lock.release()
+
+        return sampler
@@ -0,0 +1,56 @@
+import re
+
+from rest_framework import renderers
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+
+# Number tokens orjson may format differently from the stdlib encoder:
+# floats in exponent notation, which orjson uses less for small numbers
+FLOAT_MISMATCH = re.compile(rb'(?:^|[:,\[])-?(?:\d+(?:\.\d+)?[eE]|0\.0000)')
+
+
+class FastJSONRenderer(renderers.JSONRenderer):
+    """JSON renderer using orjson when installed
+
+    Output matches the default renderer byte for byte, except for NaN and
+    infinity which orjson renders as null instead of rejecting them. The
+    output is checked for floats orjson may format differently, which are
+    rendered again by the stdlib encoder, like pretty printed, ASCII only
+    or non compact output.
+    """
+    options = (
+        orjson.OPT_NON_STR_KEYS | orjson.OPT_PASSTHROUGH_DATETIME
+        if orjson else None
+    )
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        """Renders data into JSON, returning a bytestring"""
+        if (
+            orjson is None or data is None or self.ensure_ascii
+            or not self.compact
+            or self.get_indent(accepted_media_type, renderer_context or {})
+        ):
+            return super().render(data, accepted_media_type, renderer_context)
+
+        try:
+            ret = orjson.dumps(
+                data, default=self.encoder_class().default,
+                option=self.options
+            )
+        except orjson.JSONEncodeError:
+            return super().render(data, accepted_media_type, renderer_context)
+        if FLOAT_MISMATCH.search(ret):
+            return super().render(data, accepted_media_type, renderer_context)
+
+        # Keep the output a strict javascript subset, like the default
+        # renderer does, by escaping the line and paragraph separators.
+        if b'\xe2\x80' in ret:
+            ret = ret.replace(b'\xe2\x80\xa8', b'\\u2028').replace(
+                b'\xe2\x80\xa9', b'\\u2029'
+            )
+
+        return ret
@@ -0,0 +1,41 @@
+"""
+Test runner storing uploaded files in temporary directories.
+
+Each process of a parallel run (`manage.py test --parallel`) gets its own
+MEDIA_ROOT, like it gets its own test database.
+"""
+import os
+import shutil
+import tempfile
+
+from django.conf import settings
+from django.test import runner
+from django.test.utils import override_settings
+
+
+def init_worker(counter):
+    """Switches a parallel test process to its own databases and media"""
+    runner._init_worker(counter)
+    media_root = os.path.join(
+        settings.MEDIA_ROOT, f'worker-{runner._worker_id}'
+    )
+    override_settings(MEDIA_ROOT=media_root).enable()
+
+
+class ParallelTestSuite(runner.ParallelTestSuite):
+    init_worker = init_worker
+
+
+class TestRunner(runner.DiscoverRunner):
+    parallel_test_suite = ParallelTestSuite
+
+    def setup_test_environment(self, **kwargs):
+        super().setup_test_environment(**kwargs)
+        self.media_root = tempfile.mkdtemp(prefix='recipe-app-media-')
+        self.media_settings = override_settings(MEDIA_ROOT=self.media_root)
+        self.media_settings.enable()
+
+    def teardown_test_environment(self, **kwargs):
+        self.media_settings.disable()
+        shutil.rmtree(self.media_root, ignore_errors=True)
+        super().teardown_test_environment(**kwargs)
@@ -0,0 +1,124 @@
+import asyncio
+import json
+
+from django.core.wsgi import get_wsgi_application
+from django.test import SimpleTestCase
+from django.urls import reverse
+
+from core.asgi import ASGIHandler
+
+
+def echo_application(environ, start_response):
+    """WSGI application echoing parts of the environ as JSON"""
+    body = environ['wsgi.input'].read(int(environ['CONTENT_LENGTH']))
+    start_response('201 Created', [('Content-Type', 'application/json')])
+    keys = ('REQUEST_METHOD', 'PATH_INFO', 'QUERY_STRING', 'CONTENT_TYPE',
+            'HTTP_X_TAGS', 'REMOTE_ADDR')
+
+    return [
+        json.dumps({key: environ.get(key) for key in keys}).encode(),
+        body,
+    ]
+
+
+def call(handler, scope, messages):
+    """Calls an ASGI handler, returning the messages it sent"""
+    received = list(messages)
+    sent = []
+
+    async def receive():
+        return received.pop(0)
+
+    async def send(message):
+        sent.append(message)
+
+    asyncio.run(handler(scope, receive, send))
+
+    return sent
+
+
+def http_scope(path, method='GET', query_string=b'', headers=()):
+    return {
+        'type': 'http',
+        'method': method,
+        'path': path,
+        'query_string': query_string,
+        'headers': list(headers),
+        'client': ('10.0.0.1', 5000),
+        'server': ('testserver', 80),
+    }
+
+
+class ASGIHandlerTests(SimpleTestCase):
+
+    def test_request_is_passed_to_wsgi_application(self):
+        """Test the environ and streamed body reach the WSGI application"""
+        handler = ASGIHandler(echo_application, max_workers=1)
+        scope = http_scope(
+            '/api/recipes/crème/',
+            method='POST',
+            query_string=b'tags=1,2',
+            headers=[
+                (b'content-type', b'text/plain'),
+                (b'x-tags', b'a'),
+                (b'x-tags', b'b'),
+            ]
+        )
+
+        sent = call(handler, scope, [
+            {'type': 'http.request', 'body': b'hello ', 'more_body': True},
+            {'type': 'http.request', 'body': b'world'},
+        ])
+
+        self.assertEqual(sent[0]['status'], 201)
+        self.assertIn(
+            (b'content-type', b'application/json'), sent[0]['headers']
+        )
+        body = b''.join(message['body'] for message in sent[1:])
+        environ, _, echoed = body.partition(b'}')
+        self.assertEqual(json.loads(environ + b'}'), {
+            'REQUEST_METHOD': 'POST',
+            'PATH_INFO': '/api/recipes/crème/'.encode().decode('latin-1'),
+            'QUERY_STRING': 'tags=1,2',
+            'CONTENT_TYPE': 'text/plain',
+            'HTTP_X_TAGS': 'a,b',
+            'REMOTE_ADDR': '10.0.0.1',
+        })
+        self.assertEqual(echoed, b'hello world')
+        self.assertFalse(sent[-1].get('more_body', False))
+
+    def test_disconnected_client_gets_no_response(self):
+        """Test nothing is sent when the client leaves mid request"""
+        handler = ASGIHandler(echo_application, max_workers=1)
+
+        sent = call(handler, http_scope('/'), [{'type': 'http.disconnect'}])
+
+        self.assertEqual(sent, [])
+
+    def test_lifespan(self):
+        """Test the lifespan protocol is acknowledged"""
+        handler = ASGIHandler(echo_application, max_workers=1)
+
+        sent = call(handler, {'type': 'lifespan'}, [
+            {'type': 'lifespan.startup'},
+            {'type': 'lifespan.shutdown'},
+        ])
+
+        self.assertEqual(
+            [message['type'] for message in sent],
+            ['lifespan.startup.complete', 'lifespan.shutdown.complete']
+        )
+
+    def test_django_application(self):
+        """Test serving the Django application over ASGI"""
+        handler = ASGIHandler(get_wsgi_application(), max_workers=1)
+
+        sent = call(
+            handler,
+            http_scope(reverse('health-live')),
+            [{'type': 'http.request', 'body': b''}]
+        )
+
+        self.assertEqual(sent[0]['status'], 200)
+        body = b''.join(message['body'] for message in sent[1:])
+        self.assertEqual(json.loads(body), {'status': 'ok'})
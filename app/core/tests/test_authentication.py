@@ -0,0 +1,168 @@
+from datetime import timedelta
+
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.test import TestCase
+from django.urls import reverse
+from django.utils import timezone
+
+from rest_framework import status
+from rest_framework.test import APIClient
+
+from core.authentication import (
+    create_access_token, get_deferred_user, revoke_access_tokens
+)
+from core.models import AuthToken
+
+
+ME_URL = reverse('users:me')
+CREATE_TOKEN_URL = reverse('users:auth')
+TAGS_URL = reverse('recipes:tag-list')
+
+
+class ExpiringTokenAuthenticationTests(TestCase):
+
+    def setUp(self):
+        self.user = get_user_model().objects.create_user(
+            email='gustavo@test.com',
+            password='123456'
+        )
+        self.token = AuthToken.objects.create_token(self.user, 'phone')
+        self.client = APIClient()
+        self.client.credentials(HTTP_AUTHORIZATION=f'Token {self.token.key}')
+
+    def test_valid_token(self):
+        """Test requests are authenticated by a valid token"""
+        res = self.client.get(ME_URL)
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(res.json()['email'], self.user.email)
+
+    def test_expired_token(self):
+        """Test expired tokens are rejected"""
+        AuthToken.objects.filter(key=self.token.key).update(
+            expires=timezone.now()
+        )
+
+        res = self.client.get(ME_URL)
+
+        self.assertEqual(res.status_code, status.HTTP_401_UNAUTHORIZED)
+
+    def test_inactive_user(self):
+        """Test tokens of inactive users are rejected"""
+        self.user.is_active = False
+        self.user.save()
+
+        res = self.client.get(ME_URL)
+
+        self.assertEqual(res.status_code, status.HTTP_401_UNAUTHORIZED)
+
+    def test_expiry_is_not_written_on_every_request(self):
+        """Test recently refreshed tokens are used without a write"""
+        last_used = self.token.last_used
+        with self.assertNumQueries(1):
+            self.client.get(ME_URL)
+
+        self.token.refresh_from_db()
+        self.assertEqual(self.token.last_used, last_used)
+
+    def test_expiry_slides_after_the_refresh_interval(self):
+        """Test using an old token pushes its expiry back"""
+        last_used = timezone.now() - timedelta(hours=2)
+        AuthToken.objects.filter(key=self.token.key).update(
+            last_used=last_used, expires=last_used + timedelta(days=1)
+        )
+
+        with self.settings(AUTH_TOKEN_REFRESH_INTERVAL=timedelta(hours=1),
+                           AUTH_TOKEN_TTL=timedelta(days=1)):
+            res = self.client.get(ME_URL)
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.token.refresh_from_db()
+        self.assertGreater(self.token.last_used, last_used)
+        self.assertEqual(
+            self.token.expires, self.token.last_used + timedelta(days=1)
+        )
+
+
+class SignedAccessTokenAuthenticationTests(TestCase):
+
+    def setUp(self):
+        cache.clear()
+        self.user = get_user_model().objects.create_user(
+            email='gustavo@test.com',
+            password='123456'
+        )
+        self.client = APIClient()
+
+    def authenticate(self, token):
+        self.client.credentials(HTTP_AUTHORIZATION=f'Bearer {token}')
+
+    def test_login_issues_access_token(self):
+        """Test logins return an access token accepted by recipe views"""
+        res = self.client.post(CREATE_TOKEN_URL, {
+            'email': 'gustavo@test.com', 'password': '123456'
+        })
+        self.authenticate(res.json()['access_token'])
+
+        res = self.client.get(TAGS_URL)
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+
+    def test_access_token_is_verified_without_queries(self):
+        """Test only the first request loads the user's token version"""
+        self.authenticate(create_access_token(self.user)[0])
+        self.client.get(TAGS_URL)
+
+        # Listing the tags is the only query
+        with self.assertNumQueries(1):
+            res = self.client.get(TAGS_URL)
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+
+    def test_access_token_user_fields_are_loaded(self):
+        """Test fields of access token users are read from the database"""
+        self.user.is_staff = True
+        self.user.save()
+        user = get_deferred_user(self.user.pk, self.user.token_version)
+
+        self.assertEqual(user.email, 'gustavo@test.com')
+        self.assertTrue(user.is_staff)
+
+    def test_expired_access_token(self):
+        """Test access tokens are rejected once expired"""
+        self.authenticate(create_access_token(self.user)[0])
+
+        with self.settings(ACCESS_TOKEN_TTL=timedelta(seconds=-1)):
+            res = self.client.get(TAGS_URL)
+
+        self.assertEqual(res.status_code, status.HTTP_401_UNAUTHORIZED)
+
+    def test_tampered_access_token(self):
+        """Test access tokens with a wrong signature are rejected"""
+        token = create_access_token(self.user)[0]
+        self.authenticate(token[:-1] + ('A' if token[-1] != 'A' else 'B'))
+
+        res = self.client.get(TAGS_URL)
+
+        self.assertEqual(res.status_code, status.HTTP_401_UNAUTHORIZED)
+
+    def test_revoked_access_token(self):
+        """Test bumping the token version revokes access tokens"""
+        self.authenticate(create_access_token(self.user)[0])
+        self.client.get(TAGS_URL)
+
+        revoke_access_tokens(self.user)
+        res = self.client.get(TAGS_URL)
+
+        self.assertEqual(res.status_code, status.HTTP_401_UNAUTHORIZED)
+
+    def test_access_token_of_inactive_user(self):
+        """Test access tokens of inactive users are rejected"""
+        self.authenticate(create_access_token(self.user)[0])
+        self.user.is_active = False
+        self.user.save()
+
+        res = self.client.get(TAGS_URL)
+
+        self.assertEqual(res.status_code, status.HTTP_401_UNAUTHORIZED)
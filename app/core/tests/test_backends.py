@@ -0,0 +1,113 @@
+from unittest.mock import MagicMock, Mock, patch
+
+from django.db import connection
+from django.db.backends.postgresql.base import Database
+from django.test import SimpleTestCase
+
+from core.backends.pool import ConnectionPool, PoolTimeout
+from core.backends.postgresql.base import (
+    DatabaseWrapper, is_connection_usable
+)
+
+
+class ConnectionPoolTests(SimpleTestCase):
+
+    def test_connections_are_reused(self):
+        """Test returned connections are handed out again"""
+        connect = Mock(side_effect=lambda: Mock())
+        pool = ConnectionPool(connect, max_size=2)
+
+        first = pool.get()
+        pool.put(first)
+        second = pool.get()
+
+        self.assertIs(first, second)
+        self.assertEqual(connect.call_count, 1)
+
+    def test_discarded_connections_are_closed(self):
+        """Test discarded connections are closed and not reused"""
+        pool = ConnectionPool(lambda: Mock(), max_size=1)
+
+        first = pool.get()
+        pool.put(first, discard=True)
+        second = pool.get()
+
+        first.close.assert_called_once_with()
+        self.assertIsNot(first, second)
+
+    def test_dead_idle_connections_are_discarded(self):
+        """Test idle connections failing the check are closed, not reused"""
+        connect = Mock(side_effect=lambda: Mock(dead=False))
+        pool = ConnectionPool(
+            connect, max_size=1, check=lambda connection: not connection.dead
+        )
+        first = pool.get()
+        pool.put(first)
+        first.dead = True
+
+        second = pool.get()
+
+        first.close.assert_called_once_with()
+        self.assertIsNot(first, second)
+        self.assertEqual(connect.call_count, 2)
+
+    def test_pool_size_is_limited(self):
+        """Test checking out more than max_size connections times out"""
+        pool = ConnectionPool(lambda: Mock(), max_size=1, timeout=0.01)
+        pool.get()
+
+        with self.assertRaises(PoolTimeout):
+            pool.get()
+
+    def test_failed_connect_releases_slot(self):
+        """Test a failing connect does not leak a pool slot"""
+        connect = Mock(side_effect=[OSError, Mock()])
+        pool = ConnectionPool(connect, max_size=1, timeout=0.01)
+
+        with self.assertRaises(OSError):
+            pool.get()
+        self.assertIsNotNone(pool.get())
+
+
+class HealthCheckTests(SimpleTestCase):
+
+    def get_wrapper(self, **settings):
+        """Returns an unconnected wrapper holding a stale connection"""
+        settings_dict = dict(connection.settings_dict, **settings)
+        wrapper = DatabaseWrapper(settings_dict, alias='health')
+        wrapper.connection = Mock()
+
+        return wrapper
+
+    @patch.object(DatabaseWrapper, 'is_usable', return_value=False)
+    def test_unusable_connection_is_closed(self, is_usable):
+        """Test a broken persistent connection is closed before use"""
+        wrapper = self.get_wrapper(CONN_HEALTH_CHECKS=True)
+        stale = wrapper.connection
+
+        wrapper.close_if_health_check_failed()
+        wrapper.close_if_health_check_failed()
+
+        is_usable.assert_called_once_with()
+        stale.close.assert_called_once_with()
+        self.assertIsNone(wrapper.connection)
+
+    def test_is_connection_usable(self):
+        """Test pooled connections are checked with a query"""
+        alive = MagicMock(closed=0, autocommit=True)
+        broken = Mock(closed=0)
+        broken.cursor.side_effect = Database.OperationalError
+
+        self.assertTrue(is_connection_usable(alive))
+        self.assertFalse(is_connection_usable(broken))
+        self.assertFalse(is_connection_usable(Mock(closed=1)))
+
+    @patch.object(DatabaseWrapper, 'is_usable', return_value=True)
+    def test_health_check_disabled(self, is_usable):
+        """Test connections are not checked unless enabled"""
+        wrapper = self.get_wrapper(CONN_HEALTH_CHECKS=False)
+
+        wrapper.close_if_health_check_failed()
+
+        is_usable.assert_not_called()
+        self.assertIsNotNone(wrapper.connection)
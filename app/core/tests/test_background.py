@@ -0,0 +1,43 @@
+import threading
+from unittest.mock import patch
+
+from django.test import SimpleTestCase, override_settings
+
+from core import background
+
+
+class BackgroundTests(SimpleTestCase):
+
+    def test_eager_tasks_run_in_calling_thread(self):
+        """Test tasks run right away with BACKGROUND_TASKS_EAGER"""
+        threads = []
+
+        background.submit(lambda: threads.append(threading.current_thread()))
+
+        self.assertEqual(threads, [threading.current_thread()])
+
+    @override_settings(BACKGROUND_TASKS_EAGER=False)
+    def test_tasks_run_in_worker_thread(self):
+        """Test tasks run on the executor's threads"""
+        done = threading.Event()
+        threads = []
+
+        def task(value):
+            threads.append((threading.current_thread().name, value))
+            done.set()
+
+        background.submit(task, 'value')
+
+        self.assertTrue(done.wait(5))
+        self.assertTrue(threads[0][0].startswith('background'))
+        self.assertEqual(threads[0][1], 'value')
+
+    def test_errors_are_logged(self):
+        """Test failing tasks don't raise"""
+        def task():
+            raise ValueError('failed')
+
+        with patch.object(background.logger, 'exception') as exception:
+            background.submit(task)
+
+        exception.assert_called_once()
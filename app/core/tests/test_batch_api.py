@@ -0,0 +1,161 @@
+from django.contrib.auth import get_user_model
+from django.test import TestCase
+from django.urls import reverse
+
+from rest_framework import status
+from rest_framework.test import APIClient
+
+from core.authentication import create_access_token
+from core.models import Tag
+
+
+BATCH_URL = reverse('batch')
+TAGS_URL = reverse('recipes:tag-list')
+ME_URL = reverse('users:me')
+
+
+class PublicBatchApiTests(TestCase):
+    """Tests batch requests without authentication"""
+
+    def setUp(self):
+        self.client = APIClient()
+
+    def test_sub_requests_are_anonymous(self):
+        """Test sub-requests run unauthenticated without batch credentials"""
+        payload = {'requests': [{'method': 'GET', 'path': ME_URL}]}
+        res = self.client.post(BATCH_URL, payload, format='json')
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(
+            res.json()[0]['status'], status.HTTP_401_UNAUTHORIZED
+        )
+
+    def test_empty_batch_fails(self):
+        """Test that a batch without requests is rejected"""
+        res = self.client.post(BATCH_URL, {'requests': []}, format='json')
+
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_batch_size_is_limited(self):
+        """Test that batches over the size limit are rejected"""
+        payload = {'requests': [{'method': 'GET', 'path': ME_URL}] * 21}
+        with self.settings(BATCH_MAX_REQUESTS=20):
+            res = self.client.post(BATCH_URL, payload, format='json')
+
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+
+
+class PrivateBatchApiTests(TestCase):
+    """Tests batch requests for authenticated users"""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = get_user_model().objects.create_user(
+            email='gustavo@test.com',
+            password='123456',
+            name='Gustavo'
+        )
+
+    def setUp(self):
+        self.client = APIClient()
+        self.client.force_authenticate(user=self.user)
+
+    def test_executing_requests_in_order(self):
+        """Test sub-requests share the batch authentication and run in order"""
+        payload = {'requests': [
+            {'method': 'GET', 'path': ME_URL},
+            {'method': 'POST', 'path': TAGS_URL, 'body': {'name': 'Vegan'}},
+            {'method': 'GET', 'path': f'{TAGS_URL}?assigned_only=false'},
+        ]}
+
+        res = self.client.post(BATCH_URL, payload, format='json')
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        me, created, tags = res.json()
+        self.assertEqual(me['status'], status.HTTP_200_OK)
+        self.assertEqual(me['body']['email'], self.user.email)
+        self.assertEqual(created['status'], status.HTTP_201_CREATED)
+        self.assertEqual(tags['body'], [created['body']])
+        self.assertTrue(Tag.objects.filter(user=self.user).exists())
+
+    def test_access_token_authenticates_sub_requests(self):
+        """Test batches authenticated with a Bearer token are not anonymous"""
+        access_token, _ = create_access_token(self.user)
+        client = APIClient()
+        client.credentials(HTTP_AUTHORIZATION=f'Bearer {access_token}')
+        payload = {'requests': [{'method': 'GET', 'path': TAGS_URL}]}
+
+        res = client.post(BATCH_URL, payload, format='json')
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(res.json()[0]['status'], status.HTTP_200_OK)
+
+    def test_access_token_user_is_loaded_for_sub_requests(self):
+        """Test Bearer batches read and update the full user"""
+        access_token, _ = create_access_token(self.user)
+        client = APIClient()
+        client.credentials(HTTP_AUTHORIZATION=f'Bearer {access_token}')
+        payload = {'requests': [
+            {'method': 'PATCH', 'path': ME_URL, 'body': {'name': 'Bob'}},
+            {'method': 'GET', 'path': ME_URL},
+        ]}
+
+        res = client.post(BATCH_URL, payload, format='json')
+
+        updated, me = res.json()
+        self.assertEqual(updated['status'], status.HTTP_200_OK)
+        self.assertEqual(me['body']['email'], self.user.email)
+        self.assertEqual(me['body']['name'], 'Bob')
+        user = get_user_model().objects.get(pk=self.user.pk)
+        self.assertEqual(user.email, 'gustavo@test.com')
+        self.assertEqual(user.name, 'Bob')
+        self.assertTrue(user.check_password('123456'))
+
+    def test_idempotency_key_is_not_shared(self):
+        """Test sub-requests don't inherit the batch Idempotency-Key"""
+        payload = {'requests': [
+            {'method': 'POST', 'path': TAGS_URL, 'body': {'name': 'Vegan'}},
+            {'method': 'POST', 'path': TAGS_URL, 'body': {'name': 'Keto'}},
+        ]}
+
+        res = self.client.post(
+            BATCH_URL, payload, format='json', HTTP_IDEMPOTENCY_KEY='key-1'
+        )
+
+        self.assertEqual(
+            [result['status'] for result in res.json()],
+            [status.HTTP_201_CREATED, status.HTTP_201_CREATED]
+        )
+        self.assertEqual(Tag.objects.filter(user=self.user).count(), 2)
+
+    def test_paths_outside_the_api_are_not_found(self):
+        """Test that only the allowed URL prefixes can be batched"""
+        payload = {'requests': [
+            {'method': 'GET', 'path': '/admin/'},
+            {'method': 'GET', 'path': BATCH_URL},
+        ]}
+
+        res = self.client.post(BATCH_URL, payload, format='json')
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(
+            [item['status'] for item in res.json()],
+            [status.HTTP_404_NOT_FOUND, status.HTTP_404_NOT_FOUND]
+        )
+
+    def test_atomic_batch_rolls_back_on_error(self):
+        """Test an atomic batch is rolled back when a sub-request fails"""
+        payload = {'atomic': True, 'requests': [
+            {'method': 'POST', 'path': TAGS_URL, 'body': {'name': 'Vegan'}},
+            {'method': 'POST', 'path': TAGS_URL, 'body': {}},
+            {'method': 'GET', 'path': TAGS_URL},
+        ]}
+
+        res = self.client.post(BATCH_URL, payload, format='json')
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(
+            [item['status'] for item in res.json()],
+            [status.HTTP_201_CREATED, status.HTTP_400_BAD_REQUEST]
+        )
+        self.assertFalse(Tag.objects.filter(user=self.user).exists())
@@ -1,8 +1,19 @@
-from unittest.mock import patch
+import shutil
+import tempfile
+from datetime import timedelta
+from unittest.mock import MagicMock, patch
+
+from django.contrib.auth import get_user_model
 
 from django.core.management import call_command
+from django.core.management.base import CommandError
 from django.db.utils import OperationalError
 from django.test import TestCase
+from django.utils import timezone
+
+from core.models import (
+    AuthToken, IdempotencyRecord, Tag, Ingredient, Recipe
+)
 
 
 class CommandsTestCase(TestCase):
@@ -11,15 +22,101 @@ class CommandsTestCase(TestCase):
         """Test waiting for db when db is available"""
 
         with patch('django.db.utils.ConnectionHandler.__getitem__') as gi:
-            gi.return_value = True
+            gi.return_value = MagicMock()
             call_command('wait_for_db')
             self.assertEqual(gi.call_count, 1)
+            cursor = gi.return_value.cursor.return_value.__enter__()
+            cursor.execute.assert_called_once_with('SELECT 1')
 
     @patch('time.sleep', return_value=None)
     def test_wait_for_db(self, ts):
-        """Test waiting for db"""
+        """Test waiting for db with exponential backoff"""
 
         with patch('django.db.utils.ConnectionHandler.__getitem__') as gi:
-            gi.side_effect = [OperationalError] * 5 + [True]
+            connection = MagicMock()
+            connection.cursor.side_effect = [OperationalError] * 5 + [
+                MagicMock()
+            ]
+            gi.return_value = connection
             call_command('wait_for_db')
-            self.assertEqual(gi.call_count, 6)
\ No newline at end of file
+            self.assertEqual(gi.call_count, 6)
+            self.assertEqual(connection.close.call_count, 5)
+            self.assertEqual(
+                [call[0][0] for call in ts.call_args_list],
+                [1, 2, 4, 8, 8]
+            )
+
+    @patch('time.monotonic', side_effect=[0, 1, 4, 10])
+    @patch('time.sleep', return_value=None)
+    def test_wait_for_db_timeout(self, ts, tm):
+        """Test waiting for db gives up after the timeout"""
+
+        with patch('django.db.utils.ConnectionHandler.__getitem__') as gi:
+            gi.return_value.cursor.side_effect = OperationalError
+            with self.assertRaises(CommandError):
+                call_command('wait_for_db', timeout=10)
+            self.assertEqual(
+                [call[0][0] for call in ts.call_args_list], [1, 2]
+            )
+
+    def test_generate_data(self):
+        """Test generating users with linked tags, ingredients and recipes"""
+        media_root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, media_root)
+
+        with self.settings(MEDIA_ROOT=media_root):
+            call_command(
+                'generate_data', users=3, recipes=4, tags=2, ingredients=5,
+                tags_per_recipe=2, ingredients_per_recipe=3, images=1,
+                batch_size=5, stdout=MagicMock()
+            )
+            for recipe in Recipe.objects.all():
+                self.assertTrue(
+                    recipe.image.storage.exists(recipe.image.name)
+                )
+
+        self.assertEqual(get_user_model().objects.count(), 3)
+        self.assertEqual(Tag.objects.count(), 6)
+        self.assertEqual(Ingredient.objects.count(), 15)
+        self.assertEqual(Recipe.objects.count(), 12)
+        self.assertEqual(Recipe.tags.through.objects.count(), 24)
+        self.assertEqual(Recipe.ingredients.through.objects.count(), 36)
+        for recipe in Recipe.objects.all():
+            self.assertEqual(
+                set(recipe.tags.values_list('user_id', flat=True)),
+                {recipe.user_id}
+            )
+        user = get_user_model().objects.first()
+        self.assertTrue(user.check_password('password'))
+
+    def test_purge_expired_tokens(self):
+        """Test expired tokens are deleted in batches"""
+        user = get_user_model().objects.create_user('gustavo@test.com')
+        for device in ('a', 'b', 'c'):
+            AuthToken.objects.create_token(user, device)
+        valid = AuthToken.objects.create_token(user, 'valid')
+        AuthToken.objects.exclude(key=valid.key).update(
+            expires=timezone.now()
+        )
+
+        call_command('purge_expired_tokens', batch_size=2, stdout=MagicMock())
+
+        self.assertEqual(
+            list(AuthToken.objects.values_list('key', flat=True)),
+            [valid.key]
+        )
+
+    def test_purge_idempotency_records(self):
+        """Test expired idempotency records are deleted"""
+        now = timezone.now()
+        for key, expires in (('old', now), ('new', now + timedelta(hours=1))):
+            IdempotencyRecord.objects.create(
+                scope='user:1', key=key, fingerprint='', expires=expires
+            )
+
+        call_command('purge_idempotency_records', stdout=MagicMock())
+
+        self.assertEqual(
+            list(IdempotencyRecord.objects.values_list('key', flat=True)),
+            ['new']
+        )
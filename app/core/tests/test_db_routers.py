@@ -0,0 +1,175 @@
+from unittest.mock import patch
+
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.db import OperationalError, connections
+from django.test import SimpleTestCase, TestCase, TransactionTestCase
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from rest_framework import status
+from rest_framework.test import APIClient
+
+from core import checks, db_routers
+from core.models import Recipe, Tag
+from recipes.views import TagViewSet
+
+
+@patch('core.db_routers.replica_is_available', return_value=True)
+class ReplicaRouterTests(SimpleTestCase):
+
+    def setUp(self):
+        self.router = db_routers.ReplicaRouter()
+
+    def test_reads_use_primary_by_default(self, available):
+        """Test reads outside replica blocks go to the primary"""
+        with self.settings(DATABASE_REPLICAS=['replica1']):
+            self.assertEqual(self.router.db_for_read(Recipe), 'default')
+
+    def test_recipe_reads_use_replicas(self, available):
+        """Test recipe data reads go to a replica when allowed"""
+        with self.settings(DATABASE_REPLICAS=['replica1']):
+            with db_routers.read_from_replicas():
+                self.assertEqual(self.router.db_for_read(Tag), 'replica1')
+                self.assertEqual(
+                    self.router.db_for_read(Recipe.tags.through), 'replica1'
+                )
+                self.assertEqual(
+                    self.router.db_for_read(get_user_model()), 'default'
+                )
+
+    def test_unavailable_replicas_fall_back_to_primary(self, available):
+        """Test reads go to the primary when no replica is available"""
+        available.return_value = False
+        with self.settings(DATABASE_REPLICAS=['replica1']):
+            with db_routers.read_from_replicas():
+                self.assertEqual(self.router.db_for_read(Recipe), 'default')
+
+    def test_writes_and_migrations_use_primary(self, available):
+        """Test writes go to the primary and replicas are never migrated"""
+        with self.settings(DATABASE_REPLICAS=['replica1']):
+            self.assertEqual(self.router.db_for_write(Recipe), 'default')
+            self.assertFalse(self.router.allow_migrate('replica1', 'core'))
+            self.assertIsNone(self.router.allow_migrate('default', 'core'))
+
+
+class ReadYourWritesTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = get_user_model().objects.create_user(
+            email='gustavo@test.com',
+            password='123456'
+        )
+
+    def setUp(self):
+        cache.clear()
+        self.client = APIClient()
+        self.client.force_authenticate(user=self.user)
+
+    @patch('core.db_routers.replica_is_available', return_value=True)
+    def test_reads_in_transactions_use_primary(self, available):
+        """Test reads inside a transaction stay on the primary"""
+        router = db_routers.ReplicaRouter()
+        with self.settings(DATABASE_REPLICAS=['replica1']):
+            with db_routers.read_from_replicas():
+                self.assertEqual(router.db_for_read(Recipe), 'default')
+
+    def test_writes_pin_user_to_primary(self):
+        """Test that writing pins the user's reads to the primary"""
+        self.assertFalse(db_routers.is_pinned(self.user.pk))
+
+        res = self.client.post(reverse('recipes:tag-list'), {'name': 'Vegan'})
+
+        self.assertEqual(res.status_code, status.HTTP_201_CREATED)
+        self.assertTrue(db_routers.is_pinned(self.user.pk))
+
+    def test_reads_do_not_pin_user(self):
+        """Test that reading does not pin the user and resets routing"""
+        res = self.client.get(reverse('recipes:tag-list'))
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertFalse(db_routers.is_pinned(self.user.pk))
+        self.assertFalse(db_routers._state.replica_reads)
+
+
+@patch('core.db_routers.replica_is_available', return_value=True)
+class ReplicaReadsTests(TransactionTestCase):
+    multi_db = True
+
+    def setUp(self):
+        cache.clear()
+        self.user = get_user_model().objects.create_user(
+            email='gustavo@test.com',
+            password='123456'
+        )
+        Tag.objects.create(user=self.user, name='Vegan')
+        self.client = APIClient()
+        self.client.force_authenticate(user=self.user)
+
+    def test_list_reads_from_replica(self, available):
+        """Test listing tags queries the replica, not the primary"""
+        with self.settings(DATABASE_REPLICAS=['replica1']), \
+                CaptureQueriesContext(connections['default']) as primary, \
+                CaptureQueriesContext(connections['replica1']) as replica:
+            res = self.client.get(reverse('recipes:tag-list'))
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual([tag['name'] for tag in res.data], ['Vegan'])
+        self.assertTrue(
+            any('core_tag' in query['sql'] for query in replica)
+        )
+        self.assertFalse(
+            any('core_tag' in query['sql'] for query in primary)
+        )
+
+    def test_failed_replica_reads_are_retried_on_primary(self, available):
+        """Test a replica failing mid-request is replaced by the primary"""
+        def fail(execute, sql, params, many, context):
+            raise OperationalError('connection lost')
+
+        with self.settings(DATABASE_REPLICAS=['replica1']), \
+                patch.dict(db_routers._replica_status), \
+                connections['replica1'].execute_wrapper(fail):
+            res = self.client.get(reverse('recipes:tag-list'))
+            status_after = db_routers._replica_status['replica1']
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual([tag['name'] for tag in res.data], ['Vegan'])
+        self.assertFalse(status_after[0])
+        self.assertFalse(db_routers._state.replica_reads)
+
+    def test_replica_reads_are_disabled_after_errors(self, available):
+        """Test an unhandled error does not leave replica reads enabled"""
+        with patch.object(
+            TagViewSet, 'list', side_effect=RuntimeError('boom')
+        ), self.assertRaises(RuntimeError):
+            self.client.get(reverse('recipes:tag-list'))
+
+        self.assertFalse(db_routers._state.replica_reads)
+
+
+class ReplicaPinCacheCheckTests(SimpleTestCase):
+
+    def test_process_local_pin_cache_warns(self):
+        """Test replicas with a process-local pin cache are reported"""
+        with self.settings(DATABASE_REPLICAS=['replica1']):
+            errors = checks.check_replica_pin_cache(None)
+
+        self.assertEqual([error.id for error in errors], ['core.W001'])
+
+    def test_shared_pin_cache_passes(self):
+        """Test replicas with a shared pin cache are accepted"""
+        shared = {
+            'BACKEND': 'django.core.cache.backends.db.DatabaseCache',
+            'LOCATION': 'cache_shared',
+        }
+        with self.settings(
+            DATABASE_REPLICAS=['replica1'],
+            CACHES={'default': shared},
+        ):
+            self.assertEqual(checks.check_replica_pin_cache(None), [])
+
+    def test_no_replicas_passes(self):
+        """Test the pin cache is not checked without replicas"""
+        self.assertEqual(checks.check_replica_pin_cache(None), [])
@@ -0,0 +1,136 @@
+import threading
+from unittest.mock import patch
+
+from django.contrib.auth import authenticate, get_user_model
+from django.test import SimpleTestCase, TestCase, override_settings
+from django.urls import reverse
+
+from rest_framework import status
+from rest_framework.test import APIClient
+
+from core.hashers import HashingBusy, HashingSlots
+from core.metrics import registry
+
+
+CREATE_TOKEN_URL = reverse('users:auth')
+
+
+class HashingSlotsTests(SimpleTestCase):
+
+    def test_busy_slots_time_out(self):
+        """Test callers give up when no slot is freed in time"""
+        slots = HashingSlots(size=1, timeout=0.01)
+        started = threading.Event()
+        finish = threading.Event()
+
+        def hold_slot():
+            started.set()
+            finish.wait()
+
+        holder = threading.Thread(target=slots.run, args=(hold_slot, ))
+        holder.start()
+        started.wait()
+        try:
+            with self.assertRaises(HashingBusy):
+                slots.run(len, 'password')
+        finally:
+            finish.set()
+            holder.join()
+
+        self.assertEqual(slots.run(len, 'password'), 8)
+
+
+@override_settings(
+    PASSWORD_HASHERS=['core.hashers.ConfigurablePBKDF2PasswordHasher'],
+    PASSWORD_HASH_ITERATIONS=1000
+)
+class PasswordRehashTests(TestCase):
+
+    def setUp(self):
+        self.user = get_user_model().objects.create_user(
+            email='gustavo@test.com',
+            password='123456'
+        )
+
+    def test_iterations_come_from_settings(self):
+        """Test hashes use the configured number of iterations"""
+        self.assertTrue(self.user.password.startswith('pbkdf2_sha256$1000$'))
+
+    def test_outdated_hashes_are_upgraded_on_login(self):
+        """Test logging in rehashes passwords with the new parameters"""
+        with self.settings(PASSWORD_HASH_ITERATIONS=2000):
+            user = authenticate(username='gustavo@test.com', password='123456')
+
+        self.assertEqual(user, self.user)
+        self.user.refresh_from_db()
+        self.assertTrue(self.user.password.startswith('pbkdf2_sha256$2000$'))
+        self.assertTrue(self.user.check_password('123456'))
+
+    def test_malformed_hash_fails_login(self):
+        """Test a malformed stored hash is a failed login, not an error"""
+        get_user_model().objects.filter(pk=self.user.pk).update(
+            password='not-a-hash'
+        )
+
+        user = authenticate(username='gustavo@test.com', password='123456')
+
+        self.assertIsNone(user)
+
+    def test_wrong_password_is_not_upgraded(self):
+        """Test hashes are left alone when the password is wrong"""
+        password = self.user.password
+        with self.settings(PASSWORD_HASH_ITERATIONS=2000):
+            user = authenticate(username='gustavo@test.com', password='wrong')
+
+        self.assertIsNone(user)
+        self.user.refresh_from_db()
+        self.assertEqual(self.user.password, password)
+
+
+class LoginHashingTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        get_user_model().objects.create_user(
+            email='gustavo@test.com',
+            password='123456'
+        )
+
+    def setUp(self):
+        self.client = APIClient()
+        self.payload = {'email': 'gustavo@test.com', 'password': '123456'}
+
+    def test_login_is_rejected_when_hashing_is_busy(self):
+        """Test logins fail fast with a 503 when no slot is available"""
+        slots = HashingSlots(size=1, timeout=0)
+        slots.semaphore.acquire()
+        with patch('core.hashers.get_slots', return_value=slots):
+            res = self.client.post(CREATE_TOKEN_URL, self.payload)
+
+        self.assertEqual(res.status_code, status.HTTP_503_SERVICE_UNAVAILABLE)
+        self.assertIn('Retry-After', res)
+
+    def test_admin_login_is_rejected_when_hashing_is_busy(self):
+        """Test admin logins get a 503 when no slot is available"""
+        slots = HashingSlots(size=1, timeout=0)
+        slots.semaphore.acquire()
+        with patch('core.hashers.get_slots', return_value=slots):
+            res = self.client.post(reverse('admin:login'), {
+                'username': 'gustavo@test.com', 'password': '123456'
+            })
+
+        self.assertEqual(res.status_code, status.HTTP_503_SERVICE_UNAVAILABLE)
+        self.assertIn('Retry-After', res)
+
+    def test_login_latency_is_recorded(self):
+        """Test login durations are recorded by outcome"""
+        self.client.post(CREATE_TOKEN_URL, self.payload)
+        self.client.post(
+            CREATE_TOKEN_URL, dict(self.payload, password='wrong')
+        )
+
+        with self.settings(METRICS_DIR=None):
+            text = registry.render()
+
+        self.assertIn('login_duration_seconds_count{outcome="success"}', text)
+        self.assertIn('login_duration_seconds_count{outcome="failure"}', text)
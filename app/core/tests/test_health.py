@@ -0,0 +1,61 @@
+import tempfile
+from unittest.mock import patch
+
+from django.db import DatabaseError
+from django.test import TestCase
+from django.urls import reverse
+
+from rest_framework import status
+
+
+LIVE_URL = reverse('health-live')
+READY_URL = reverse('health-ready')
+
+
+class HealthCheckTests(TestCase):
+
+    def setUp(self):
+        self.media_root = tempfile.TemporaryDirectory()
+        self.settings_override = self.settings(
+            MEDIA_ROOT=self.media_root.name
+        )
+        self.settings_override.enable()
+
+    def tearDown(self):
+        self.settings_override.disable()
+        self.media_root.cleanup()
+
+    def test_live(self):
+        """Test the liveness probe succeeds without checking dependencies"""
+        with self.assertNumQueries(0):
+            res = self.client.get(LIVE_URL)
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(res.json(), {'status': 'ok'})
+
+    def test_ready(self):
+        """Test the readiness probe succeeds when dependencies work"""
+        res = self.client.get(READY_URL)
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(
+            res.json()['checks'], {'database': 'ok', 'storage': 'ok'}
+        )
+
+    def test_not_ready_without_database(self):
+        """Test the readiness probe fails when the database is down"""
+        with patch('django.db.backends.utils.CursorWrapper.execute') as ex:
+            ex.side_effect = DatabaseError
+            res = self.client.get(READY_URL)
+
+        self.assertEqual(res.status_code, status.HTTP_503_SERVICE_UNAVAILABLE)
+        self.assertEqual(res.json()['checks']['database'], 'error')
+
+    def test_not_ready_without_media_storage(self):
+        """Test the readiness probe fails when media can't be written"""
+        self.media_root.cleanup()
+
+        res = self.client.get(READY_URL)
+
+        self.assertEqual(res.status_code, status.HTTP_503_SERVICE_UNAVAILABLE)
+        self.assertEqual(res.json()['checks']['storage'], 'error')
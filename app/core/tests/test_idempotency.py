@@ -0,0 +1,204 @@
+import json
+from datetime import timedelta
+from unittest.mock import patch
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.test import TestCase
+from django.urls import reverse
+from django.utils import timezone
+
+from rest_framework import status
+from rest_framework.test import APIClient
+
+from core.models import IdempotencyRecord, Recipe, Tag
+from recipes.views import TagViewSet
+
+
+RECIPES_URL = reverse('recipes:recipe-list')
+TAGS_URL = reverse('recipes:tag-list')
+CREATE_USER_URL = reverse('users:create')
+
+RECIPE_PAYLOAD = {
+    'title': 'Soup', 'time_minutes': 10, 'price': '5.00',
+    'tags': [], 'ingredients': [],
+}
+
+
+class IdempotencyApiTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = get_user_model().objects.create_user(
+            'ida@test.com', 'password'
+        )
+
+    def setUp(self):
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+    def post(self, url, payload, key='key-1'):
+        return self.client.post(
+            url, payload, format='json', HTTP_IDEMPOTENCY_KEY=key
+        )
+
+    def test_retried_create_is_replayed(self):
+        """Test a repeated key returns the first response"""
+        first = self.post(RECIPES_URL, RECIPE_PAYLOAD)
+        second = self.post(RECIPES_URL, RECIPE_PAYLOAD)
+
+        self.assertEqual(first.status_code, status.HTTP_201_CREATED)
+        self.assertEqual(second.status_code, status.HTTP_201_CREATED)
+        self.assertEqual(second.json(), first.json())
+        self.assertEqual(second['Idempotent-Replayed'], 'true')
+        self.assertEqual(Recipe.objects.count(), 1)
+
+    def test_replay_restores_headers(self):
+        """Test the ETag and Location of the first response are replayed"""
+        first = self.post(RECIPES_URL, RECIPE_PAYLOAD)
+        second = self.post(RECIPES_URL, RECIPE_PAYLOAD)
+        self.post(TAGS_URL, {'name': 'Vegan'}, key='key-2')
+        IdempotencyRecord.objects.filter(key='key-2').update(
+            headers='{"Location": "/api/recipes/tags/1/"}'
+        )
+        tag = self.post(TAGS_URL, {'name': 'Vegan'}, key='key-2')
+
+        record = IdempotencyRecord.objects.get(key='key-1')
+        self.assertEqual(json.loads(record.headers), {'ETag': first['ETag']})
+        self.assertEqual(second['ETag'], first['ETag'])
+        self.assertEqual(tag['Location'], '/api/recipes/tags/1/')
+
+    def test_requests_without_key_are_not_replayed(self):
+        """Test creates without the header are not deduplicated"""
+        self.client.post(RECIPES_URL, RECIPE_PAYLOAD, format='json')
+        self.client.post(RECIPES_URL, RECIPE_PAYLOAD, format='json')
+
+        self.assertEqual(Recipe.objects.count(), 2)
+        self.assertFalse(IdempotencyRecord.objects.exists())
+
+    def test_key_reused_with_other_data(self):
+        """Test a key reused for a different request is rejected"""
+        self.post(TAGS_URL, {'name': 'Vegan'})
+        res = self.post(TAGS_URL, {'name': 'Dessert'})
+
+        self.assertEqual(res.status_code, status.HTTP_422_UNPROCESSABLE_ENTITY)
+        self.assertEqual(Tag.objects.count(), 1)
+
+    def test_request_in_progress(self):
+        """Test a key of a request still being processed conflicts"""
+        self.post(TAGS_URL, {'name': 'Vegan'})
+        IdempotencyRecord.objects.update(status_code=None, body=None)
+
+        res = self.post(TAGS_URL, {'name': 'Vegan'})
+
+        self.assertEqual(res.status_code, status.HTTP_409_CONFLICT)
+
+    def test_abandoned_request_can_be_retried(self):
+        """Test a key held past its lease by a dead worker is taken over"""
+        self.post(TAGS_URL, {'name': 'Vegan'})
+        IdempotencyRecord.objects.update(
+            status_code=None, body=None,
+            expires=timezone.now() - timedelta(seconds=1)
+        )
+
+        res = self.post(TAGS_URL, {'name': 'Vegan'})
+
+        self.assertEqual(res.status_code, status.HTTP_201_CREATED)
+        self.assertNotIn('Idempotent-Replayed', res)
+
+    def test_key_is_leased_until_response_is_stored(self):
+        """Test keys are held for the lease, then for the TTL once stored"""
+        leases = []
+        perform_create = TagViewSet.perform_create
+
+        def create(view, serializer):
+            leases.append(IdempotencyRecord.objects.get().expires)
+            perform_create(view, serializer)
+
+        with patch.object(TagViewSet, 'perform_create', create):
+            self.post(TAGS_URL, {'name': 'Vegan'})
+        leased_until = timezone.now() + settings.IDEMPOTENCY_KEY_LEASE
+
+        self.assertLessEqual(leases[0], leased_until)
+        self.assertGreater(
+            IdempotencyRecord.objects.get().expires, leased_until
+        )
+
+    def test_request_outliving_its_lease_completes(self):
+        """Test a request whose key was taken over still responds"""
+        perform_create = TagViewSet.perform_create
+
+        def create(view, serializer):
+            IdempotencyRecord.objects.all().delete()
+            perform_create(view, serializer)
+
+        with patch.object(TagViewSet, 'perform_create', create):
+            res = self.post(TAGS_URL, {'name': 'Vegan'})
+
+        self.assertEqual(res.status_code, status.HTTP_201_CREATED)
+        self.assertFalse(IdempotencyRecord.objects.exists())
+
+    def test_failed_request_can_be_retried(self):
+        """Test error responses are not stored"""
+        res = self.post(TAGS_URL, {'name': ''})
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+
+        self.post(TAGS_URL, {'name': ''})
+
+        self.assertFalse(IdempotencyRecord.objects.exists())
+
+    def test_keys_are_scoped_per_user(self):
+        """Test other users can use the same key"""
+        self.post(TAGS_URL, {'name': 'Vegan'})
+        other = get_user_model().objects.create_user('bo@test.com', 'pass')
+        self.client.force_authenticate(other)
+
+        res = self.post(TAGS_URL, {'name': 'Vegan'})
+
+        self.assertEqual(res.status_code, status.HTTP_201_CREATED)
+        self.assertNotIn('Idempotent-Replayed', res)
+        self.assertEqual(Tag.objects.count(), 2)
+
+    def test_expired_key_can_be_reused(self):
+        """Test keys are forgotten after their TTL"""
+        self.post(TAGS_URL, {'name': 'Vegan'})
+        IdempotencyRecord.objects.update(
+            expires=timezone.now() - timedelta(seconds=1)
+        )
+
+        res = self.post(TAGS_URL, {'name': 'Vegan'})
+
+        self.assertNotIn('Idempotent-Replayed', res)
+        self.assertEqual(Tag.objects.count(), 2)
+
+    def test_invalid_key(self):
+        """Test overlong keys are rejected"""
+        res = self.post(TAGS_URL, {'name': 'Vegan'}, key='k' * 256)
+
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertFalse(Tag.objects.exists())
+
+    def test_create_user_is_replayed(self):
+        """Test anonymous user sign ups are deduplicated"""
+        self.client.force_authenticate(None)
+        payload = {
+            'email': 'new@test.com', 'password': 'password', 'name': 'New'
+        }
+
+        self.post(CREATE_USER_URL, payload)
+        res = self.post(CREATE_USER_URL, payload)
+
+        self.assertEqual(res.status_code, status.HTTP_201_CREATED)
+        self.assertEqual(res['Idempotent-Replayed'], 'true')
+        self.assertEqual(
+            get_user_model().objects.filter(email='new@test.com').count(), 1
+        )
+
+    def test_fingerprint_is_keyed(self):
+        """Test fingerprints can't be recomputed without the secret key"""
+        payload = {'name': 'Vegan'}
+        self.post(TAGS_URL, payload)
+        with self.settings(SECRET_KEY='other'):
+            res = self.post(TAGS_URL, payload)
+
+        self.assertEqual(res.status_code, status.HTTP_422_UNPROCESSABLE_ENTITY)
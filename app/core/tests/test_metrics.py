@@ -0,0 +1,171 @@
+import os
+import tempfile
+import threading
+from unittest.mock import patch
+
+from django.contrib.auth import get_user_model
+from django.test import SimpleTestCase, TestCase, override_settings
+from django.urls import reverse
+
+from rest_framework.test import APIClient
+
+from core.metrics import ARCHIVE_NAME, Registry, archive_dumps
+
+
+METRICS_URL = reverse('metrics')
+
+
+def get_registry():
+    """Returns a registry with a counter and a histogram"""
+    registry = Registry()
+    registry.counter('jobs_total', 'Jobs done.')
+    registry.histogram('job_seconds', 'Job duration.', buckets=(1, 5))
+
+    return registry
+
+
+class RegistryTests(SimpleTestCase):
+
+    def test_render_counters_and_histograms(self):
+        """Test metrics are rendered in the text exposition format"""
+        registry = get_registry()
+        registry.inc('jobs_total', {'queue': 'a"b'})
+        registry.inc('jobs_total', {'queue': 'a"b'}, value=2)
+        for value in (0.5, 1, 3, 8):
+            registry.observe('job_seconds', value)
+
+        with self.settings(METRICS_DIR=None):
+            text = registry.render()
+
+        self.assertIn('# TYPE jobs_total counter\n', text)
+        self.assertIn('jobs_total{queue="a\\"b"} 3\n', text)
+        self.assertIn('job_seconds_bucket{le="1"} 2\n', text)
+        self.assertIn('job_seconds_bucket{le="5"} 3\n', text)
+        self.assertIn('job_seconds_bucket{le="+Inf"} 4\n', text)
+        self.assertIn('job_seconds_sum 12.5\n', text)
+        self.assertIn('job_seconds_count 4\n', text)
+
+    def test_threads_are_aggregated(self):
+        """Test values recorded by different threads are summed"""
+        registry = get_registry()
+
+        def work():
+            for _ in range(100):
+                registry.inc('jobs_total')
+
+        threads = [threading.Thread(target=work) for _ in range(4)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        self.assertEqual(registry.collect(), {('jobs_total', ()): 400})
+
+    def test_processes_are_aggregated(self):
+        """Test metrics dumped by other processes are merged"""
+        registry = get_registry()
+        registry.inc('jobs_total')
+        registry.observe('job_seconds', 2)
+        with tempfile.TemporaryDirectory() as directory:
+            with open(os.path.join(directory, 'metrics-1.json'), 'w') as f:
+                f.write(
+                    '[["jobs_total", [], 4],'
+                    ' ["job_seconds", [], [0, 0, 1, 9, 1]]]'
+                )
+            with self.settings(METRICS_DIR=directory):
+                totals = registry.collect_all()
+                own_dumps = [
+                    name for name in os.listdir(directory)
+                    if name.startswith(f'metrics-{os.getpid()}-')
+                ]
+                self.assertEqual(len(own_dumps), 1)
+
+        self.assertEqual(totals[('jobs_total', ())], 5)
+        self.assertEqual(totals[('job_seconds', ())], [0, 1, 1, 11, 2])
+
+    def test_reused_pid_gets_its_own_dump(self):
+        """Test a process reusing a pid does not overwrite the old dump"""
+        registry = get_registry()
+        registry.inc('jobs_total')
+        with tempfile.TemporaryDirectory() as directory:
+            with self.settings(METRICS_DIR=directory):
+                with patch('os.getpid', return_value=1):
+                    registry.flush()
+                    registry.flush()
+                    self.assertEqual(len(os.listdir(directory)), 1)
+                    get_registry().flush()
+
+                self.assertEqual(len(os.listdir(directory)), 2)
+
+    def test_exited_processes_are_archived(self):
+        """Test dumps of exited processes are folded into the archive"""
+        registry = get_registry()
+        with tempfile.TemporaryDirectory() as directory:
+            dumps = {
+                ARCHIVE_NAME: '[["jobs_total", [], 1]]',
+                'metrics-1-a.json': '[["jobs_total", [], 2]]',
+                'metrics-2-b.json': '[["jobs_total", [], 4]]',
+            }
+            for name, samples in dumps.items():
+                with open(os.path.join(directory, name), 'w') as f:
+                    f.write(samples)
+            with self.settings(METRICS_DIR=directory):
+                archive_dumps(1)
+                remaining = sorted(os.listdir(directory))
+                totals = registry.collect_all()
+
+        self.assertNotIn('metrics-1-a.json', remaining)
+        self.assertIn('metrics-2-b.json', remaining)
+        self.assertEqual(totals[('jobs_total', ())], 7)
+
+
+@override_settings(METRICS_TOKEN='scraper-token')
+class MetricsEndpointTests(TestCase):
+
+    def test_metrics_require_token_or_staff(self):
+        """Test metrics are only served to scrapers and staff users"""
+        self.assertEqual(self.client.get(METRICS_URL).status_code, 403)
+        self.assertEqual(self.client.get(
+            METRICS_URL, HTTP_AUTHORIZATION='Bearer wrong-token'
+        ).status_code, 403)
+
+        user = get_user_model().objects.create_user(
+            email='gustavo@test.com',
+            password='123456'
+        )
+        self.client.force_login(user)
+        self.assertEqual(self.client.get(METRICS_URL).status_code, 403)
+        user.is_staff = True
+        user.save()
+        self.assertEqual(self.client.get(METRICS_URL).status_code, 200)
+
+    def test_requests_are_recorded(self):
+        """Test the middleware records requests per route"""
+        user = get_user_model().objects.create_user(
+            email='gustavo@test.com',
+            password='123456'
+        )
+        client = APIClient()
+        client.force_authenticate(user=user)
+        client.get(reverse('recipes:tag-list'))
+
+        res = self.client.get(
+            METRICS_URL, HTTP_AUTHORIZATION='Bearer scraper-token'
+        )
+
+        self.assertEqual(res.status_code, 200)
+        self.assertTrue(res['Content-Type'].startswith('text/plain'))
+        text = res.content.decode()
+        self.assertIn(
+            'http_requests_total{method="GET",route="recipes:tag-list",'
+            'status="200"}',
+            text
+        )
+        self.assertIn(
+            'http_request_db_queries_count{route="recipes:tag-list"}', text
+        )
+        self.assertIn(
+            'http_request_duration_seconds_bucket{route="recipes:tag-list",'
+            'le="+Inf"}',
+            text
+        )
@@ -1,3 +1,5 @@
+from django.core.files.storage import default_storage
+from django.core.files.uploadedfile import SimpleUploadedFile
 from django.test import TestCase
 from django.contrib.auth import get_user_model
 from unittest.mock import patch
@@ -88,6 +90,37 @@ class ModelTests(TestCase):
 
         self.assertEqual(str(recipe), recipe.title)
 
+    def test_recipe_compare_and_set(self):
+        """Test recipes are only written if their version is unchanged"""
+        recipe = Recipe.objects.create(
+            title='Soup', time_minutes=5, price=5.00, user=get_sample_user()
+        )
+        stale = Recipe.objects.get(pk=recipe.pk)
+
+        recipe.title = 'Stew'
+        self.assertTrue(Recipe.objects.compare_and_set(recipe, ['title']))
+        stale.title = 'Broth'
+        self.assertFalse(Recipe.objects.compare_and_set(stale, ['title']))
+
+        recipe.refresh_from_db()
+        self.assertEqual((recipe.title, recipe.version), ('Stew', 2))
+
+    @patch('uuid.uuid4', return_value='rejected')
+    def test_rejected_compare_and_set_deletes_new_files(self, mock_uuid):
+        """Test files saved for a rejected recipe write are removed"""
+        recipe = Recipe.objects.create(
+            title='Soup', time_minutes=5, price=5.00, user=get_sample_user()
+        )
+        Recipe.objects.filter(pk=recipe.pk).update(version=2)
+        recipe.image = SimpleUploadedFile('image.jpg', b'image')
+
+        self.assertFalse(Recipe.objects.compare_and_set(recipe, ['image']))
+
+        self.assertFalse(recipe.image)
+        self.assertFalse(
+            default_storage.exists(recipe_image_file_path(None, 'image.jpg'))
+        )
+
     @patch('uuid.uuid4')
     def test_recipe_file_name_uuid(self, mock_uuid):
         """Test that images are saved on the correct location and filename"""
@@ -0,0 +1,151 @@
+import os
+import shutil
+import tempfile
+import time
+from unittest.mock import patch
+
+from django.contrib.auth import get_user_model
+from django.test import SimpleTestCase, TestCase, override_settings
+from django.urls import reverse
+
+from rest_framework.test import APIClient
+
+from core.profiling import ProfilingMixin, StackSampler
+from recipes.views import TagViewSet
+
+
+def busy_wait(seconds):
+    end = time.perf_counter() + seconds
+    while time.perf_counter() < end:
+        pass
+
+
+class StackSamplerTests(SimpleTestCase):
+
+    def test_samples_are_collapsed_stacks(self):
+        """Test the sampler records the stack of the sampled thread"""
+        with StackSampler(interval=0.001) as sampler:
+            busy_wait(0.05)
+
+        self.assertGreater(sampler.sample_count, 0)
+        stack = sampler.stacks.most_common(1)[0][0]
+        self.assertIn('busy_wait (core/tests/test_profiling.py', stack)
+        self.assertLess(
+            stack.index('test_samples_are_collapsed_stacks'),
+            stack.index('busy_wait')
+        )
+
+    def test_write_folded_profile(self):
+        """Test profiles are written one stack and count per line"""
+        sampler = StackSampler()
+        sampler.stacks['main (a.py:1);handler (b.py:2)'] = 3
+        with tempfile.NamedTemporaryFile('r') as profile:
+            sampler.write(profile.name)
+            content = profile.read()
+
+        self.assertEqual(content, 'main (a.py:1);handler (b.py:2) 3\n')
+
+
+@override_settings(PROFILING_ENABLED=True, PROFILING_SAMPLE_RATE=0)
+class ProfilingMixinTests(TestCase):
+
+    def setUp(self):
+        self.profiling_dir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.profiling_dir)
+        self.user = get_user_model().objects.create_user(
+            email='gustavo@test.com',
+            password='123456'
+        )
+        self.client = APIClient()
+        self.client.force_authenticate(user=self.user)
+
+    def get_tags(self, **headers):
+        with self.settings(PROFILING_DIR=self.profiling_dir):
+            return self.client.get(reverse('recipes:tag-list'), **headers)
+
+    def test_staff_requests_are_profiled(self):
+        """Test a staff request with the header stores a profile"""
+        self.user.is_staff = True
+        self.user.save()
+
+        res = self.get_tags(HTTP_X_PROFILE='1')
+
+        self.assertEqual(
+            os.listdir(self.profiling_dir), [res['X-Profile-Id']]
+        )
+        self.assertIn('recipes-tag-list', res['X-Profile-Id'])
+
+    def test_non_staff_requests_are_not_profiled(self):
+        """Test profiles of non staff users are discarded"""
+        res = self.get_tags(HTTP_X_PROFILE='1')
+
+        self.assertNotIn('X-Profile-Id', res)
+        self.assertEqual(os.listdir(self.profiling_dir), [])
+
+    def test_requests_without_header_are_not_profiled(self):
+        """Test requests are not profiled unless sampled or requested"""
+        self.user.is_staff = True
+        self.user.save()
+
+        res = self.get_tags()
+
+        self.assertNotIn('X-Profile-Id', res)
+
+    def test_sampled_requests_are_profiled(self):
+        """Test requests are profiled according to the sample rate"""
+        self.user.is_staff = True
+        self.user.save()
+
+        with self.settings(PROFILING_SAMPLE_RATE=1):
+            res = self.get_tags()
+
+        self.assertIn('X-Profile-Id', res)
+
+    def test_authentication_is_profiled(self):
+        """Test profiles start before authentication and permissions"""
+        self.user.is_staff = True
+        self.user.save()
+
+        with patch.object(TagViewSet, 'check_permissions',
+                          side_effect=lambda request: busy_wait(0.05)):
+            res = self.get_tags(HTTP_X_PROFILE='1')
+
+        path = os.path.join(self.profiling_dir, res['X-Profile-Id'])
+        with open(path) as profile:
+            self.assertIn('busy_wait', profile.read())
+
+    def test_profiles_do_not_overwrite_each_other(self):
+        """Test profiles of requests in the same second get their own file"""
+        self.user.is_staff = True
+        self.user.save()
+
+        with patch('time.strftime', return_value='20200101000000'):
+            first = self.get_tags(HTTP_X_PROFILE='1')
+            second = self.get_tags(HTTP_X_PROFILE='1')
+
+        self.assertNotEqual(first['X-Profile-Id'], second['X-Profile-Id'])
+        self.assertEqual(len(os.listdir(self.profiling_dir)), 2)
+
+    @patch.object(ProfilingMixin, 'profiling_lock')
+    def test_anonymous_requests_release_lock(self, lock):
+        """Test unauthenticated requests stop profiling once rejected"""
+        lock.acquire.return_value = True
+        self.client.force_authenticate(user=None)
+
+        res = self.get_tags(HTTP_X_PROFILE='1')
+
+        self.assertEqual(res.status_code, 401)
+        self.assertNotIn('X-Profile-Id', res)
+        lock.release.assert_called_once_with()
+        self.assertEqual(os.listdir(self.profiling_dir), [])
+
+    @patch.object(ProfilingMixin, 'profiling_lock')
+    def test_non_staff_requests_release_lock(self, lock):
+        """Test requests of non staff users stop profiling once known"""
+        lock.acquire.return_value = True
+
+        res = self.get_tags(HTTP_X_PROFILE='1')
+
+        self.assertNotIn('X-Profile-Id', res)
+        lock.release.assert_called_once_with()
+        self.assertEqual(os.listdir(self.profiling_dir), [])
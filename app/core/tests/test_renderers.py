@@ -0,0 +1,121 @@
+import datetime
+import io
+from collections import OrderedDict
+from decimal import Decimal
+from unittest import skipIf
+from unittest.mock import patch
+
+from django.test import SimpleTestCase
+from django.utils.translation import gettext_lazy
+
+from rest_framework.exceptions import ParseError
+from rest_framework.parsers import JSONParser
+from rest_framework.renderers import JSONRenderer
+
+from core.parsers import FastJSONParser
+from core.renderers import FastJSONRenderer, orjson
+
+
+SAMPLE_DATA = [
+    OrderedDict([
+        ('id', 1),
+        ('title', 'Crème brûlée\u2028with\u2029"sugar"'),
+        ('time_minutes', 30),
+        ('price', Decimal('14.50')),
+        ('ingredients', [1, 2, 3]),
+        ('tags', []),
+        ('link', ''),
+        ('image', 'http://testserver/media/uploads/recipes/a b.jpg'),
+    ]),
+    {
+        1: 'integer key',
+        'created': datetime.datetime(
+            2022, 2, 27, 1, 39, 12, 123456, tzinfo=datetime.timezone.utc
+        ),
+        'day': datetime.date(2022, 2, 27),
+        'label': gettext_lazy('Invalid credentials'),
+        'nothing': None,
+        'ratio': 0.1,
+    },
+]
+
+
+class FastJSONRendererTests(SimpleTestCase):
+
+    def test_output_matches_default_renderer(self):
+        """Test the fast renderer output is byte identical to the default"""
+        expected = JSONRenderer().render(SAMPLE_DATA)
+
+        self.assertEqual(FastJSONRenderer().render(SAMPLE_DATA), expected)
+
+    @skipIf(orjson is None, 'orjson is not installed')
+    def test_data_is_rendered_by_orjson(self):
+        """Test data without exponent floats doesn't fall back"""
+        with patch.object(JSONRenderer, 'render') as render:
+            FastJSONRenderer().render(SAMPLE_DATA)
+
+        render.assert_not_called()
+
+    def test_indented_output_matches_default_renderer(self):
+        """Test pretty printed output falls back to the default renderer"""
+        media_type = 'application/json; indent=4'
+        expected = JSONRenderer().render(SAMPLE_DATA, media_type)
+
+        self.assertEqual(
+            FastJSONRenderer().render(SAMPLE_DATA, media_type), expected
+        )
+
+    def test_fallback_without_orjson(self):
+        """Test the renderer works when orjson is not installed"""
+        with patch('core.renderers.orjson', None):
+            result = FastJSONRenderer().render(SAMPLE_DATA)
+
+        self.assertEqual(result, JSONRenderer().render(SAMPLE_DATA))
+
+    def test_floats_match_default_renderer(self):
+        """Test floats are formatted like the default renderer does"""
+        for values in ([1e16, 0.1], [-1.5e-05], [Decimal('1E+20')]):
+            data = {'values': values, 'name': '1e5'}
+
+            self.assertEqual(
+                FastJSONRenderer().render(data), JSONRenderer().render(data)
+            )
+
+    @skipIf(orjson is None, 'orjson is not installed')
+    def test_non_finite_floats_render_as_null(self):
+        """Test NaN renders as null where the default renderer fails"""
+        with self.assertRaises(ValueError):
+            JSONRenderer().render({'ratio': float('nan')})
+
+        self.assertEqual(
+            FastJSONRenderer().render({'ratio': float('nan')}),
+            b'{"ratio":null}'
+        )
+
+    def test_rendering_none(self):
+        """Test that no data renders an empty body"""
+        self.assertEqual(FastJSONRenderer().render(None), b'')
+
+
+class FastJSONParserTests(SimpleTestCase):
+
+    def test_output_matches_default_parser(self):
+        """Test the fast parser returns the same data as the default"""
+        body = '{"title": "Crème", "price": 14.5, "tags": [1, 2]}'.encode()
+
+        self.assertEqual(
+            FastJSONParser().parse(io.BytesIO(body)),
+            JSONParser().parse(io.BytesIO(body))
+        )
+
+    def test_invalid_json_fails(self):
+        """Test invalid JSON raises a parse error"""
+        with self.assertRaises(ParseError):
+            FastJSONParser().parse(io.BytesIO(b'{"title": NaN}'))
+
+    def test_fallback_without_orjson(self):
+        """Test the parser works when orjson is not installed"""
+        with patch('core.parsers.orjson', None):
+            result = FastJSONParser().parse(io.BytesIO(b'{"id": 1}'))
+
+        self.assertEqual(result, {'id': 1})
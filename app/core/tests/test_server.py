@@ -0,0 +1,74 @@
+from unittest.mock import patch
+
+from django.core.management import call_command
+from django.core.management.base import CommandError
+from django.test import SimpleTestCase
+
+from recipe_app.server import get_gunicorn_config
+
+
+class GunicornConfigTests(SimpleTestCase):
+
+    def test_defaults_are_sized_from_cpu_count(self):
+        """Test the default production server settings"""
+        config = get_gunicorn_config(environ={}, cpu_count=4)
+
+        self.assertEqual(config['bind'], '0.0.0.0:8000')
+        self.assertEqual(config['worker_class'], 'gthread')
+        self.assertEqual(config['workers'], 9)
+        self.assertEqual(config['threads'], 4)
+        self.assertTrue(config['preload_app'])
+        self.assertEqual(config['max_requests'], 1000)
+        self.assertEqual(config['max_requests_jitter'], 100)
+        self.assertEqual(config['timeout'], 30)
+        self.assertEqual(config['graceful_timeout'], 30)
+
+    def test_environment_overrides(self):
+        """Test server settings can be tuned through the environment"""
+        environ = {
+            'APP_SERVER': 'uvicorn',
+            'PORT': '9000',
+            'WEB_CONCURRENCY': '3',
+            'GUNICORN_THREADS': '1',
+            'GUNICORN_MAX_REQUESTS': '0',
+            'GUNICORN_PRELOAD': 'false',
+        }
+
+        config = get_gunicorn_config(environ=environ, cpu_count=4)
+
+        self.assertEqual(config['bind'], '0.0.0.0:9000')
+        self.assertEqual(
+            config['worker_class'], 'uvicorn.workers.UvicornH11Worker'
+        )
+        self.assertEqual(config['workers'], 3)
+        self.assertEqual(config['threads'], 1)
+        self.assertEqual(config['max_requests'], 0)
+        self.assertFalse(config['preload_app'])
+
+
+class ServeCommandTests(SimpleTestCase):
+
+    @patch('core.management.commands.serve.call_command')
+    def test_serve_runserver_by_default(self, cc):
+        """Test the development server runs when no server is selected"""
+        with patch.dict('os.environ', {'PORT': '8001'}):
+            call_command('serve')
+
+        cc.assert_called_once_with('runserver', '0.0.0.0:8001')
+
+    @patch('os.execvp')
+    def test_serve_gunicorn(self, execvp):
+        """Test gunicorn replaces the process when selected"""
+        with patch.dict('os.environ', {'APP_SERVER': 'gunicorn'}):
+            call_command('serve')
+
+        program, args = execvp.call_args[0]
+        self.assertEqual(program, 'gunicorn')
+        self.assertEqual(args[-1], 'recipe_app.wsgi:application')
+        self.assertTrue(args[2].endswith('gunicorn.conf.py'))
+
+    def test_serve_unknown_server_fails(self):
+        """Test an unknown server is rejected"""
+        with patch.dict('os.environ', {'APP_SERVER': 'apache'}):
+            with self.assertRaises(CommandError):
+                call_command('serve')
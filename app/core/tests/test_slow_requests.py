@@ -0,0 +1,90 @@
+import json
+from unittest.mock import patch
+
+from django.contrib.auth import get_user_model
+from django.test import SimpleTestCase, TestCase
+from django.urls import reverse
+
+from rest_framework.test import APIClient
+
+from core.middleware import QueryRecorder, redact_params
+from core.models import Tag
+
+
+class QueryRecorderTests(SimpleTestCase):
+
+    def test_slowest_queries_are_kept(self):
+        """Test only the slowest queries are kept, slowest first"""
+        recorder = QueryRecorder(keep=2)
+        for index, duration in enumerate((0.3, 0.1, 0.5, 0.2)):
+            recorder.record(f'SELECT {index}', (), False, duration)
+
+        self.assertEqual(
+            [query['sql'] for query in recorder.get_slowest()],
+            ['SELECT 2', 'SELECT 0']
+        )
+
+    def test_call_sites_are_resolved_when_logged(self):
+        """Test call sites are only formatted for the logged queries"""
+        recorder = QueryRecorder(keep=2)
+        with patch('core.middleware.get_call_site') as get_call_site:
+            for index, duration in enumerate((0.3, 0.1, 0.5)):
+                recorder.record(f'SELECT {index}', (), False, duration)
+            get_call_site.assert_not_called()
+
+            recorder.get_slowest()
+
+        self.assertEqual(get_call_site.call_count, 2)
+
+    def test_params_are_redacted(self):
+        """Test query parameters are replaced by their types"""
+        self.assertEqual(redact_params(('secret', 1, None)),
+                         ['str', 'int', 'NoneType'])
+        self.assertEqual(redact_params({'email': 'a@b.com'}),
+                         {'email': 'str'})
+        self.assertEqual(redact_params([(1, ), (2, )], many=True),
+                         '2 parameter sets')
+
+
+class SlowRequestLoggingTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = get_user_model().objects.create_user(
+            email='gustavo@test.com',
+            password='123456'
+        )
+        Tag.objects.create(user=cls.user, name='Vegan')
+
+    def setUp(self):
+        self.client = APIClient()
+        self.client.force_authenticate(user=self.user)
+
+    def test_slow_requests_are_logged(self):
+        """Test slow requests are logged with their slowest queries"""
+        with self.settings(SLOW_REQUEST_THRESHOLD_MS=0,
+                           SLOW_QUERY_THRESHOLD_MS=None):
+            with self.assertLogs('core.performance', 'WARNING') as logs:
+                self.client.get(reverse('recipes:tag-list'))
+
+        self.assertEqual(len(logs.records), 1)
+        record = json.loads(logs.records[0].getMessage())
+        self.assertEqual(record['event'], 'slow_request')
+        self.assertEqual(record['view'], 'recipes:tag-list')
+        self.assertEqual(record['user_id'], self.user.pk)
+        self.assertEqual(record['query_count'], 1)
+        query = record['slowest_queries'][0]
+        self.assertIn('core_tag', query['sql'])
+        self.assertEqual(query['params'], ['int'])
+        self.assertTrue(query['call_site'].startswith('recipes/'))
+
+    def test_slow_queries_are_logged(self):
+        """Test slow queries are logged on their own"""
+        with self.settings(SLOW_REQUEST_THRESHOLD_MS=None,
+                           SLOW_QUERY_THRESHOLD_MS=0):
+            with self.assertLogs('core.performance', 'WARNING') as logs:
+                self.client.get(reverse('recipes:tag-list'))
+
+        record = json.loads(logs.records[0].getMessage())
+        self.assertEqual(record['event'], 'slow_query')
+        self.assertIn('core_tag', record['sql'])
@@ -0,0 +1,127 @@
+from unittest.mock import patch
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.test import SimpleTestCase, TestCase, override_settings
+from django.urls import reverse
+
+from rest_framework import status
+from rest_framework.test import APIClient
+
+from core import throttling
+from core.throttling import LocalBucketStore
+
+
+CREATE_TOKEN_URL = reverse('users:auth')
+TAGS_URL = reverse('recipes:tag-list')
+
+THROTTLE_SETTINGS = dict(settings.REST_FRAMEWORK, DEFAULT_THROTTLE_RATES={
+    'login_ip': '5/min',
+    'login_email': '2/min',
+    'user': '3/min',
+})
+
+
+class LocalBucketStoreTests(SimpleTestCase):
+
+    def test_tokens_refill_over_the_period(self):
+        """Test a burst of capacity requests is allowed, then refilled"""
+        store = LocalBucketStore(max_keys=10)
+
+        waits = [store.consume('key', 2, 60, now=0) for _ in range(3)]
+        self.assertEqual(waits[:2], [0, 0])
+        self.assertAlmostEqual(waits[2], 30)
+        self.assertGreater(store.consume('key', 2, 60, now=29), 0)
+        self.assertEqual(store.consume('key', 2, 60, now=30), 0)
+
+    def test_full_buckets_expire(self):
+        """Test buckets are dropped once they have refilled"""
+        store = LocalBucketStore(max_keys=10)
+        store.consume('old', 2, 60, now=0)
+
+        store.consume('new', 2, 60, now=31)
+
+        self.assertEqual(list(store.buckets), ['new'])
+
+    def test_least_recently_used_buckets_are_evicted(self):
+        """Test at most max_keys buckets are kept"""
+        store = LocalBucketStore(max_keys=2)
+        for key in ('a', 'b', 'a', 'c'):
+            store.consume(key, 2, 60, now=0)
+
+        self.assertEqual(list(store.buckets), ['a', 'c'])
+
+
+@override_settings(REST_FRAMEWORK=THROTTLE_SETTINGS, THROTTLE_CACHE=None)
+class ThrottlingApiTests(TestCase):
+
+    def setUp(self):
+        store = throttling.get_store()
+        store.clear()
+        self.addCleanup(store.clear)
+        self.client = APIClient()
+
+    def test_login_attempts_per_email_are_limited(self):
+        """Test logins for an account are rejected before hashing"""
+        payload = {'email': 'gustavo@test.com', 'password': 'wrong'}
+        for _ in range(2):
+            res = self.client.post(CREATE_TOKEN_URL, payload)
+            self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+
+        with patch('users.serializers.authenticate') as authenticate:
+            res = self.client.post(CREATE_TOKEN_URL, dict(
+                payload, email='GUSTAVO@test.com'
+            ))
+
+        self.assertEqual(res.status_code, status.HTTP_429_TOO_MANY_REQUESTS)
+        self.assertIn('Retry-After', res)
+        authenticate.assert_not_called()
+
+    def test_login_attempts_per_ip_are_limited(self):
+        """Test logins from an address are limited across accounts"""
+        for index in range(5):
+            res = self.client.post(CREATE_TOKEN_URL, {
+                'email': f'user{index}@test.com', 'password': 'wrong'
+            })
+            self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+
+        res = self.client.post(CREATE_TOKEN_URL, {
+            'email': 'other@test.com', 'password': 'wrong'
+        })
+
+        self.assertEqual(res.status_code, status.HTTP_429_TOO_MANY_REQUESTS)
+
+    def test_forwarded_for_header_is_not_trusted(self):
+        """Test rotating X-Forwarded-For does not escape the IP limit"""
+        for index in range(5):
+            res = self.client.post(CREATE_TOKEN_URL, {
+                'email': f'user{index}@test.com', 'password': 'wrong'
+            }, HTTP_X_FORWARDED_FOR=f'10.0.0.{index}')
+            self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+
+        res = self.client.post(CREATE_TOKEN_URL, {
+            'email': 'other@test.com', 'password': 'wrong'
+        }, HTTP_X_FORWARDED_FOR='10.0.0.99')
+
+        self.assertEqual(res.status_code, status.HTTP_429_TOO_MANY_REQUESTS)
+
+    def test_recipe_requests_are_limited_per_user(self):
+        """Test recipe endpoints throttle each user on their own"""
+        user = get_user_model().objects.create_user(
+            'gustavo@test.com', '123456'
+        )
+        other_user = get_user_model().objects.create_user(
+            'other@test.com', '123456'
+        )
+        self.client.force_authenticate(user=user)
+        for _ in range(3):
+            self.assertEqual(
+                self.client.get(TAGS_URL).status_code, status.HTTP_200_OK
+            )
+
+        res = self.client.get(TAGS_URL)
+        self.assertEqual(res.status_code, status.HTTP_429_TOO_MANY_REQUESTS)
+
+        self.client.force_authenticate(user=other_user)
+        res = self.client.get(TAGS_URL)
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
@@ -0,0 +1,104 @@
+from django.contrib.auth import get_user_model
+from django.db import connection
+from django.db.models import Max
+from django.test.utils import CaptureQueriesContext
+
+from core.models import Tag, Ingredient, Recipe
+
+
+def seed_recipes(user, count, tags=10, ingredients=10):
+    """Creates recipes linked to `tags` tags and `ingredients` ingredients
+
+    The tags and ingredients are created once per user and shared by all
+    of its recipes. Returns the created recipes' ids.
+    """
+    for model, number in ((Tag, tags), (Ingredient, ingredients)):
+        existing = model.objects.filter(user=user).count()
+        model.objects.bulk_create(
+            model(user=user, name=f'{model.__name__} {index}')
+            for index in range(existing, number)
+        )
+
+    last_id = Recipe.objects.aggregate(last_id=Max('id'))['last_id'] or 0
+    Recipe.objects.bulk_create(
+        Recipe(
+            user=user,
+            title=f'Recipe {index}',
+            time_minutes=index % 180 + 1,
+            price=index % 100 + 0.5,
+        )
+        for index in range(count)
+    )
+    recipe_ids = list(Recipe.objects.filter(
+        user=user, id__gt=last_id
+    ).values_list('id', flat=True))
+
+    tag_ids = Tag.objects.filter(user=user).values_list('id', flat=True)
+    ingredient_ids = Ingredient.objects.filter(
+        user=user
+    ).values_list('id', flat=True)
+    TagLink = Recipe.tags.through
+    IngredientLink = Recipe.ingredients.through
+    TagLink.objects.bulk_create(
+        TagLink(recipe_id=recipe_id, tag_id=tag_id)
+        for recipe_id in recipe_ids
+        for tag_id in tag_ids[:tags]
+    )
+    IngredientLink.objects.bulk_create(
+        IngredientLink(recipe_id=recipe_id, ingredient_id=ingredient_id)
+        for recipe_id in recipe_ids
+        for ingredient_id in ingredient_ids[:ingredients]
+    )
+
+    return recipe_ids
+
+
+class QueryCountMixin:
+    """Assertions about the number of queries run by API requests
+
+    Creates a user per size in `query_count_sizes`, owning that many
+    recipes, once for the test case. Tests need an APIClient `client`.
+    """
+
+    query_count_sizes = (1, 10, 100)
+
+    @classmethod
+    def setUpTestData(cls):
+        super().setUpTestData()
+        cls.seeded_users = []
+        for size in cls.query_count_sizes:
+            user = get_user_model().objects.create_user(
+                email=f'seeded{size}@test.com',
+                password='123456'
+            )
+            cls.seeded_users.append((size, user, seed_recipes(user, size)))
+
+    def assertConstantQueries(self, request):
+        """Asserts `request` runs the same queries for every seeded user
+
+        `request(user, recipe_ids)` is called authenticated as each user
+        with the ids of the user's recipes, and must return a successful
+        response.
+        """
+        captured = []
+        for size, user, recipe_ids in self.seeded_users:
+            self.client.force_authenticate(user=user)
+            with CaptureQueriesContext(connection) as context:
+                response = request(user, recipe_ids)
+            self.assertLess(
+                response.status_code, 400,
+                f'Request failed with {size} recipes: {response.content!r}'
+            )
+            captured.append((size, context.captured_queries))
+
+        first_size, first_queries = captured[0]
+        for size, queries in captured[1:]:
+            if len(queries) != len(first_queries):
+                self.fail(
+                    '{} queries with {} recipes but {} with {}:\n{}'.format(
+                        len(first_queries), first_size, len(queries), size,
+                        '\n'.join(query['sql'] for query in queries)
+                    )
+                )
+
+        return len(first_queries)
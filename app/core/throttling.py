@@ -0,0 +1,171 @@
+"""
+Token bucket request throttling.
+
+A rate of `N/period` lets a client burst N requests, after which tokens
+refill evenly over the period. Buckets live in process memory, or in the
+cache named by THROTTLE_CACHE to share them between processes.
+"""
+import hashlib
+import threading
+from collections import OrderedDict
+from collections.abc import Mapping
+
+from django.conf import settings
+from django.core.cache import caches
+from django.core.exceptions import ImproperlyConfigured
+from rest_framework.settings import api_settings
+from rest_framework.throttling import SimpleRateThrottle
+
+
+def take_token(bucket, capacity, period, now):
+    """Refills a (tokens, updated) bucket and takes a token from it
+
+    Returns the new bucket and the seconds until a token is available, 0
+    if one was taken.
+    """
+    tokens, updated = bucket or (capacity, now)
+    refill = capacity / period
+    tokens = min(capacity, tokens + max(0, now - updated) * refill)
+    if tokens >= 1:
+        return (tokens - 1, now), 0
+
+    return (tokens, now), (1 - tokens) / refill
+
+
+class LocalBucketStore:
+    """Token buckets kept in process memory
+
+    Buckets are kept in least recently used order with the time at which
+    they are full again, when they can be dropped since a missing bucket
+    is a full one. At most `max_keys` buckets are kept.
+    """
+
+    def __init__(self, max_keys):
+        self.max_keys = max_keys
+        self.buckets = OrderedDict()
+        self.lock = threading.Lock()
+
+    def consume(self, key, capacity, period, now):
+        with self.lock:
+            bucket, _ = self.buckets.pop(key, (None, None))
+            bucket, wait = take_token(bucket, capacity, period, now)
+            full_at = now + (capacity - bucket[0]) * period / capacity
+            self.buckets[key] = (bucket, full_at)
+            self.expire(now)
+
+        return wait
+
+    def expire(self, now):
+        """Drops full and least recently used buckets"""
+        buckets = self.buckets
+        while buckets and (
+            len(buckets) > self.max_keys
+            or next(iter(buckets.values()))[1] <= now
+        ):
+            buckets.popitem(last=False)
+
+    def clear(self):
+        with self.lock:
+            self.buckets.clear()
+
+
+class CacheBucketStore:
+    """Token buckets kept in a Django cache shared by processes
+
+    Reads and writes are not atomic, concurrent requests of a client may
+    take the same token.
+    """
+
+    def __init__(self, cache):
+        self.cache = cache
+
+    def consume(self, key, capacity, period, now):
+        bucket, wait = take_token(
+            self.cache.get(key), capacity, period, now
+        )
+        self.cache.set(key, bucket, timeout=period)
+
+        return wait
+
+
+_local_store = None
+
+
+def get_store():
+    """Returns the bucket store configured in the settings"""
+    global _local_store
+
+    if settings.THROTTLE_CACHE:
+        return CacheBucketStore(caches[settings.THROTTLE_CACHE])
+    if _local_store is None:
+        _local_store = LocalBucketStore(settings.THROTTLE_MAX_KEYS)
+
+    return _local_store
+
+
+class TokenBucketThrottle(SimpleRateThrottle):
+    """Throttles requests with a token bucket per cache key
+
+    Rates are read from DEFAULT_THROTTLE_RATES by scope, a rate of None
+    disables the throttle.
+    """
+
+    def get_rate(self):
+        try:
+            return api_settings.DEFAULT_THROTTLE_RATES[self.scope]
+        except KeyError:
+            raise ImproperlyConfigured(
+                f'No throttle rate set for scope "{self.scope}"'
+            )
+
+    def allow_request(self, request, view):
+        if self.rate is None:
+            return True
+        key = self.get_cache_key(request, view)
+        if key is None:
+            return True
+
+        self.retry_after = get_store().consume(
+            key, self.num_requests, self.duration, self.timer()
+        )
+        return not self.retry_after
+
+    def wait(self):
+        return self.retry_after
+
+    def format_key(self, ident):
+        return self.cache_format % {'scope': self.scope, 'ident': ident}
+
+
+class LoginIPThrottle(TokenBucketThrottle):
+    """Limits login attempts per client IP address"""
+    scope = 'login_ip'
+
+    def get_cache_key(self, request, view):
+        return self.format_key(self.get_ident(request))
+
+
+class LoginEmailThrottle(TokenBucketThrottle):
+    """Limits login attempts per account, whatever the client"""
+    scope = 'login_email'
+
+    def get_cache_key(self, request, view):
+        data = request.data
+        email = data.get('email') if isinstance(data, Mapping) else None
+        if not isinstance(email, str) or not email:
+            return None
+
+        # Hashed to keep addresses out of memory and cache key limits
+        email = email.strip().lower().encode()
+        return self.format_key(hashlib.sha1(email).hexdigest())
+
+
+class UserThrottle(TokenBucketThrottle):
+    """Limits requests per user, or per IP address for anonymous ones"""
+    scope = 'user'
+
+    def get_cache_key(self, request, view):
+        if request.user.is_authenticated:
+            return self.format_key(request.user.pk)
+
+        return self.format_key(self.get_ident(request))
@@ -0,0 +1,194 @@
+import io
+import json
+import os
+from urllib.parse import urlsplit
+
+from django.conf import settings
+from django.core.files.storage import default_storage
+from django.core.handlers.wsgi import WSGIRequest
+from django.db import DatabaseError, connection, transaction
+from django.http import HttpResponse, HttpResponseForbidden, JsonResponse
+from django.urls import Resolver404, resolve
+from django.utils.crypto import constant_time_compare
+from django.views.decorators.cache import never_cache
+from django.views.decorators.http import require_GET
+
+from rest_framework import permissions, status
+from rest_framework.authentication import get_authorization_header
+from rest_framework.response import Response
+from rest_framework.views import APIView
+
+from core.authentication import (
+    ExpiringTokenAuthentication, SignedAccessTokenAuthentication
+)
+from core.metrics import registry
+from core.serializers import BatchSerializer
+
+
+class BatchView(APIView):
+    """Executes many API requests in a single HTTP round trip
+
+    Sub-requests are dispatched in-process to the views of the allowed
+    URL prefixes, sharing the batch authentication and DB connection. The
+    Idempotency-Key header of the batch is not passed on, since its
+    sub-requests would share it.
+    """
+    authentication_classes = (
+        SignedAccessTokenAuthentication, ExpiringTokenAuthentication
+    )
+    permission_classes = (permissions.AllowAny, )
+
+    def _build_request(self, request, method, path, body):
+        """Builds a request for a sub-request, reusing the batch auth"""
+        url = urlsplit(path)
+        payload = json.dumps(body).encode() if body is not None else b''
+        environ = {
+            key: value for key, value in request.META.items()
+            if key not in (
+                'HTTP_AUTHORIZATION', 'HTTP_COOKIE', 'HTTP_IDEMPOTENCY_KEY'
+            )
+        }
+        environ.update({
+            'REQUEST_METHOD': method,
+            'PATH_INFO': url.path,
+            'QUERY_STRING': url.query,
+            'CONTENT_TYPE': 'application/json',
+            'CONTENT_LENGTH': str(len(payload)),
+            'wsgi.input': io.BytesIO(payload),
+        })
+        sub_request = WSGIRequest(environ)
+        if request.user and request.user.is_authenticated:
+            sub_request._force_auth_user = request.user
+            sub_request._force_auth_token = request.auth
+
+        return sub_request
+
+    def _execute(self, request, method, path, body):
+        """Executes a sub-request and returns its status and body"""
+        url_path = urlsplit(path).path
+        if not url_path.startswith(settings.BATCH_ALLOWED_PATHS):
+            return {'status': status.HTTP_404_NOT_FOUND, 'body': None}
+        try:
+            match = resolve(url_path)
+        except Resolver404:
+            return {'status': status.HTTP_404_NOT_FOUND, 'body': None}
+
+        sub_request = self._build_request(request, method, path, body)
+        response = match.func(sub_request, *match.args, **match.kwargs)
+        if hasattr(response, 'data'):
+            data = response.data
+        elif response.content:
+            data = response.content.decode(response.charset)
+        else:
+            data = None
+
+        return {'status': response.status_code, 'body': data}
+
+    def _execute_all(self, request, sub_requests, atomic):
+        """Executes sub-requests in order, stopping on errors if atomic"""
+        responses = []
+        for sub_request in sub_requests:
+            result = self._execute(
+                request,
+                sub_request['method'],
+                sub_request['path'],
+                sub_request.get('body'),
+            )
+            responses.append(result)
+            if atomic and result['status'] >= 400:
+                transaction.set_rollback(True)
+                break
+
+        return responses
+
+    def post(self, request):
+        """Executes the batch and returns every sub-response in order"""
+        serializer = BatchSerializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        sub_requests = serializer.validated_data['requests']
+        if serializer.validated_data['atomic']:
+            with transaction.atomic():
+                responses = self._execute_all(request, sub_requests, True)
+        else:
+            responses = self._execute_all(request, sub_requests, False)
+
+        return Response(data=responses, status=status.HTTP_200_OK)
+
+
+def _database_is_ready():
+    """Returns whether the default database answers queries"""
+    try:
+        with connection.cursor() as cursor:
+            cursor.execute('SELECT 1')
+    except DatabaseError:
+        return False
+
+    return True
+
+
+def _storage_is_ready():
+    """Returns whether uploaded media can be written"""
+    location = getattr(default_storage, 'location', None)
+    if location is None:
+        return True
+
+    return os.path.isdir(location) and os.access(location, os.W_OK)
+
+
+@never_cache
+@require_GET
+def health_live(request):
+    """Liveness probe, succeeds while the process serves requests"""
+    return JsonResponse({'status': 'ok'})
+
+
+@never_cache
+@require_GET
+def health_ready(request):
+    """Readiness probe, checks the database and media storage"""
+    checks = {
+        'database': _database_is_ready(),
+        'storage': _storage_is_ready(),
+    }
+    ready = all(checks.values())
+
+    return JsonResponse(
+        {
+            'status': 'ok' if ready else 'unavailable',
+            'checks': {
+                name: 'ok' if passed else 'error'
+                for name, passed in checks.items()
+            },
+        },
+        status=status.HTTP_200_OK if ready
+        else status.HTTP_503_SERVICE_UNAVAILABLE
+    )
+
+
+def _can_read_metrics(request):
+    """Checks for the METRICS_TOKEN bearer token or a staff session"""
+    user = getattr(request, 'user', None)
+    if user is not None and user.is_staff:
+        return True
+
+    token = settings.METRICS_TOKEN
+    auth = get_authorization_header(request).split()
+    return bool(
+        token
+        and len(auth) == 2
+        and auth[0].lower() == b'bearer'
+        and constant_time_compare(auth[1], token.encode())
+    )
+
+
+@never_cache
+@require_GET
+def metrics(request):
+    """Exposes metrics in the Prometheus text exposition format"""
+    if not _can_read_metrics(request):
+        return HttpResponseForbidden()
+
+    return HttpResponse(
+        registry.render(),
+        content_type='text/plain; version=0.0.4; charset=utf-8'
+    )
@@ -0,0 +1,6 @@
+"""Gunicorn settings, see recipe_app/server.py for the defaults"""
+from recipe_app.server import (  # noqa: F401
+    child_exit, get_gunicorn_config, on_starting, post_fork, worker_exit
+)
+
+globals().update(get_gunicorn_config())
@@ -0,0 +1,20 @@
+"""
+ASGI config for recipe_app project.
+
+It exposes the ASGI callable as a module-level variable named ``application``.
+Run it with an ASGI server, e.g. ``uvicorn recipe_app.asgi:application``.
+ASGI_THREADS sets the size of the thread pool running Django.
+"""
+
+import os
+
+from django.core.wsgi import get_wsgi_application
+
+from core.asgi import ASGIHandler
+
+os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'recipe_app.settings')
+
+application = ASGIHandler(
+    get_wsgi_application(),
+    max_workers=int(os.environ.get('ASGI_THREADS', 8))
+)
@@ -0,0 +1,95 @@
+"""
+Application server configuration for recipe_app project.
+
+APP_SERVER selects the server started by ``manage.py serve``:
+
+    runserver: Django's single process development server (default).
+    gunicorn: pre-forked gunicorn workers with threads serving the WSGI app.
+    uvicorn: gunicorn managing uvicorn workers serving the ASGI app.
+"""
+
+import multiprocessing
+import os
+
+SERVERS = ('runserver', 'gunicorn', 'uvicorn')
+
+APPLICATIONS = {
+    'gunicorn': 'recipe_app.wsgi:application',
+    'uvicorn': 'recipe_app.asgi:application',
+}
+
+WORKER_CLASSES = {
+    'gunicorn': 'gthread',
+    'uvicorn': 'uvicorn.workers.UvicornH11Worker',
+}
+
+
+def get_server(environ=os.environ):
+    """Returns the server selected through APP_SERVER"""
+    server = environ.get('APP_SERVER', 'runserver')
+    if server not in SERVERS:
+        raise ValueError(f'APP_SERVER must be one of {", ".join(SERVERS)}.')
+
+    return server
+
+
+def get_gunicorn_config(environ=os.environ, cpu_count=None):
+    """Returns gunicorn settings sized from the CPU count
+
+    Every value can be overridden through the environment.
+    """
+    cpu_count = cpu_count or multiprocessing.cpu_count()
+    server = get_server(environ)
+    if server == 'runserver':
+        server = 'gunicorn'
+
+    return {
+        'bind': f'0.0.0.0:{environ.get("PORT", 8000)}',
+        'worker_class': WORKER_CLASSES[server],
+        'workers': int(environ.get('WEB_CONCURRENCY', cpu_count * 2 + 1)),
+        'threads': int(environ.get('GUNICORN_THREADS', 4)),
+        # Load Django once in the master so forked workers share its memory.
+        # Preloaded code is only replaced by a USR2 upgrade, not by HUP.
+        'preload_app': environ.get('GUNICORN_PRELOAD', '1').lower() in (
+            '1', 'true', 'yes', 'on'
+        ),
+        # Recycle workers, with jitter so they don't all restart at once
+        'max_requests': int(environ.get('GUNICORN_MAX_REQUESTS', 1000)),
+        'max_requests_jitter': int(
+            environ.get('GUNICORN_MAX_REQUESTS_JITTER', 100)
+        ),
+        'timeout': int(environ.get('GUNICORN_TIMEOUT', 30)),
+        'graceful_timeout': int(environ.get('GUNICORN_GRACEFUL_TIMEOUT', 30)),
+        'keepalive': int(environ.get('GUNICORN_KEEPALIVE', 5)),
+        # Worker heartbeats on tmpfs instead of a possibly slow disk
+        'worker_tmp_dir': environ.get('GUNICORN_WORKER_TMP_DIR', '/dev/shm'),
+        'accesslog': '-',
+    }
+
+
+def post_fork(server, worker):
+    """Makes sure workers never share DB connections with the master"""
+    from django.db import connections
+
+    connections.close_all()
+
+
+def on_starting(server):
+    """Archives the metrics left behind by a previous server"""
+    from core.metrics import archive_dumps
+
+    archive_dumps()
+
+
+def worker_exit(server, worker):
+    """Dumps the final metrics of an exiting worker"""
+    from core.metrics import registry
+
+    registry.flush()
+
+
+def child_exit(server, worker):
+    """Folds the metrics of an exited worker into the archive"""
+    from core.metrics import archive_dumps
+
+    archive_dumps(worker.pid)
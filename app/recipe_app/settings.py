@@ -11,6 +11,7 @@ https://docs.djangoproject.com/en/2.1/ref/settings/
 """
 
 import os
+from datetime import timedelta
 
 # Build paths inside the project like this: os.path.join(BASE_DIR, ...)
 BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
@@ -45,11 +46,14 @@ INSTALLED_APPS = [
 ]
 
 MIDDLEWARE = [
+    'core.middleware.MetricsMiddleware',
+    'core.middleware.SlowRequestLoggingMiddleware',
     'django.middleware.security.SecurityMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
     'django.middleware.csrf.CsrfViewMiddleware',
     'django.contrib.auth.middleware.AuthenticationMiddleware',
+    'core.middleware.HashingBusyMiddleware',
     'django.contrib.messages.middleware.MessageMiddleware',
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
 ]
@@ -88,6 +92,29 @@ DATABASES = {
     }
 }
 
+# Read replicas of the default database, as comma separated hosts. Safe
+# recipe reads are routed to them by core.db_routers.ReplicaRouter.
+
+DATABASE_REPLICAS = []
+for index, host in enumerate(os.environ.get('DB_REPLICA_HOSTS', '').split(',')):
+    if host:
+        alias = f'replica{index + 1}'
+        DATABASES[alias] = dict(
+            DATABASES['default'], HOST=host, TEST={'MIRROR': 'default'}
+        )
+        DATABASE_REPLICAS.append(alias)
+
+DATABASE_ROUTERS = ['core.db_routers.ReplicaRouter']
+
+# Seconds a user reads from the primary after writing
+REPLICA_PIN_SECONDS = int(os.environ.get('REPLICA_PIN_SECONDS', 5))
+# Cache alias remembering users who wrote recently. It must be shared by
+# every worker process for users to read their own writes.
+REPLICA_PIN_CACHE = os.environ.get('REPLICA_PIN_CACHE', 'default')
+
+# Seconds before an unavailable replica is tried again
+REPLICA_RETRY_SECONDS = int(os.environ.get('REPLICA_RETRY_SECONDS', 30))
+
 
 # Password validation
 # https://docs.djangoproject.com/en/2.1/ref/settings/#auth-password-validators
@@ -107,6 +134,21 @@ AUTH_PASSWORD_VALIDATORS = [
     },
 ]
 
+AUTHENTICATION_BACKENDS = ['core.authentication.HashingSlotsModelBackend']
+
+PASSWORD_HASHERS = [
+    'core.hashers.ConfigurablePBKDF2PasswordHasher',
+    'django.contrib.auth.hashers.PBKDF2SHA1PasswordHasher',
+]
+# Changing the iterations upgrades stored hashes on the next login
+PASSWORD_HASH_ITERATIONS = int(
+    os.environ.get('PASSWORD_HASH_ITERATIONS', 120000)
+)
+# Passwords hashed at the same time per process, and seconds a login
+# waits for a free slot before being rejected
+PASSWORD_HASH_CONCURRENCY = int(os.environ.get('PASSWORD_HASH_CONCURRENCY', 2))
+PASSWORD_HASH_TIMEOUT = float(os.environ.get('PASSWORD_HASH_TIMEOUT', 5))
+
 
 # Internationalization
 # https://docs.djangoproject.com/en/2.1/topics/i18n/
@@ -132,3 +174,122 @@ STATIC_ROOT = '/vol/web/static'
 MEDIA_ROOT = '/vol/web/media'
 
 AUTH_USER_MODEL = 'core.User'
+
+REST_FRAMEWORK = {
+    'DEFAULT_RENDERER_CLASSES': (
+        'core.renderers.FastJSONRenderer',
+        'rest_framework.renderers.BrowsableAPIRenderer',
+    ),
+    'DEFAULT_PARSER_CLASSES': (
+        'core.parsers.FastJSONParser',
+        'rest_framework.parsers.FormParser',
+        'rest_framework.parsers.MultiPartParser',
+    ),
+    # An empty variable disables the throttle
+    'DEFAULT_THROTTLE_RATES': {
+        'login_ip': os.environ.get('THROTTLE_LOGIN_IP', '30/min') or None,
+        'login_email': (
+            os.environ.get('THROTTLE_LOGIN_EMAIL', '10/min') or None
+        ),
+        'user': os.environ.get('THROTTLE_USER', '1200/min') or None,
+    },
+    # Proxies in front of the app appending to X-Forwarded-For. With 0 the
+    # header is ignored, clients could otherwise pick their own address.
+    'NUM_PROXIES': int(os.environ.get('NUM_PROXIES', 0)),
+}
+
+# Auth tokens
+# Tokens expire after AUTH_TOKEN_TTL without being used. Their expiry is
+# pushed back at most once per AUTH_TOKEN_REFRESH_INTERVAL.
+AUTH_TOKEN_TTL = timedelta(
+    days=int(os.environ.get('AUTH_TOKEN_TTL_DAYS', 30))
+)
+AUTH_TOKEN_REFRESH_INTERVAL = timedelta(minutes=int(
+    os.environ.get('AUTH_TOKEN_REFRESH_MINUTES', 60)
+))
+# Signed access tokens are valid for ACCESS_TOKEN_TTL. Users' token
+# versions are cached for ACCESS_TOKEN_VERSION_CACHE_SECONDS in the
+# ACCESS_TOKEN_CACHE cache, revocations take up to that long to reach
+# processes that don't share it.
+ACCESS_TOKEN_TTL = timedelta(
+    minutes=int(os.environ.get('ACCESS_TOKEN_TTL_MINUTES', 15))
+)
+ACCESS_TOKEN_CACHE = os.environ.get('ACCESS_TOKEN_CACHE', 'default')
+ACCESS_TOKEN_VERSION_CACHE_SECONDS = 60
+
+# How long responses to requests with an Idempotency-Key header are kept
+IDEMPOTENCY_KEY_TTL = timedelta(
+    hours=int(os.environ.get('IDEMPOTENCY_KEY_TTL_HOURS', 24))
+)
+# How long a key of a request still being processed is held, a few times
+# the request timeout. A key held by a killed worker is free after that.
+IDEMPOTENCY_KEY_LEASE = timedelta(
+    seconds=int(os.environ.get('IDEMPOTENCY_KEY_LEASE_SECONDS', 120))
+)
+
+# Throttling
+# Cache alias holding throttle buckets, shared by all processes using it.
+# Buckets are kept in process memory when unset.
+THROTTLE_CACHE = os.environ.get('THROTTLE_CACHE')
+# Maximum number of buckets kept in process memory
+THROTTLE_MAX_KEYS = 100000
+
+# Batch requests
+BATCH_MAX_REQUESTS = int(os.environ.get('BATCH_MAX_REQUESTS', 20))
+BATCH_ALLOWED_PATHS = ('/api/users/', '/api/recipes/')
+
+# Bulk recipe actions
+BULK_MAX_RECIPES = int(os.environ.get('BULK_MAX_RECIPES', 500))
+
+# Background tasks
+# Threads per process running work deferred after responses
+BACKGROUND_WORKERS = int(os.environ.get('BACKGROUND_WORKERS', 2))
+# Runs background tasks in the calling thread, for tests
+BACKGROUND_TASKS_EAGER = False
+
+# Metrics
+# Directory shared by all worker processes to aggregate their metrics
+METRICS_DIR = os.environ.get('METRICS_DIR')
+# Bearer token of the scrapers of /metrics, which staff users can also read
+METRICS_TOKEN = os.environ.get('METRICS_TOKEN')
+# Minimum seconds between dumps of a process' metrics to METRICS_DIR
+METRICS_FLUSH_INTERVAL = int(os.environ.get('METRICS_FLUSH_INTERVAL', 5))
+
+# Slow request logging
+# Thresholds in milliseconds, set to an empty value to disable
+
+
+def _get_threshold(name, default):
+    value = os.environ.get(name, default)
+    return float(value) if value else None
+
+
+SLOW_REQUEST_THRESHOLD_MS = _get_threshold('SLOW_REQUEST_THRESHOLD_MS', 1000)
+SLOW_QUERY_THRESHOLD_MS = _get_threshold('SLOW_QUERY_THRESHOLD_MS', 200)
+# Number of slowest queries included in slow request records
+SLOW_REQUEST_LOGGED_QUERIES = 5
+
+# Request profiling
+PROFILING_ENABLED = os.environ.get('PROFILING_ENABLED') == '1'
+# Probability of profiling a request without the X-Profile header
+PROFILING_SAMPLE_RATE = float(os.environ.get('PROFILING_SAMPLE_RATE', 0))
+# Seconds between stack samples
+PROFILING_INTERVAL = 0.005
+PROFILING_DIR = os.environ.get(
+    'PROFILING_DIR', os.path.join(BASE_DIR, 'profiles')
+)
+
+LOGGING = {
+    'version': 1,
+    'disable_existing_loggers': False,
+    'handlers': {
+        'console': {'class': 'logging.StreamHandler'},
+    },
+    'loggers': {
+        'core.performance': {
+            'handlers': ['console'],
+            'level': 'WARNING',
+            'propagate': False,
+        },
+    },
+}
@@ -0,0 +1,83 @@
+"""
+Production settings for recipe_app project.
+
+Select with DJANGO_SETTINGS_MODULE=recipe_app.settings_production. Values
+are tuned through environment variables, see the defaults below.
+"""
+
+import os
+
+from recipe_app.settings import *  # noqa: F401,F403
+from recipe_app.settings import DATABASES, SECRET_KEY
+
+
+def env_bool(name, default):
+    """Reads a boolean flag from the environment"""
+    value = os.environ.get(name)
+    if value is None:
+        return default
+
+    return value.lower() in ('1', 'true', 'yes', 'on')
+
+
+DEBUG = env_bool('DEBUG', False)
+
+SECRET_KEY = os.environ.get('SECRET_KEY', SECRET_KEY)
+
+ALLOWED_HOSTS = [
+    host for host in os.environ.get('ALLOWED_HOSTS', '').split(',') if host
+]
+
+
+# Database
+# Persistent connections are kept for DB_CONN_MAX_AGE seconds and checked
+# before their first use in each request. Setting DB_POOL_MAX_SIZE shares
+# a per-process pool between threads instead: connections go back to the
+# pool at the end of each request, so DB_CONN_MAX_AGE is ignored.
+
+DB_POOL_MAX_SIZE = int(os.environ.get('DB_POOL_MAX_SIZE', 0))
+
+DATABASE_OPTIONS = {
+    'ENGINE': 'core.backends.postgresql',
+    'PORT': os.environ.get('DB_PORT', ''),
+    'CONN_MAX_AGE': (
+        0 if DB_POOL_MAX_SIZE else int(os.environ.get('DB_CONN_MAX_AGE', 60))
+    ),
+    'CONN_HEALTH_CHECKS': env_bool('DB_CONN_HEALTH_CHECKS', True),
+    'POOL': {
+        'MAX_SIZE': DB_POOL_MAX_SIZE,
+        'TIMEOUT': float(os.environ.get('DB_POOL_TIMEOUT', 30)),
+    } if DB_POOL_MAX_SIZE else None,
+    'OPTIONS': {
+        'connect_timeout': int(os.environ.get('DB_CONNECT_TIMEOUT', 5)),
+    },
+}
+
+for database in DATABASES.values():
+    database.update(DATABASE_OPTIONS)
+
+
+# Caches
+# Users who wrote recently read from the primary. Which users did is kept
+# in the REPLICA_PIN_CACHE cache, a database table shared by every worker
+# process, created with `python manage.py createcachetable`.
+
+CACHES = {
+    'default': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+    },
+    'shared': {
+        'BACKEND': 'django.core.cache.backends.db.DatabaseCache',
+        'LOCATION': os.environ.get('SHARED_CACHE_TABLE', 'cache_shared'),
+    },
+}
+
+REPLICA_PIN_CACHE = os.environ.get('REPLICA_PIN_CACHE', 'shared')
+
+
+# Metrics
+# Every worker process dumps its metrics to METRICS_DIR, so /metrics
+# reports the totals of the server whichever worker serves it. Set it to
+# an empty value to report the metrics of the serving worker only.
+
+METRICS_DIR = os.environ.get('METRICS_DIR', '/vol/web/metrics') or None
@@ -0,0 +1,27 @@
+"""
+Django settings for running the test suite.
+
+Used by default by `python manage.py test`.
+"""
+from recipe_app.settings import *  # noqa
+from recipe_app.settings import DATABASES, REST_FRAMEWORK
+
+
+# Password hashing is slow on purpose, tests don't need that protection
+PASSWORD_HASHERS = ['django.contrib.auth.hashers.MD5PasswordHasher']
+
+# Runs tests with uploads in a temporary directory per test process
+TEST_RUNNER = 'core.test_runner.TestRunner'
+
+# Rate limits are tested on their own, other tests must not reach them
+REST_FRAMEWORK = dict(REST_FRAMEWORK, DEFAULT_THROTTLE_RATES={
+    scope: None for scope in REST_FRAMEWORK['DEFAULT_THROTTLE_RATES']
+})
+
+# Deferred work runs right away so tests can check its effects
+BACKGROUND_TASKS_EAGER = True
+
+# A replica mirroring the primary, so tests can check reads routed to it
+DATABASES.setdefault(
+    'replica1', dict(DATABASES['default'], TEST={'MIRROR': 'default'})
+)
@@ -18,8 +18,14 @@ from django.urls import include, path
 from django.conf.urls.static import static
 from django.conf import settings
 
+from core.views import BatchView, health_live, health_ready, metrics
+
 urlpatterns = [
     path('admin/', admin.site.urls),
+    path('health/live', health_live, name='health-live'),
+    path('health/ready', health_ready, name='health-ready'),
+    path('metrics', metrics, name='metrics'),
+    path('api/batch/', BatchView.as_view(), name='batch'),
     path('api/users/', include('users.urls')),
     path('api/recipes/', include('recipes.urls')),
 ] + static(settings.MEDIA_URL, document_root=settings.MEDIA_ROOT)
@@ -0,0 +1,139 @@
+"""
+Bulk recipe actions.
+
+Each action runs a fixed number of SQL statements whatever the number of
+recipes, except where the database backend limits the rows of a single
+INSERT and Django splits it into batches (SQLite).
+"""
+import random
+
+from django.db import connection, transaction
+from django.db.models import F
+
+from core import background
+from core.models import Recipe
+from recipes.serializers import get_through
+
+
+RELATED_FIELDS = ('ingredients', 'tags')
+
+
+def delete_unused_images(names):
+    """Deletes image files no recipe refers to anymore
+
+    Duplicated recipes share their image files, which are only deleted
+    with the last recipe using them.
+    """
+    used = set(Recipe.objects.filter(
+        image__in=names
+    ).values_list('image', flat=True))
+    storage = Recipe._meta.get_field('image').storage
+    for name in set(names) - used:
+        storage.delete(name)
+
+
+def delete_recipes(recipes):
+    """Deletes recipes and their links, returning how many were deleted
+
+    Image files are deleted in the background once the deletion commits.
+    """
+    with transaction.atomic():
+        rows = list(recipes.values_list('id', 'image'))
+        recipe_ids = [recipe_id for recipe_id, _ in rows]
+        if not recipe_ids:
+            return 0
+        for name in RELATED_FIELDS:
+            through, source, _ = get_through(name)
+            through.objects.filter(**{f'{source}__in': recipe_ids}).delete()
+        # Links are already gone, skip the collector deleting them again
+        # and deleting the recipes 100 at a time
+        with connection.cursor() as cursor:
+            cursor.execute(
+                'DELETE FROM {} WHERE {} IN ({})'.format(
+                    connection.ops.quote_name(Recipe._meta.db_table),
+                    connection.ops.quote_name(Recipe._meta.pk.column),
+                    ', '.join(['%s'] * len(recipe_ids)),
+                ),
+                recipe_ids
+            )
+
+        images = [image for _, image in rows if image]
+        if images:
+            background.submit_on_commit(delete_unused_images, images)
+
+    return len(recipe_ids)
+
+
+def tag_recipes(recipes, add_tags, remove_tags):
+    """Links and unlinks tags of many recipes, returning the recipe count
+
+    Recipes get a new version, like with any other update.
+    """
+    through, source, target = get_through('tags')
+    with transaction.atomic():
+        recipe_ids = list(recipes.values_list('id', flat=True))
+        if not recipe_ids:
+            return 0
+        # Locks the recipes first, as versioned updates do
+        Recipe.objects.filter(pk__in=recipe_ids).update(
+            version=F('version') + 1
+        )
+        if remove_tags:
+            through.objects.filter(**{
+                f'{source}__in': recipe_ids, f'{target}__in': remove_tags
+            }).delete()
+        if add_tags:
+            existing = set(through.objects.filter(**{
+                f'{source}__in': recipe_ids, f'{target}__in': add_tags
+            }).values_list(source, target))
+            through.objects.bulk_create(
+                through(**{source: recipe_id, target: tag_id})
+                for recipe_id in recipe_ids
+                for tag_id in add_tags
+                if (recipe_id, tag_id) not in existing
+            )
+
+    return len(recipe_ids)
+
+
+def duplicate_recipes(recipes):
+    """Copies recipes with their links, returning the ids of the copies
+
+    Copies share the image file of their recipe.
+    """
+    fields = [
+        field.attname for field in Recipe._meta.concrete_fields
+        if not field.primary_key and field.name != 'version'
+    ]
+    with transaction.atomic():
+        rows = list(recipes.order_by('id').values('id', *fields))
+        if not rows:
+            return []
+        if connection.features.can_return_ids_from_bulk_insert:
+            version = 1
+        else:
+            # Marks the copies with a version no other recipe has, to find
+            # their ids once inserted
+            version = random.randint(2 ** 30, 2 ** 31 - 1)
+        copies = Recipe.objects.bulk_create(
+            Recipe(version=version, **{name: row[name] for name in fields})
+            for row in rows
+        )
+        copy_ids = [copy.pk for copy in copies]
+        if version != 1:
+            marked = Recipe.objects.filter(version=version)
+            copy_ids = list(marked.order_by('id').values_list('id', flat=True))
+            marked.update(version=1)
+        copy_of = {row['id']: copy_id for row, copy_id in zip(rows, copy_ids)}
+
+        for name in RELATED_FIELDS:
+            through, source, target = get_through(name)
+            links = through.objects.filter(
+                **{f'{source}__in': list(copy_of)}
+            ).values_list(source, target)
+            through.objects.bulk_create(
+                through(**{source: copy_of[recipe_id], target: related_id})
+                for recipe_id, related_id in links
+            )
+
+    return copy_ids
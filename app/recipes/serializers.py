@@ -1,8 +1,45 @@
+from collections import defaultdict
+
+from django.conf import settings
+from django.db import transaction
 from rest_framework import serializers
 
+from core.exceptions import PreconditionFailed
 from core.models import Tag, Ingredient, Recipe
 
 
+def get_through(name):
+    """Returns the through model of a recipe relation and its id columns"""
+    field = Recipe._meta.get_field(name)
+    source = f'{field.m2m_field_name()}_id'
+    target = f'{field.m2m_reverse_field_name()}_id'
+
+    return field.remote_field.through, source, target
+
+
+def get_related_ids(name, recipe_id):
+    """Returns the ids linked to a recipe by one of its relations"""
+    through, source, target = get_through(name)
+
+    return set(through.objects.filter(
+        **{source: recipe_id}
+    ).values_list(target, flat=True))
+
+
+def update_related_ids(name, recipe_id, added, removed):
+    """Links and unlinks ids with one statement each"""
+    through, source, target = get_through(name)
+    if removed:
+        through.objects.filter(
+            **{source: recipe_id, f'{target}__in': removed}
+        ).delete()
+    if added:
+        through.objects.bulk_create(
+            through(**{source: recipe_id, target: related_id})
+            for related_id in sorted(added)
+        )
+
+
 class TagSerializer(serializers.ModelSerializer):
     """Serializer for tag objects"""
 
@@ -21,13 +58,99 @@ class IngredientSerializer(serializers.ModelSerializer):
         read_only_fields = ('id', )
 
 
-class RecipeSerializer(serializers.ModelSerializer):
+class DynamicFieldsMixin:
+    """Narrows and expands serializer fields from the serializer context
+
+    `fields` holds the names to render and `expand` the relations to be
+    rendered as nested objects instead of primary keys.
+    """
+    expandable_fields = {}
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        for name in self.context.get('expand') or ():
+            serializer_class = self.expandable_fields.get(name)
+            if serializer_class is not None:
+                self.fields[name] = serializer_class(many=True, read_only=True)
+
+        fields = self.context.get('fields')
+        if fields:
+            for name in set(self.fields) - set(fields):
+                self.fields.pop(name)
+
+
+class VersionedUpdateMixin:
+    """Updates recipes only if their version is the one that was read
+
+    Concurrent writers can't overwrite each other's changes, the one
+    losing the race gets a 412 and has to read the recipe again. Only the
+    columns and links that changed are written, updates changing nothing
+    don't write at all.
+    """
+    related_fields = ('ingredients', 'tags')
+
+    def get_related_changes(self, instance, validated_data):
+        """Returns the ids to link and unlink per relation
+
+        Relations are replaced by their full list of ids or changed with
+        the add_<name> and remove_<name> fields.
+        """
+        changes = {}
+        for name in self.related_fields:
+            replaced = validated_data.pop(name, None)
+            added = validated_data.pop(f'add_{name}', [])
+            removed = validated_data.pop(f'remove_{name}', [])
+            if replaced is None and not added and not removed:
+                continue
+            current = get_related_ids(name, instance.pk)
+            wanted = current if replaced is None else {
+                obj.pk for obj in replaced
+            }
+            wanted = (wanted | {obj.pk for obj in added}) - {
+                obj.pk for obj in removed
+            }
+            if wanted != current:
+                changes[name] = (wanted - current, current - wanted)
+
+        return changes
+
+    def update(self, instance, validated_data):
+        related = self.get_related_changes(instance, validated_data)
+        fields = [
+            name for name, value in validated_data.items()
+            if getattr(instance, name) != value
+        ]
+        if not fields and not related:
+            return instance
+        for name in fields:
+            setattr(instance, name, validated_data[name])
+
+        with transaction.atomic():
+            if not Recipe.objects.compare_and_set(instance, fields):
+                raise PreconditionFailed()
+            for name, (added, removed) in related.items():
+                update_related_ids(name, instance.pk, added, removed)
+
+        return instance
+
+
+class UserOwnedRelatedField(serializers.PrimaryKeyRelatedField):
+    """Primary key field only accepting objects of the requesting user"""
+
+    def get_queryset(self):
+        user = self.context['request'].user
+        return super().get_queryset().filter(user=user)
+
+
+class RecipeSerializer(
+    DynamicFieldsMixin, VersionedUpdateMixin, serializers.ModelSerializer
+):
     """Serializer for recipe objects"""
-    ingredients = serializers.PrimaryKeyRelatedField(
+    ingredients = UserOwnedRelatedField(
         many=True,
         queryset=Ingredient.objects.all()
     )
-    tags = serializers.PrimaryKeyRelatedField(
+    tags = UserOwnedRelatedField(
         many=True,
         queryset=Tag.objects.all()
     )
@@ -36,9 +159,39 @@ class RecipeSerializer(serializers.ModelSerializer):
         model = Recipe
         fields = (
             'id', 'title', 'time_minutes', 'price',
-            'ingredients', 'tags', 'link', 'image',
+            'ingredients', 'tags', 'link', 'image', 'version',
+        )
+        read_only_fields = ('id', 'image', 'version')
+
+    expandable_fields = {
+        'ingredients': IngredientSerializer,
+        'tags': TagSerializer,
+    }
+
+
+class RecipeUpdateSerializer(RecipeSerializer):
+    """Serializer for updating recipes, linking and unlinking relations"""
+    add_ingredients = UserOwnedRelatedField(
+        many=True, write_only=True, required=False,
+        queryset=Ingredient.objects.all()
+    )
+    remove_ingredients = UserOwnedRelatedField(
+        many=True, write_only=True, required=False,
+        queryset=Ingredient.objects.all()
+    )
+    add_tags = UserOwnedRelatedField(
+        many=True, write_only=True, required=False,
+        queryset=Tag.objects.all()
+    )
+    remove_tags = UserOwnedRelatedField(
+        many=True, write_only=True, required=False,
+        queryset=Tag.objects.all()
+    )
+
+    class Meta(RecipeSerializer.Meta):
+        fields = RecipeSerializer.Meta.fields + (
+            'add_ingredients', 'remove_ingredients', 'add_tags', 'remove_tags',
         )
-        read_only_fields = ('id', 'image')
 
 
 class RecipeDetailSerializer(RecipeSerializer):
@@ -47,10 +200,146 @@ class RecipeDetailSerializer(RecipeSerializer):
     ingredients = IngredientSerializer(many=True, read_only=True)
 
 
-class RecipeImageSerializer(serializers.ModelSerializer):
+class RecipeImageSerializer(VersionedUpdateMixin, serializers.ModelSerializer):
     """Serializer for uploading images to recipes"""
 
     class Meta:
         model = Recipe
-        fields = ('id', 'image')
-        read_only_fields = ('id', )
\ No newline at end of file
+        fields = ('id', 'image', 'version')
+        read_only_fields = ('id', 'version')
+
+
+class RecipeIdsSerializer(serializers.Serializer):
+    """Serializer for the recipes targeted by a bulk action"""
+    ids = serializers.ListField(
+        child=serializers.IntegerField(min_value=1), allow_empty=False
+    )
+
+    def validate_ids(self, ids):
+        if len(ids) > settings.BULK_MAX_RECIPES:
+            raise serializers.ValidationError(
+                f'At most {settings.BULK_MAX_RECIPES} recipes per request.'
+            )
+
+        return list(dict.fromkeys(ids))
+
+
+class BulkTagSerializer(RecipeIdsSerializer):
+    """Serializer for linking and unlinking tags of many recipes
+
+    Tags are checked with one query rather than one per id.
+    """
+    add_tags = serializers.ListField(
+        child=serializers.IntegerField(min_value=1), default=list
+    )
+    remove_tags = serializers.ListField(
+        child=serializers.IntegerField(min_value=1), default=list
+    )
+
+    def validate(self, attrs):
+        added = set(attrs['add_tags'])
+        removed = set(attrs['remove_tags'])
+        if not added and not removed:
+            raise serializers.ValidationError(
+                'Either add_tags or remove_tags is required.'
+            )
+        if added & removed:
+            raise serializers.ValidationError(
+                'Tags cannot be both added and removed.'
+            )
+
+        user = self.context['request'].user
+        tag_ids = added | removed
+        unknown = tag_ids - set(Tag.objects.filter(
+            user=user, pk__in=tag_ids
+        ).values_list('id', flat=True))
+        if unknown:
+            names = ', '.join(map(str, sorted(unknown)))
+            raise serializers.ValidationError({
+                'tags': f'Unknown tags: {names}.'
+            })
+
+        return dict(attrs, add_tags=sorted(added), remove_tags=sorted(removed))
+
+
+class ValuesListSerializer:
+    """Read only list serializer rendering rows straight from values()
+
+    Only suitable for models whose fields render as their raw column
+    values, such as tags and ingredients.
+    """
+
+    def __init__(self, queryset, fields):
+        self.queryset = queryset
+        self.fields = fields
+
+    @property
+    def data(self):
+        return list(self.queryset.values(*self.fields))
+
+
+class FastRecipeListSerializer:
+    """Read only serializer building recipe lists from raw rows
+
+    Produces the same output as RecipeSerializer(many=True) without
+    instantiating models or fields: recipe columns come from one
+    values_list() query and the tag and ingredient ids from one query
+    per through table, grouped in Python.
+    """
+    related_fields = ('ingredients', 'tags')
+
+    def __init__(self, queryset, fields=None, context=None):
+        self.queryset = queryset.prefetch_related(None)
+        self.fields = [
+            name for name in RecipeSerializer.Meta.fields
+            if not fields or name in fields
+        ]
+        self.context = context or {}
+
+    def _get_related_ids(self, name):
+        """Returns related ids per recipe id, ordered by related id"""
+        through, source, target = get_through(name)
+        recipe_ids = self.queryset.order_by().values('id')
+        rows = through.objects.filter(
+            **{f'{source}__in': recipe_ids}
+        ).order_by(source, target).values_list(source, target)
+
+        related_ids = defaultdict(list)
+        for recipe_id, related_id in rows:
+            related_ids[recipe_id].append(related_id)
+
+        return related_ids
+
+    def _get_image_url(self, name):
+        """Returns the image URL the same way DRF's ImageField does"""
+        url = Recipe._meta.get_field('image').storage.url(name)
+        request = self.context.get('request')
+        if request is not None:
+            return request.build_absolute_uri(url)
+
+        return url
+
+    @property
+    def data(self):
+        columns = [
+            name for name in self.fields if name not in self.related_fields
+        ]
+        related = {
+            name: self._get_related_ids(name)
+            for name in self.related_fields if name in self.fields
+        }
+        rows = self.queryset.values_list('id', *columns)
+
+        data = []
+        for row in rows:
+            values = dict(zip(columns, row[1:]))
+            if 'price' in values:
+                values['price'] = '{:f}'.format(values['price'])
+            if 'image' in values:
+                image = values['image']
+                values['image'] = self._get_image_url(image) if image else None
+            for name, related_ids in related.items():
+                values[name] = related_ids.get(row[0], [])
+            data.append({name: values[name] for name in self.fields})
+
+        return data
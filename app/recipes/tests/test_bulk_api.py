@@ -0,0 +1,180 @@
+import os
+import tempfile
+from unittest.mock import patch
+
+from PIL import Image
+
+from django.contrib.auth import get_user_model
+from django.test import TestCase, TransactionTestCase, override_settings
+from django.urls import reverse
+
+from rest_framework import status
+from rest_framework.test import APIClient
+
+from core.models import Ingredient, Recipe, Tag
+
+
+BULK_DELETE_URL = reverse('recipes:recipe-bulk-delete')
+BULK_TAG_URL = reverse('recipes:recipe-bulk-tag')
+BULK_DUPLICATE_URL = reverse('recipes:recipe-bulk-duplicate')
+
+
+def get_sample_recipe(user, **kwargs):
+    defaults = {'title': 'Sample recipe', 'time_minutes': 5, 'price': 5.00}
+    defaults.update(kwargs)
+
+    return Recipe.objects.create(user=user, **defaults)
+
+
+class BulkRecipeApiTests(TestCase):
+    """Tests the bulk recipe actions"""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = get_user_model().objects.create_user(
+            email='gustavo@test.com',
+            password='123456'
+        )
+        cls.other_user = get_user_model().objects.create_user(
+            email='other@test.com',
+            password='123456'
+        )
+
+    def setUp(self):
+        self.client = APIClient()
+        self.client.force_authenticate(user=self.user)
+
+    def test_bulk_delete(self):
+        """Test deleting many recipes, ignoring other users' recipes"""
+        recipes = [get_sample_recipe(self.user) for _ in range(3)]
+        recipes[0].tags.add(Tag.objects.create(user=self.user, name='Vegan'))
+        other = get_sample_recipe(self.other_user)
+        ids = [recipes[0].id, recipes[1].id, other.id]
+
+        res = self.client.post(BULK_DELETE_URL, {'ids': ids}, format='json')
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(res.json(), {'deleted': 2})
+        self.assertEqual(
+            set(Recipe.objects.values_list('id', flat=True)),
+            {recipes[2].id, other.id}
+        )
+        self.assertFalse(Recipe.tags.through.objects.exists())
+
+    @override_settings(BULK_MAX_RECIPES=2)
+    def test_bulk_action_limit(self):
+        """Test bulk actions are limited to BULK_MAX_RECIPES recipes"""
+        res = self.client.post(
+            BULK_DELETE_URL, {'ids': [1, 2, 3]}, format='json'
+        )
+
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_bulk_tag(self):
+        """Test adding and removing tags of many recipes"""
+        vegan = Tag.objects.create(user=self.user, name='Vegan')
+        dessert = Tag.objects.create(user=self.user, name='Dessert')
+        recipes = [get_sample_recipe(self.user) for _ in range(2)]
+        recipes[0].tags.add(vegan, dessert)
+
+        res = self.client.post(BULK_TAG_URL, {
+            'ids': [recipe.id for recipe in recipes],
+            'add_tags': [vegan.id],
+            'remove_tags': [dessert.id],
+        }, format='json')
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(res.json(), {'updated': 2})
+        for recipe in recipes:
+            self.assertEqual(list(recipe.tags.all()), [vegan])
+            recipe.refresh_from_db()
+            self.assertEqual(recipe.version, 2)
+
+    def test_bulk_tag_with_other_users_tag_fails(self):
+        """Test tags of other users are rejected"""
+        recipe = get_sample_recipe(self.user)
+        tag = Tag.objects.create(user=self.other_user, name='Vegan')
+
+        res = self.client.post(BULK_TAG_URL, {
+            'ids': [recipe.id], 'add_tags': [tag.id],
+        }, format='json')
+
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertFalse(recipe.tags.exists())
+
+    def test_bulk_duplicate(self):
+        """Test copying recipes with their tags and ingredients"""
+        recipe = get_sample_recipe(self.user, title='Soup')
+        tag = Tag.objects.create(user=self.user, name='Vegan')
+        ingredient = Ingredient.objects.create(user=self.user, name='Leek')
+        recipe.tags.add(tag)
+        recipe.ingredients.add(ingredient)
+        other = get_sample_recipe(self.other_user)
+
+        res = self.client.post(
+            BULK_DUPLICATE_URL, {'ids': [recipe.id, other.id]}, format='json'
+        )
+
+        self.assertEqual(res.status_code, status.HTTP_201_CREATED)
+        self.assertEqual(len(res.json()), 1)
+        copy = Recipe.objects.get(pk=res.json()[0]['id'])
+        self.assertNotEqual(copy.id, recipe.id)
+        self.assertEqual((copy.title, copy.user), ('Soup', self.user))
+        self.assertEqual(list(copy.tags.all()), [tag])
+        self.assertEqual(list(copy.ingredients.all()), [ingredient])
+        self.assertEqual(
+            Recipe.objects.filter(user=self.other_user).count(), 1
+        )
+
+    def test_bulk_duplicate_with_concurrent_creates(self):
+        """Test the copies are returned when recipes are created meanwhile"""
+        recipe = get_sample_recipe(self.user, title='Soup')
+        bulk_create = Recipe.objects.bulk_create
+
+        def bulk_create_and_insert(objs):
+            copies = bulk_create(objs)
+            get_sample_recipe(self.other_user, title='Other')
+            return copies
+
+        with patch.object(Recipe.objects, 'bulk_create',
+                          side_effect=bulk_create_and_insert):
+            res = self.client.post(
+                BULK_DUPLICATE_URL, {'ids': [recipe.id]}, format='json'
+            )
+
+        self.assertEqual(res.status_code, status.HTTP_201_CREATED)
+        copy = Recipe.objects.get(pk=res.json()[0]['id'])
+        self.assertEqual((copy.title, copy.user), ('Soup', self.user))
+        self.assertEqual(copy.version, 1)
+
+
+class BulkDeleteImageTests(TransactionTestCase):
+    """Tests image files are deleted after bulk deletions commit"""
+
+    def setUp(self):
+        self.user = get_user_model().objects.create_user(
+            email='gustavo@test.com',
+            password='123456'
+        )
+        self.client = APIClient()
+        self.client.force_authenticate(user=self.user)
+
+    def test_bulk_delete_removes_unused_images(self):
+        """Test image files are deleted unless another recipe uses them"""
+        recipe = get_sample_recipe(self.user)
+        with tempfile.NamedTemporaryFile(suffix='.jpg') as ntf:
+            Image.new('RGB', (10, 10)).save(ntf, format='JPEG')
+            ntf.seek(0)
+            self.client.post(
+                reverse('recipes:recipe-upload-image', args=[recipe.id]),
+                {'image': ntf}, format='multipart'
+            )
+        recipe.refresh_from_db()
+        copy = get_sample_recipe(self.user, image=recipe.image.name)
+        path = recipe.image.path
+
+        self.client.post(BULK_DELETE_URL, {'ids': [recipe.id]}, format='json')
+        self.assertTrue(os.path.exists(path))
+
+        self.client.post(BULK_DELETE_URL, {'ids': [copy.id]}, format='json')
+        self.assertFalse(os.path.exists(path))
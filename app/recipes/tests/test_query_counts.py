@@ -0,0 +1,201 @@
+import tempfile
+
+from PIL import Image
+
+from django.test import TestCase
+from django.urls import reverse
+
+from rest_framework.test import APIClient
+
+from core.models import Tag, Ingredient, Recipe
+from core.tests.utils import QueryCountMixin
+
+
+TAGS_URL = reverse('recipes:tag-list')
+INGREDIENTS_URL = reverse('recipes:ingredient-list')
+RECIPES_URL = reverse('recipes:recipe-list')
+
+
+def get_recipe_detail_url(recipe_id):
+    return reverse('recipes:recipe-detail', args=[recipe_id])
+
+
+def get_payload(user):
+    return {
+        'title': 'Chocolate cake',
+        'time_minutes': 30,
+        'price': '12.50',
+        'tags': list(
+            Tag.objects.filter(user=user).values_list('id', flat=True)[:3]
+        ),
+        'ingredients': list(
+            Ingredient.objects.filter(
+                user=user
+            ).values_list('id', flat=True)[:3]
+        ),
+    }
+
+
+class RecipeApiQueryCountTests(QueryCountMixin, TestCase):
+    """Test the recipe endpoints run a constant number of queries"""
+
+    def setUp(self):
+        self.client = APIClient()
+
+    def test_list_tags(self):
+        """Test listing tags runs a constant number of queries"""
+        self.assertConstantQueries(
+            lambda user, recipe_ids: self.client.get(TAGS_URL)
+        )
+
+    def test_list_assigned_tags(self):
+        """Test listing assigned tags runs a constant number of queries"""
+        self.assertConstantQueries(
+            lambda user, recipe_ids: self.client.get(
+                TAGS_URL, {'assigned_only': 'true'}
+            )
+        )
+
+    def test_create_tag(self):
+        """Test creating a tag runs a constant number of queries"""
+        self.assertConstantQueries(
+            lambda user, recipe_ids: self.client.post(
+                TAGS_URL, {'name': 'New tag'}
+            )
+        )
+
+    def test_list_ingredients(self):
+        """Test listing ingredients runs a constant number of queries"""
+        self.assertConstantQueries(
+            lambda user, recipe_ids: self.client.get(INGREDIENTS_URL)
+        )
+
+    def test_create_ingredient(self):
+        """Test creating an ingredient runs a constant number of queries"""
+        self.assertConstantQueries(
+            lambda user, recipe_ids: self.client.post(
+                INGREDIENTS_URL, {'name': 'New ingredient'}
+            )
+        )
+
+    def test_list_recipes(self):
+        """Test listing recipes runs a constant number of queries"""
+        self.assertConstantQueries(
+            lambda user, recipe_ids: self.client.get(RECIPES_URL)
+        )
+
+    def test_list_recipes_filtered_and_ordered(self):
+        """Test filtering and ordering recipes runs constant queries"""
+        def request(user, recipe_ids):
+            tag_ids = Tag.objects.filter(
+                user=user
+            ).values_list('id', flat=True)[:2]
+            return self.client.get(RECIPES_URL, {
+                'tags': ','.join(str(tag_id) for tag_id in tag_ids),
+                'max_price': 50,
+                'ordering': '-price',
+            })
+
+        self.assertConstantQueries(request)
+
+    def test_list_recipes_expanded(self):
+        """Test expanding recipe relations runs constant queries"""
+        self.assertConstantQueries(
+            lambda user, recipe_ids: self.client.get(
+                RECIPES_URL, {'expand': 'tags,ingredients'}
+            )
+        )
+
+    def test_list_recipes_sparse_fields(self):
+        """Test selecting recipe fields runs constant queries"""
+        self.assertConstantQueries(
+            lambda user, recipe_ids: self.client.get(
+                RECIPES_URL, {'fields': 'id,title'}
+            )
+        )
+
+    def test_retrieve_recipe(self):
+        """Test retrieving a recipe runs a constant number of queries"""
+        self.assertConstantQueries(
+            lambda user, recipe_ids: self.client.get(
+                get_recipe_detail_url(recipe_ids[0])
+            )
+        )
+
+    def test_create_recipe(self):
+        """Test creating a recipe runs a constant number of queries"""
+        self.assertConstantQueries(
+            lambda user, recipe_ids: self.client.post(
+                RECIPES_URL, get_payload(user)
+            )
+        )
+
+    def test_update_recipe(self):
+        """Test updating a recipe runs a constant number of queries"""
+        self.assertConstantQueries(
+            lambda user, recipe_ids: self.client.put(
+                get_recipe_detail_url(recipe_ids[0]), get_payload(user)
+            )
+        )
+
+    def test_partial_update_recipe(self):
+        """Test patching a recipe runs a constant number of queries"""
+        self.assertConstantQueries(
+            lambda user, recipe_ids: self.client.patch(
+                get_recipe_detail_url(recipe_ids[0]), {'title': 'Updated'}
+            )
+        )
+
+    def test_delete_recipe(self):
+        """Test deleting a recipe runs a constant number of queries"""
+        self.assertConstantQueries(
+            lambda user, recipe_ids: self.client.delete(
+                get_recipe_detail_url(recipe_ids[0])
+            )
+        )
+
+    def test_bulk_delete_recipes(self):
+        """Test bulk deleting recipes runs constant queries"""
+        self.assertConstantQueries(
+            lambda user, recipe_ids: self.client.post(
+                reverse('recipes:recipe-bulk-delete'), {'ids': recipe_ids},
+                format='json'
+            )
+        )
+
+    def test_bulk_tag_recipes(self):
+        """Test bulk tagging recipes runs constant queries"""
+        def request(user, recipe_ids):
+            tags = Tag.objects.filter(user=user).values_list('id', flat=True)
+            new_tag = Tag.objects.create(user=user, name='New tag')
+            return self.client.post(reverse('recipes:recipe-bulk-tag'), {
+                'ids': recipe_ids,
+                'add_tags': [new_tag.id],
+                'remove_tags': list(tags[:2]),
+            }, format='json')
+
+        self.assertConstantQueries(request)
+
+    def test_bulk_duplicate_recipes(self):
+        """Test bulk duplicating recipes runs constant queries"""
+        # SQLite splits inserts of more than 499 links into batches
+        self.assertConstantQueries(
+            lambda user, recipe_ids: self.client.post(
+                reverse('recipes:recipe-bulk-duplicate'),
+                {'ids': recipe_ids[:40]}, format='json'
+            )
+        )
+
+    def test_upload_image(self):
+        """Test uploading an image runs a constant number of queries"""
+        def request(user, recipe_ids):
+            url = reverse('recipes:recipe-upload-image', args=[recipe_ids[0]])
+            with tempfile.NamedTemporaryFile(suffix='.jpg') as ntf:
+                Image.new('RGB', (10, 10)).save(ntf, format='JPEG')
+                ntf.seek(0)
+                return self.client.post(url, {'image': ntf},
+                                        format='multipart')
+
+        self.assertConstantQueries(request)
+        for recipe in Recipe.objects.exclude(image=''):
+            recipe.image.delete()
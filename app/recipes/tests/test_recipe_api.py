@@ -1,17 +1,22 @@
 import tempfile
 import os
+from unittest.mock import patch
 
 from PIL import Image
 
 from django.contrib.auth import get_user_model
+from django.db import connection
 from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
 from django.urls import reverse
 
 from rest_framework import status
 from rest_framework.test import APIClient
 
 from core.models import Recipe, Tag, Ingredient
-from recipes.serializers import RecipeSerializer, RecipeDetailSerializer
+from recipes.serializers import (
+    RecipeSerializer, RecipeDetailSerializer, TagSerializer
+)
 
 
 RECIPES_URL = reverse('recipes:recipe-list')
@@ -62,12 +67,15 @@ class PublicRecipeApiTests(TestCase):
 class PrivateRecipeApiTests(TestCase):
     """Tests the private recipe endpoints"""
 
-    def setUp(self):
-        self.client = APIClient()
-        self.user = get_user_model().objects.create_user(
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = get_user_model().objects.create_user(
             email='gustavo@test.com',
             password='123456'
         )
+
+    def setUp(self):
+        self.client = APIClient()
         self.client.force_authenticate(user=self.user)
 
     def test_retreiving_recipes(self):
@@ -205,6 +213,141 @@ class PrivateRecipeApiTests(TestCase):
         self.assertEqual(recipe.price, payload['price'])
         self.assertEqual(recipe.tags.count(), 0)
 
+    def test_retrieving_recipe_returns_etag(self):
+        """Test the recipe detail carries its version as ETag"""
+        recipe = get_sample_recipe(user=self.user)
+
+        res = self.client.get(get_recipe_detail_url(recipe.id))
+
+        self.assertEqual(res['ETag'], '"1"')
+        self.assertEqual(res.json()['version'], 1)
+
+    def test_updating_recipe_with_matching_version(self):
+        """Test an update with the current ETag in If-Match succeeds"""
+        recipe = get_sample_recipe(user=self.user)
+        url = get_recipe_detail_url(recipe.id)
+
+        res = self.client.patch(url, {'title': 'New'}, HTTP_IF_MATCH='"1"')
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(res['ETag'], '"2"')
+        recipe.refresh_from_db()
+        self.assertEqual(recipe.title, 'New')
+        self.assertEqual(recipe.version, 2)
+
+    def test_updating_recipe_with_stale_version_fails(self):
+        """Test an update with an outdated ETag is rejected"""
+        recipe = get_sample_recipe(user=self.user)
+        Recipe.objects.filter(pk=recipe.pk).update(version=2)
+        url = get_recipe_detail_url(recipe.id)
+
+        res = self.client.patch(url, {'title': 'New'}, HTTP_IF_MATCH='"1"')
+
+        self.assertEqual(res.status_code, status.HTTP_412_PRECONDITION_FAILED)
+        recipe.refresh_from_db()
+        self.assertEqual(recipe.title, 'Sample recipe')
+
+    def test_updating_recipe_changed_while_writing_fails(self):
+        """Test an update losing a race with another write is rejected"""
+        recipe = get_sample_recipe(user=self.user)
+        url = get_recipe_detail_url(recipe.id)
+
+        def compare_and_set(recipe, fields):
+            Recipe.objects.filter(pk=recipe.pk).update(version=2)
+            return original(recipe, fields)
+
+        original = Recipe.objects.compare_and_set
+        with patch.object(Recipe.objects, 'compare_and_set', compare_and_set):
+            res = self.client.patch(url, {'title': 'New'})
+
+        self.assertEqual(res.status_code, status.HTTP_412_PRECONDITION_FAILED)
+        recipe.refresh_from_db()
+        self.assertEqual(recipe.title, 'Sample recipe')
+
+    def test_adding_and_removing_recipe_tags(self):
+        """Test linking and unlinking tags without sending the full list"""
+        recipe = get_sample_recipe(user=self.user)
+        kept = get_sample_tag(user=self.user, name='Kept')
+        removed = get_sample_tag(user=self.user, name='Removed')
+        added = get_sample_tag(user=self.user, name='Added')
+        recipe.tags.add(kept, removed)
+        ingredient = get_sample_ingredient(user=self.user)
+
+        res = self.client.patch(get_recipe_detail_url(recipe.id), {
+            'add_tags': [added.id],
+            'remove_tags': [removed.id],
+            'add_ingredients': [ingredient.id],
+        }, format='json')
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(res.json()['tags'], [kept.id, added.id])
+        self.assertNotIn('add_tags', res.json())
+        self.assertEqual(list(recipe.ingredients.all()), [ingredient])
+
+    def test_linking_other_users_objects_fails(self):
+        """Test tags and ingredients of other users cannot be linked"""
+        recipe = get_sample_recipe(user=self.user)
+        other = get_user_model().objects.create_user(
+            email='other@test.com',
+            password='123456'
+        )
+        tag = get_sample_tag(user=other)
+        ingredient = get_sample_ingredient(user=other)
+        url = get_recipe_detail_url(recipe.id)
+
+        tag_res = self.client.patch(url, {'add_tags': [tag.id]}, format='json')
+        ingredient_res = self.client.patch(
+            url, {'add_ingredients': [ingredient.id]}, format='json'
+        )
+
+        self.assertEqual(tag_res.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertEqual(
+            ingredient_res.status_code, status.HTTP_400_BAD_REQUEST
+        )
+        self.assertFalse(recipe.tags.exists())
+        self.assertFalse(recipe.ingredients.exists())
+
+    def test_partial_update_writes_only_changes(self):
+        """Test only changed columns and links are written"""
+        recipe = get_sample_recipe(user=self.user)
+        kept = get_sample_tag(user=self.user, name='Kept')
+        removed = get_sample_tag(user=self.user, name='Removed')
+        added = get_sample_tag(user=self.user, name='Added')
+        recipe.tags.add(kept, removed)
+        payload = {
+            'title': 'New title',
+            'price': '5.00',
+            'tags': [kept.id, added.id],
+        }
+
+        with CaptureQueriesContext(connection) as queries:
+            res = self.client.patch(
+                get_recipe_detail_url(recipe.id), payload, format='json'
+            )
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        writes = [
+            query['sql'] for query in queries
+            if query['sql'].startswith(('UPDATE', 'INSERT', 'DELETE'))
+        ]
+        self.assertEqual(len(writes), 3)
+        self.assertIn('"title"', writes[0])
+        self.assertNotIn('"price"', writes[0])
+        self.assertEqual(
+            list(recipe.tags.order_by('id')), [kept, added]
+        )
+
+    def test_partial_update_without_changes(self):
+        """Test an update changing nothing doesn't write the recipe"""
+        recipe = get_sample_recipe(user=self.user, title='Soup')
+
+        res = self.client.patch(
+            get_recipe_detail_url(recipe.id), {'title': 'Soup'}
+        )
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(res['ETag'], '"1"')
+
     def test_retrieving_recipes_filtered_by_tags(self):
         """Test retrieving recipe with specific tags"""
         recipe1 = get_sample_recipe(user=self.user, title='Something with mushrooms idk')
@@ -245,6 +388,111 @@ class PrivateRecipeApiTests(TestCase):
         self.assertIn(serializer2.data, res.json())
         self.assertNotIn(serializer3.data, res.json())
 
+    def test_retrieving_recipes_filtered_by_price_and_time(self):
+        """Test retrieving recipes within a price range and time limit"""
+        recipe1 = get_sample_recipe(
+            user=self.user, price=4.00, time_minutes=10
+        )
+        recipe2 = get_sample_recipe(
+            user=self.user, price=8.00, time_minutes=60
+        )
+        recipe3 = get_sample_recipe(
+            user=self.user, price=20.00, time_minutes=15
+        )
+
+        res = self.client.get(
+            RECIPES_URL,
+            {'min_price': '3.50', 'max_price': '10', 'max_time': 30}
+        )
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        ids = [recipe['id'] for recipe in res.json()]
+        self.assertEqual(ids, [recipe1.id])
+        self.assertNotIn(recipe2.id, ids)
+        self.assertNotIn(recipe3.id, ids)
+
+    def test_retrieving_recipes_with_invalid_filter_fails(self):
+        """Test that non numeric range filters are rejected"""
+        res = self.client.get(RECIPES_URL, {'max_price': 'cheap'})
+
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_retrieving_recipes_ordered(self):
+        """Test ordering recipes by price with id as tie breaker"""
+        recipe1 = get_sample_recipe(user=self.user, price=10.00)
+        recipe2 = get_sample_recipe(user=self.user, price=5.00)
+        recipe3 = get_sample_recipe(user=self.user, price=10.00)
+
+        res = self.client.get(RECIPES_URL, {'ordering': 'price'})
+        res_desc = self.client.get(RECIPES_URL, {'ordering': '-price'})
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(
+            [recipe['id'] for recipe in res.json()],
+            [recipe2.id, recipe1.id, recipe3.id]
+        )
+        self.assertEqual(
+            [recipe['id'] for recipe in res_desc.json()],
+            [recipe3.id, recipe1.id, recipe2.id]
+        )
+
+    def test_retrieving_recipes_with_invalid_ordering_fails(self):
+        """Test that ordering by unsupported fields is rejected"""
+        res = self.client.get(RECIPES_URL, {'ordering': 'link'})
+
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_retrieving_recipes_with_sparse_fields(self):
+        """Test that only the requested fields are returned"""
+        recipe = get_sample_recipe(user=self.user)
+        recipe.tags.add(get_sample_tag(user=self.user))
+
+        res = self.client.get(RECIPES_URL, {'fields': 'id,title,image'})
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(
+            res.json(),
+            [{'id': recipe.id, 'title': recipe.title, 'image': None}]
+        )
+
+    def test_retrieving_recipes_with_unknown_field_fails(self):
+        """Test that requesting unknown fields is rejected"""
+        res = self.client.get(RECIPES_URL, {'fields': 'id,user'})
+
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_retrieving_recipes_with_expanded_tags(self):
+        """Test expanding tags inline on the recipe list"""
+        recipe = get_sample_recipe(user=self.user)
+        tag = get_sample_tag(user=self.user)
+        recipe.tags.add(tag)
+        recipe.ingredients.add(get_sample_ingredient(user=self.user))
+
+        res = self.client.get(RECIPES_URL, {'expand': 'tags'})
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        data = res.json()[0]
+        self.assertEqual(data['tags'], [TagSerializer(tag).data])
+        self.assertEqual(
+            data['ingredients'],
+            [ingredient.id for ingredient in recipe.ingredients.all()]
+        )
+
+    def test_retrieving_recipe_detail_with_sparse_fields(self):
+        """Test sparse fields on the recipe detail keeps nested relations"""
+        recipe = get_sample_recipe(user=self.user)
+        tag = get_sample_tag(user=self.user)
+        recipe.tags.add(tag)
+
+        url = get_recipe_detail_url(recipe.id)
+        res = self.client.get(url, {'fields': 'title,tags'})
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(
+            res.json(),
+            {'title': recipe.title, 'tags': [TagSerializer(tag).data]}
+        )
+
 
 class RecipeImageUploadingTests(TestCase):
     """Tests for recipe image uploads"""
@@ -274,6 +522,7 @@ class RecipeImageUploadingTests(TestCase):
         self.assertEqual(res.status_code, status.HTTP_200_OK)
         self.assertIn('image', res.json())
         self.assertTrue(os.path.exists(self.recipe.image.path))
+        self.assertEqual(self.recipe.version, 2)
 
     def test_uploading_image_incorrectly(self):
         """Test uploading an invalid image"""
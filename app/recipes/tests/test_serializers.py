@@ -0,0 +1,89 @@
+from django.contrib.auth import get_user_model
+from django.test import TestCase
+from rest_framework.test import APIRequestFactory
+
+from core.models import Recipe, Tag, Ingredient
+from recipes.serializers import (
+    RecipeSerializer, FastRecipeListSerializer, TagSerializer,
+    ValuesListSerializer
+)
+
+
+class FastListSerializerTests(TestCase):
+    """Tests the read only list serializers match the model serializers"""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = get_user_model().objects.create_user(
+            email='gustavo@test.com',
+            password='123456'
+        )
+        tags = [
+            Tag.objects.create(user=cls.user, name=name)
+            for name in ('Vegan', 'Dessert', 'Dinner')
+        ]
+        ingredients = [
+            Ingredient.objects.create(user=cls.user, name=name)
+            for name in ('Tomato', 'Ginger')
+        ]
+        recipe1 = Recipe.objects.create(
+            user=cls.user, title='Thai curry', time_minutes=35,
+            price=12.5, link='https://example.com/curry',
+            image='uploads/recipes/curry image.jpg'
+        )
+        recipe1.tags.add(tags[2], tags[0])
+        recipe1.ingredients.add(*ingredients)
+        recipe2 = Recipe.objects.create(
+            user=cls.user, title='Cheesecake', time_minutes=60, price=7
+        )
+        recipe2.tags.add(tags[1])
+        Recipe.objects.create(
+            user=cls.user, title='Toast', time_minutes=2, price=0.99
+        )
+
+    def setUp(self):
+        self.queryset = Recipe.objects.order_by('-id')
+
+    def test_recipe_list_matches_recipe_serializer(self):
+        """Test fast recipe lists are identical to RecipeSerializer"""
+        request = APIRequestFactory().get('/api/recipes/recipes/')
+        context = {'request': request}
+
+        serializer = RecipeSerializer(
+            self.queryset, many=True, context=context
+        )
+        fast_serializer = FastRecipeListSerializer(
+            self.queryset, context=context
+        )
+
+        self.assertEqual(fast_serializer.data, serializer.data)
+
+    def test_recipe_list_with_sparse_fields(self):
+        """Test fast recipe lists render fields in serializer order"""
+        context = {'fields': ['tags', 'price', 'id']}
+
+        serializer = RecipeSerializer(
+            self.queryset, many=True, context=context
+        )
+        fast_serializer = FastRecipeListSerializer(
+            self.queryset, fields=context['fields']
+        )
+
+        self.assertEqual(fast_serializer.data, serializer.data)
+        self.assertEqual(
+            list(fast_serializer.data[0]), ['id', 'price', 'tags']
+        )
+
+    def test_recipe_list_runs_constant_queries(self):
+        """Test fast recipe lists use one query per table"""
+        with self.assertNumQueries(3):
+            FastRecipeListSerializer(self.queryset).data
+
+    def test_values_list_matches_model_serializer(self):
+        """Test values based lists are identical to TagSerializer"""
+        queryset = Tag.objects.order_by('name')
+
+        self.assertEqual(
+            ValuesListSerializer(queryset, TagSerializer.Meta.fields).data,
+            TagSerializer(queryset, many=True).data
+        )
@@ -28,12 +28,15 @@ class PublicTagApiTests(TestCase):
 class PrivateTagApiTests(TestCase):
     """Test the private tags endpoints"""
 
-    def setUp(self):
-        self.client = APIClient()
-        self.user = get_user_model().objects.create_user(
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = get_user_model().objects.create_user(
             email='gustavo@test.com',
             password='123456'
         )
+
+    def setUp(self):
+        self.client = APIClient()
         self.client.force_authenticate(user=self.user)
 
     def test_retrieving_user_tags(self):
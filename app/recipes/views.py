@@ -1,19 +1,92 @@
+from decimal import Decimal, InvalidOperation
+
+from django.db import DatabaseError
+from django.db.models import Prefetch
+from django.utils.http import parse_etags
 from rest_framework.decorators import action
+from rest_framework.exceptions import ValidationError
 from rest_framework.response import Response
 from rest_framework import viewsets, mixins, status
-from rest_framework.authentication import TokenAuthentication
-from rest_framework.permissions import IsAuthenticated
+from rest_framework.permissions import IsAuthenticated, SAFE_METHODS
 
+from core import db_routers
+from core.authentication import (
+    ExpiringTokenAuthentication, SignedAccessTokenAuthentication
+)
+from core.exceptions import PreconditionFailed
+from core.idempotency import IdempotencyMixin
 from core.models import Tag, Ingredient, Recipe
+from core.profiling import ProfilingMixin
+from core.throttling import UserThrottle
 from recipes.serializers import (
-    TagSerializer, IngredientSerializer, RecipeSerializer, RecipeDetailSerializer, RecipeImageSerializer
+    TagSerializer, IngredientSerializer, RecipeSerializer,
+    RecipeDetailSerializer, RecipeImageSerializer,
+    RecipeUpdateSerializer, ValuesListSerializer, FastRecipeListSerializer,
+    RecipeIdsSerializer, BulkTagSerializer
 )
+from recipes import bulk
+
+
+def get_etag(version):
+    """Returns the strong ETag of a recipe version"""
+    return f'"{version}"'
+
+
+class ReplicaReadMixin:
+    """Sends safe reads to replicas and pins writers to the primary"""
+    replica_actions = ('list', 'retrieve')
+
+    def initial(self, request, *args, **kwargs):
+        """Enables replica reads once the user is authenticated"""
+        super().initial(request, *args, **kwargs)
+        if (
+            self.action in self.replica_actions
+            and request.method in SAFE_METHODS
+            and not db_routers.is_pinned(request.user.pk)
+        ):
+            db_routers.set_replica_reads(True)
+
+    def dispatch(self, request, *args, **kwargs):
+        """Disables replica reads once the request is done, even on errors"""
+        try:
+            return super().dispatch(request, *args, **kwargs)
+        finally:
+            db_routers.set_replica_reads(False)
+
+    def handle_exception(self, exc):
+        """Retries reads on the primary when a replica failed"""
+        if isinstance(exc, DatabaseError) and db_routers.fail_over():
+            handler = getattr(self, self.request.method.lower())
+            try:
+                return handler(self.request, *self.args, **self.kwargs)
+            except Exception as retry_exc:
+                exc = retry_exc
+
+        return super().handle_exception(exc)
+
+    def finalize_response(self, request, response, *args, **kwargs):
+        """Pins users to the primary after their writes"""
+        if (
+            request.method not in SAFE_METHODS
+            and response.status_code < 400
+            and request.user.is_authenticated
+        ):
+            db_routers.pin_to_primary(request.user.pk)
+
+        return super().finalize_response(request, response, *args, **kwargs)
 
 
-class BaseRecipeAttrViewSet(viewsets.GenericViewSet, mixins.ListModelMixin, mixins.CreateModelMixin):
+class BaseRecipeAttrViewSet(
+    ProfilingMixin, IdempotencyMixin, ReplicaReadMixin,
+    viewsets.GenericViewSet,
+    mixins.ListModelMixin, mixins.CreateModelMixin
+):
     """Base viewset for user owned attributes"""
-    authentication_classes = (TokenAuthentication, )
+    authentication_classes = (
+        SignedAccessTokenAuthentication, ExpiringTokenAuthentication
+    )
     permission_classes = (IsAuthenticated, )
+    throttle_classes = (UserThrottle, )
 
     def get_queryset(self):
         """Return objects for current authenticated user only"""
@@ -24,6 +97,15 @@ class BaseRecipeAttrViewSet(viewsets.GenericViewSet, mixins.ListModelMixin, mixi
 
         return queryset.filter(user=self.request.user).order_by('name').distinct()
 
+    def list(self, request, *args, **kwargs):
+        """Lists objects rendering rows straight from the database"""
+        if self.paginator is not None:
+            return super().list(request, *args, **kwargs)
+        queryset = self.filter_queryset(self.get_queryset())
+        fields = self.get_serializer_class().Meta.fields
+
+        return Response(ValuesListSerializer(queryset, fields).data)
+
     def perform_create(self, serializer):
         """Creates a new object for the current user"""
         serializer.save(user=self.request.user)
@@ -41,21 +123,114 @@ class IngredientViewSet(BaseRecipeAttrViewSet):
     queryset = Ingredient.objects.all()
 
 
-class RecipeViewSet(viewsets.ModelViewSet):
+class RecipeViewSet(
+    ProfilingMixin, IdempotencyMixin, ReplicaReadMixin, viewsets.ModelViewSet
+):
     """Manage recipes in the database"""
-    authentication_classes = (TokenAuthentication, )
+    authentication_classes = (
+        SignedAccessTokenAuthentication, ExpiringTokenAuthentication
+    )
     permission_classes = (IsAuthenticated, )
+    throttle_classes = (UserThrottle, )
     serializer_class = RecipeSerializer
     queryset = Recipe.objects.all()
+    # Every ordering ends on the primary key so the sort is total, which
+    # keeps it stable for keyset pagination and lets it use the composite
+    # (user, column, id) indexes declared on the Recipe model.
+    orderings = ('price', 'time_minutes', 'title')
+    related_fields = {'ingredients': Ingredient, 'tags': Tag}
+    # Actions writing a recipe, honouring If-Match and returning an ETag
+    versioned_actions = ('update', 'partial_update', 'upload_image')
 
     def _params_to_integers(self, qs):
         """Converts string with ids to list of integers"""
         return [int(str_id) for str_id in qs.split(',')]
 
+    def _param_to_number(self, name, converter):
+        """Converts a single query param, raising a validation error"""
+        value = self.request.query_params.get(name)
+        if value in (None, ''):
+            return None
+        try:
+            number = converter(value)
+        except (ValueError, InvalidOperation):
+            number = None
+        if number is None or (
+            isinstance(number, Decimal) and not number.is_finite()
+        ):
+            raise ValidationError({name: 'A valid number is required.'})
+
+        return number
+
+    def _get_ordering(self):
+        """Returns the order_by arguments requested by the client"""
+        ordering = self.request.query_params.get('ordering')
+        if not ordering:
+            return ('-id', )
+        field = ordering.lstrip('-')
+        if field not in self.orderings:
+            raise ValidationError({
+                'ordering': f'Must be one of: {", ".join(self.orderings)}.'
+            })
+        prefix = '-' if ordering.startswith('-') else ''
+
+        return (f'{prefix}{field}', f'{prefix}id')
+
+    def _params_to_field_names(self, param, allowed):
+        """Converts a comma separated param to a validated list of names"""
+        value = self.request.query_params.get(param)
+        if not value:
+            return []
+        names = [name for name in value.split(',') if name]
+        unknown = set(names) - set(allowed)
+        if unknown:
+            raise ValidationError({
+                param: f'Unknown fields: {", ".join(sorted(unknown))}.'
+            })
+
+        return names
+
+    def _get_field_selection(self):
+        """Returns the fields to render and the relations to expand"""
+        if self.action not in ('list', 'retrieve'):
+            return None, []
+        if not hasattr(self, '_field_selection'):
+            available = self.get_serializer_class().Meta.fields
+            fields = self._params_to_field_names('fields', available)
+            expand = self._params_to_field_names('expand', self.related_fields)
+            self._field_selection = (fields or None, expand)
+
+        return self._field_selection
+
+    def _narrow_queryset(self, queryset):
+        """Loads only the columns and relations that will be rendered"""
+        fields, expand = self._get_field_selection()
+        if self.action == 'retrieve':
+            expand = list(self.related_fields)
+        rendered = fields or self.get_serializer_class().Meta.fields
+        columns = [
+            name for name in rendered if name not in self.related_fields
+        ]
+        queryset = queryset.only('id', *columns)
+        for name, model in self.related_fields.items():
+            if name not in rendered:
+                continue
+            related_queryset = model.objects.order_by('id')
+            if name not in expand:
+                related_queryset = related_queryset.only('id')
+            queryset = queryset.prefetch_related(
+                Prefetch(name, queryset=related_queryset)
+            )
+
+        return queryset
+
     def get_queryset(self):
         """Return recipes for current authenticated user only"""
         tags = self.request.query_params.get('tags')
         ingredients = self.request.query_params.get('ingredients')
+        min_price = self._param_to_number('min_price', Decimal)
+        max_price = self._param_to_number('max_price', Decimal)
+        max_time = self._param_to_number('max_time', int)
         queryset = self.queryset
         if tags:
             tags_ids = self._params_to_integers(tags)
@@ -63,8 +238,41 @@ class RecipeViewSet(viewsets.ModelViewSet):
         if ingredients:
             ingredients_ids = self._params_to_integers(ingredients)
             queryset = queryset.filter(ingredients__id__in=ingredients_ids)
+        if min_price is not None:
+            queryset = queryset.filter(price__gte=min_price)
+        if max_price is not None:
+            queryset = queryset.filter(price__lte=max_price)
+        if max_time is not None:
+            queryset = queryset.filter(time_minutes__lte=max_time)
+
+        if self.action in ('list', 'retrieve'):
+            queryset = self._narrow_queryset(queryset)
+
+        return queryset.filter(user=self.request.user).order_by(
+            *self._get_ordering()
+        )
+
+    def get_object(self):
+        """Checks the If-Match header against the version of the recipe"""
+        recipe = super().get_object()
+        header = self.request.META.get('HTTP_IF_MATCH')
+        if header and self.action in self.versioned_actions:
+            etags = parse_etags(header)
+            if '*' not in etags and get_etag(recipe.version) not in etags:
+                raise PreconditionFailed()
+
+        return recipe
 
-        return queryset.filter(user=self.request.user).order_by('-id')
+    def finalize_response(self, request, response, *args, **kwargs):
+        """Sets the ETag of the recipe that was read or written"""
+        data = response.data if response.status_code < 300 else None
+        if (
+            self.action in ('retrieve', 'create') + self.versioned_actions
+            and isinstance(data, dict) and 'version' in data
+        ):
+            response['ETag'] = get_etag(data['version'])
+
+        return super().finalize_response(request, response, *args, **kwargs)
 
     def get_serializer_class(self):
         """Returns specific serializer according to action to be performed"""
@@ -72,9 +280,37 @@ class RecipeViewSet(viewsets.ModelViewSet):
             return RecipeDetailSerializer
         elif self.action == 'upload_image':
             return RecipeImageSerializer
+        elif self.action in ('update', 'partial_update'):
+            return RecipeUpdateSerializer
+        elif self.action == 'bulk_tag':
+            return BulkTagSerializer
+        elif self.action in ('bulk_delete', 'bulk_duplicate'):
+            return RecipeIdsSerializer
 
         return self.serializer_class
 
+    def get_serializer_context(self):
+        """Passes the requested sparse fieldset to the serializer"""
+        context = super().get_serializer_context()
+        fields, expand = self._get_field_selection()
+        context.update(fields=fields, expand=expand)
+
+        return context
+
+    def list(self, request, *args, **kwargs):
+        """Lists recipes, skipping model serializers unless expanding"""
+        fields, expand = self._get_field_selection()
+        if expand or self.paginator is not None:
+            return super().list(request, *args, **kwargs)
+        queryset = self.filter_queryset(self.get_queryset())
+        serializer = FastRecipeListSerializer(
+            queryset,
+            fields=fields,
+            context=self.get_serializer_context()
+        )
+
+        return Response(serializer.data)
+
     def perform_create(self, serializer):
         """Create a new recipe for the current authenticated user"""
         serializer.save(user=self.request.user)
@@ -91,3 +327,47 @@ class RecipeViewSet(viewsets.ModelViewSet):
             serializer.save()
             return Response(data=serializer.data, status=status.HTTP_200_OK)
         return Response(data=serializer.errors, status=status.HTTP_400_BAD_REQUEST)
+
+    def _get_bulk_recipes(self):
+        """Validates a bulk action, returning the serializer and recipes
+
+        Ids of missing recipes and of other users' recipes are ignored.
+        """
+        serializer = self.get_serializer(data=self.request.data)
+        serializer.is_valid(raise_exception=True)
+        recipes = self.queryset.filter(
+            user=self.request.user, pk__in=serializer.validated_data['ids']
+        )
+
+        return serializer, recipes
+
+    @action(methods=['POST'], detail=False, url_path='bulk-delete')
+    def bulk_delete(self, request):
+        """Deletes many recipes, their image files in the background"""
+        _, recipes = self._get_bulk_recipes()
+
+        return Response({'deleted': bulk.delete_recipes(recipes)})
+
+    @action(methods=['POST'], detail=False, url_path='bulk-tag')
+    def bulk_tag(self, request):
+        """Adds and removes tags of many recipes"""
+        serializer, recipes = self._get_bulk_recipes()
+        updated = bulk.tag_recipes(
+            recipes,
+            serializer.validated_data['add_tags'],
+            serializer.validated_data['remove_tags']
+        )
+
+        return Response({'updated': updated})
+
+    @action(methods=['POST'], detail=False, url_path='bulk-duplicate')
+    def bulk_duplicate(self, request):
+        """Copies many recipes with their tags and ingredients"""
+        _, recipes = self._get_bulk_recipes()
+        copy_ids = bulk.duplicate_recipes(recipes)
+        serializer = FastRecipeListSerializer(
+            self.queryset.filter(pk__in=copy_ids).order_by('id'),
+            context=self.get_serializer_context()
+        )
+
+        return Response(serializer.data, status=status.HTTP_201_CREATED)
@@ -0,0 +1,57 @@
+"""
+Account deletion.
+
+Deleting a user with a large library in one transaction holds locks on
+all of its rows for long and leaves its image files behind. Accounts are
+deactivated right away instead, and their data is purged in batches in
+the background.
+"""
+import time
+
+from django.contrib.auth import get_user_model
+from django.db import transaction
+from django.utils import timezone
+
+from core import background
+from core.authentication import revoke_access_tokens
+from core.cleanup import delete_in_batches
+from core.models import AuthToken, IdempotencyRecord, Ingredient, Recipe, Tag
+from recipes.bulk import delete_recipes
+
+
+def request_deletion(user):
+    """Deactivates the user and purges their data in the background"""
+    with transaction.atomic():
+        get_user_model().objects.filter(pk=user.pk).update(
+            is_active=False, deletion_requested_at=timezone.now()
+        )
+        AuthToken.objects.filter(user=user).delete()
+        revoke_access_tokens(user)
+        background.submit_on_commit(purge_user, user.pk)
+
+
+def purge_user(user_id, batch_size=1000, pause=0):
+    """Deletes a user and their data, a batch at a time
+
+    Each batch is a separate transaction, sleeping `pause` seconds in
+    between. Image files of the deleted recipes are deleted too. Purges
+    can be resumed after being interrupted.
+    """
+    recipes = Recipe.objects.filter(user_id=user_id)
+    while True:
+        recipe_ids = list(recipes.values_list('id', flat=True)[:batch_size])
+        if not recipe_ids:
+            break
+        delete_recipes(Recipe.objects.filter(pk__in=recipe_ids))
+        if pause:
+            time.sleep(pause)
+
+    for queryset in (
+        Tag.objects.filter(user_id=user_id),
+        Ingredient.objects.filter(user_id=user_id),
+        AuthToken.objects.filter(user_id=user_id),
+        IdempotencyRecord.objects.filter(scope=f'user:{user_id}'),
+    ):
+        delete_in_batches(queryset, batch_size, pause)
+
+    get_user_model().objects.filter(pk=user_id).delete()
@@ -0,0 +1,33 @@
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand
+
+from users.deletion import purge_user
+
+
+class Command(BaseCommand):
+    """Django command to purge the data of deleted accounts"""
+
+    help = (
+        'Purges the data of users who deleted their account, finishing '
+        'purges interrupted by a restart.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--batch-size', type=int, default=1000,
+            help='Rows deleted per statement.'
+        )
+        parser.add_argument(
+            '--pause', type=float, default=0,
+            help='Seconds to sleep between batches.'
+        )
+
+    def handle(self, *args, **options):
+        """Handle the command"""
+        user_ids = list(get_user_model().objects.filter(
+            deletion_requested_at__isnull=False
+        ).values_list('id', flat=True))
+        for user_id in user_ids:
+            purge_user(user_id, options['batch_size'], options['pause'])
+
+        self.stdout.write(f'Purged {len(user_ids)} deleted users.')
@@ -37,6 +37,9 @@ class AuthTokenSerializer(serializers.Serializer):
         style={'input_type': 'password'},
         trim_whitespace=True
     )
+    device = serializers.CharField(
+        max_length=255, required=False, allow_blank=True, default=''
+    )
 
     def validate(self, attrs):
         """Validates and authenticates the user"""
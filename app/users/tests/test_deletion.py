@@ -0,0 +1,74 @@
+import os
+from unittest.mock import MagicMock
+
+from django.contrib.auth import get_user_model
+from django.core.files.base import ContentFile
+from django.core.management import call_command
+from django.test import TransactionTestCase
+from django.urls import reverse
+from django.utils import timezone
+
+from rest_framework import status
+from rest_framework.test import APIClient
+
+from core.models import Ingredient, Recipe, Tag
+from core.tests.utils import seed_recipes
+
+
+ME_URL = reverse('users:me')
+
+
+class UserDeletionTests(TransactionTestCase):
+    """Tests the data of deleted accounts is purged once they commit"""
+
+    def setUp(self):
+        self.user = get_user_model().objects.create_user(
+            email='gustavo@test.com',
+            password='123456'
+        )
+        self.other_user = get_user_model().objects.create_user(
+            email='other@test.com',
+            password='123456'
+        )
+        seed_recipes(self.user, 5, tags=2, ingredients=2)
+        seed_recipes(self.other_user, 1, tags=1, ingredients=1)
+
+    def add_image(self, recipe):
+        recipe.image.save('image.jpg', ContentFile(b'image'))
+        return recipe.image.path
+
+    def assertPurged(self, user):
+        self.assertFalse(
+            get_user_model().objects.filter(pk=user.pk).exists()
+        )
+        for model in (Recipe, Tag, Ingredient):
+            self.assertFalse(model.objects.filter(user=user).exists())
+
+    def test_deleting_account_purges_data(self):
+        """Test the user's recipes, images, tags and ingredients go"""
+        path = self.add_image(Recipe.objects.filter(user=self.user).first())
+        other_path = self.add_image(Recipe.objects.get(user=self.other_user))
+        client = APIClient()
+        client.force_authenticate(user=self.user)
+
+        res = client.delete(ME_URL)
+
+        self.assertEqual(res.status_code, status.HTTP_202_ACCEPTED)
+        self.assertPurged(self.user)
+        self.assertFalse(os.path.exists(path))
+        self.assertTrue(Recipe.objects.filter(user=self.other_user).exists())
+        self.assertTrue(os.path.exists(other_path))
+        os.remove(other_path)
+
+    def test_purge_deleted_users(self):
+        """Test the command finishes purges that were interrupted"""
+        get_user_model().objects.filter(pk=self.user.pk).update(
+            is_active=False, deletion_requested_at=timezone.now()
+        )
+
+        call_command('purge_deleted_users', batch_size=2, stdout=MagicMock())
+
+        self.assertPurged(self.user)
+        self.assertTrue(
+            get_user_model().objects.filter(pk=self.other_user.pk).exists()
+        )
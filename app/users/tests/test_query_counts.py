@@ -0,0 +1,57 @@
+from django.test import TestCase
+from django.urls import reverse
+
+from rest_framework.test import APIClient
+
+from core.tests.utils import QueryCountMixin
+
+
+CREATE_USER_URL = reverse('users:create')
+CREATE_TOKEN_URL = reverse('users:auth')
+ME_URL = reverse('users:me')
+
+
+class UserApiQueryCountTests(QueryCountMixin, TestCase):
+    """Test the user endpoints run a constant number of queries"""
+
+    def setUp(self):
+        self.client = APIClient()
+
+    def test_create_user(self):
+        """Test creating a user runs a constant number of queries"""
+        self.assertConstantQueries(
+            lambda user, recipe_ids: self.client.post(CREATE_USER_URL, {
+                'email': f'new.{user.email}',
+                'password': '123456',
+                'name': 'User',
+            })
+        )
+
+    def test_create_token(self):
+        """Test logging in runs a constant number of queries"""
+        self.assertConstantQueries(
+            lambda user, recipe_ids: self.client.post(CREATE_TOKEN_URL, {
+                'email': user.email,
+                'password': '123456',
+            })
+        )
+
+    def test_retrieve_profile(self):
+        """Test retrieving the profile runs constant queries"""
+        self.assertConstantQueries(
+            lambda user, recipe_ids: self.client.get(ME_URL)
+        )
+
+    def test_update_profile(self):
+        """Test updating the profile runs constant queries"""
+        self.assertConstantQueries(
+            lambda user, recipe_ids: self.client.patch(
+                ME_URL, {'name': 'New name'}
+            )
+        )
+
+    def test_delete_account(self):
+        """Test deleting the account runs constant queries"""
+        self.assertConstantQueries(
+            lambda user, recipe_ids: self.client.delete(ME_URL)
+        )
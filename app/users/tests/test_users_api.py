@@ -5,10 +5,13 @@ from django.urls import reverse
 from rest_framework.test import APIClient
 from rest_framework import status
 
+from core.models import AuthToken
+
 
 CREATE_USER_URL = reverse('users:create')
 CREATE_TOKEN_URL = reverse('users:auth')
 ME_URL = reverse('users:me')
+ME_TOKENS_URL = reverse('users:me-tokens')
 
 
 def create_user(**params):
@@ -60,6 +63,27 @@ class PublicUserApiTests(TestCase):
         self.assertEqual(res.status_code, status.HTTP_200_OK)
         self.assertIn('token', res.json())
 
+    def test_create_token_per_device(self):
+        """Test each device gets its own token, replaced on new logins"""
+        payload = {'email': 'gustavo@test.com', 'password': '123456'}
+        user = create_user(**payload)
+
+        phone = self.client.post(
+            CREATE_TOKEN_URL, dict(payload, device='phone')
+        ).json()
+        laptop = self.client.post(
+            CREATE_TOKEN_URL, dict(payload, device='laptop')
+        ).json()
+        new_phone = self.client.post(
+            CREATE_TOKEN_URL, dict(payload, device='phone')
+        ).json()
+
+        self.assertIn('expires', phone)
+        self.assertEqual(
+            set(user.auth_tokens.values_list('key', flat=True)),
+            {laptop['token'], new_phone['token']}
+        )
+
     def test_create_token_with_invalid_credentials_fails(self):
         """Test generating token for invalid credentials should fail"""
         create_user(email='gustavo@test.com', password='123456')
@@ -130,4 +154,30 @@ class PrivateUserApiTests(TestCase):
         self.assertEqual(res.json().get('name'), payload.get('name'))
         self.assertTrue(self.user.check_password(payload.get('password')))
 
+    def test_revoke_all_tokens(self):
+        """Test revoking the tokens of every device of the user"""
+        AuthToken.objects.create_token(self.user, 'phone')
+        AuthToken.objects.create_token(self.user, 'laptop')
+        other_user = create_user(email='other@test.com', password='123456')
+        AuthToken.objects.create_token(other_user, 'phone')
+
+        res = self.client.delete(ME_TOKENS_URL)
 
+        self.assertEqual(res.status_code, status.HTTP_204_NO_CONTENT)
+        self.assertFalse(self.user.auth_tokens.exists())
+        self.user.refresh_from_db()
+        self.assertEqual(self.user.token_version, 1)
+        self.assertTrue(other_user.auth_tokens.exists())
+
+    def test_delete_account(self):
+        """Test deleting the account deactivates it and revokes its tokens"""
+        AuthToken.objects.create_token(self.user, 'phone')
+
+        res = self.client.delete(ME_URL)
+
+        self.assertEqual(res.status_code, status.HTTP_202_ACCEPTED)
+        self.user.refresh_from_db()
+        self.assertFalse(self.user.is_active)
+        self.assertIsNotNone(self.user.deletion_requested_at)
+        self.assertEqual(self.user.token_version, 1)
+        self.assertFalse(self.user.auth_tokens.exists())
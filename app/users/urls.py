@@ -9,4 +9,5 @@ urlpatterns = [
     path('', views.CreateUserView.as_view(), name='create'),
     path('auth/', views.CreateTokenView.as_view(), name='auth'),
     path('me/', views.ManageUserView.as_view(), name='me'),
+    path('me/tokens/', views.RevokeTokensView.as_view(), name='me-tokens'),
 ]
\ No newline at end of file
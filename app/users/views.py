@@ -1,27 +1,112 @@
-from rest_framework import permissions, authentication
-from rest_framework.generics import CreateAPIView, RetrieveUpdateAPIView
+import time
+
+from rest_framework import permissions, status
+from rest_framework.generics import (
+    CreateAPIView, RetrieveUpdateDestroyAPIView
+)
 from rest_framework.authtoken.views import ObtainAuthToken
+from rest_framework.response import Response
 from rest_framework.settings import api_settings
+from rest_framework.views import APIView
 
+from core.authentication import (
+    ExpiringTokenAuthentication, create_access_token, revoke_access_tokens
+)
+from core.exceptions import ServiceUnavailable
+from core.hashers import HashingBusy
+from core.idempotency import IdempotencyMixin
+from core.metrics import registry
+from core.models import AuthToken
+from core.profiling import ProfilingMixin
+from core.throttling import LoginIPThrottle, LoginEmailThrottle
+from users.deletion import request_deletion
 from users.serializers import UserSerializer, AuthTokenSerializer
 
 
-class CreateUserView(CreateAPIView):
+class CreateUserView(IdempotencyMixin, CreateAPIView):
     """View that peforms user creation"""
     serializer_class = UserSerializer
 
 
 class CreateTokenView(ObtainAuthToken):
-    """Generates an auth token for the user"""
+    """Generates an auth token for the user
+
+    Attempts are throttled before the password is hashed, and rejected
+    with a 503 when no hashing slot frees up in time.
+    """
     serializer_class = AuthTokenSerializer
     renderer_classes = api_settings.DEFAULT_RENDERER_CLASSES
+    throttle_classes = (LoginIPThrottle, LoginEmailThrottle)
+
+    def authenticate(self, request):
+        """Returns the validated credentials, recording login latency"""
+        serializer = self.serializer_class(
+            data=request.data, context={'request': request}
+        )
+        start = time.perf_counter()
+        outcome = 'failure'
+        try:
+            serializer.is_valid(raise_exception=True)
+            outcome = 'success'
+        except HashingBusy:
+            outcome = 'busy'
+            raise ServiceUnavailable(wait=1)
+        finally:
+            registry.observe(
+                'login_duration_seconds', time.perf_counter() - start,
+                {'outcome': outcome}
+            )
+
+        return serializer.validated_data
+
+    def post(self, request, *args, **kwargs):
+        """Returns a new token for the device, replacing its old one
+
+        A short lived signed access token is issued along with it.
+        """
+        credentials = self.authenticate(request)
+        user = credentials['user']
+        token = AuthToken.objects.create_token(user, credentials['device'])
+        access_token, access_expires = create_access_token(user)
+
+        return Response({
+            'token': token.key,
+            'expires': token.expires,
+            'access_token': access_token,
+            'access_expires': access_expires,
+        })
+
 
+class ManageUserView(ProfilingMixin, RetrieveUpdateDestroyAPIView):
+    """Manages the authenticated user
 
-class ManageUserView(RetrieveUpdateAPIView):
+    Deleting the account deactivates it at once, its data is deleted in
+    the background.
+    """
     serializer_class = UserSerializer
-    authentication_classes = (authentication.TokenAuthentication, )
+    authentication_classes = (ExpiringTokenAuthentication, )
     permission_classes = (permissions.IsAuthenticated, )
 
     def get_object(self):
         """Returns the authenticated user"""
-        return self.request.user
\ No newline at end of file
+        return self.request.user
+
+    def destroy(self, request, *args, **kwargs):
+        request_deletion(request.user)
+
+        return Response(status=status.HTTP_202_ACCEPTED)
+
+
+class RevokeTokensView(ProfilingMixin, APIView):
+    """Revokes every token of the authenticated user, on all devices
+
+    Signed access tokens are revoked too.
+    """
+    authentication_classes = (ExpiringTokenAuthentication, )
+    permission_classes = (permissions.IsAuthenticated, )
+
+    def delete(self, request, *args, **kwargs):
+        AuthToken.objects.filter(user=request.user).delete()
+        revoke_access_tokens(request.user)
+
+        return Response(status=status.HTTP_204_NO_CONTENT)